@@ -23,8 +23,11 @@ import time
 import subprocess
 from enum import Enum
 
+from karaoke_gen.job_store import JobStore
+from karaoke_gen.job_events import JobEventHub, JobEventLog
+from karaoke_gen.job_log import JobLogWriter, make_log_filter, read_log_entries
 from fastapi import FastAPI, Request, Form, HTTPException, UploadFile, File, Depends
-from fastapi.responses import JSONResponse, FileResponse, HTMLResponse
+from fastapi.responses import JSONResponse, FileResponse, HTMLResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
@@ -142,6 +145,24 @@ preview_volume = modal.Volume.from_name("karaoke-previews", create_if_missing=Tr
 
 # Define serverless dictionaries to hold job states
 job_status_dict = modal.Dict.from_name("karaoke-job-statuses", create_if_missing=True)
+# Compact per-job summaries and per-token job ids, so job lists don't read every full job record
+job_summaries_dict = modal.Dict.from_name("karaoke-job-summaries", create_if_missing=True)
+job_token_index_dict = modal.Dict.from_name("karaoke-job-token-index", create_if_missing=True)
+# Job owner token per job, and job counts per status (globally and per token) kept up to date as jobs change
+job_owners_dict = modal.Dict.from_name("karaoke-job-owners", create_if_missing=True)
+job_status_counts_dict = modal.Dict.from_name("karaoke-job-status-counts", create_if_missing=True)
+# Live progress of a job's current phase (e.g. encode progress), kept apart from the job record so progress
+# reports from worker threads can't overwrite a status change made at the same time
+job_progress_dict = modal.Dict.from_name("karaoke-job-progress", create_if_missing=True)
+# Recent job status changes and log lines, streamed to dashboards by /api/events
+job_events_dict = modal.Dict.from_name("karaoke-job-events", create_if_missing=True)
+job_event_log = JobEventLog(job_events_dict)
+job_event_hub = JobEventHub(job_event_log)
+job_store = JobStore(
+    job_status_dict, job_summaries_dict, job_token_index_dict, job_owners_dict, job_status_counts_dict, event_log=job_event_log
+)
+# Key in system_config_dict set once summaries and the token index have been backfilled for jobs stored before them
+JOB_INDEX_BUILT_KEY = "job_index_built_at"
 # Note: job_logs_dict removed - now using Modal's native logging via CLI queries
 
 # Add new Modal Dicts for authentication and YouTube cookies
@@ -168,6 +189,9 @@ delivery_message_template_dict = modal.Dict.from_name("karaoke-delivery-message-
 # Mount volumes to specific paths inside the container
 VOLUME_CONFIG = {"/models": model_volume, "/output": output_volume, "/cache": cache_volume, "/config": config_volume, "/previews": preview_volume}
 
+# Separated stems are cached by audio content on the cache volume and shared by all jobs
+STEM_CACHE_DIR = "/cache/stems"
+
 
 # User type enumeration (must be defined before Pydantic models that use it)
 class UserType(str, Enum):
@@ -215,11 +239,43 @@ class DeliveryMessageTemplateRequest(BaseModel):
     template: str
 
 
+def publish_log_events(job_id: str, log_entries: List[Dict[str, Any]]):
+    """Tell event streams following job_id that log lines were written, once per batch rather than per line."""
+    job_event_log.publish("log", job_id, {"count": len(log_entries), "latest": log_entries[-1]})
+
+
+# Job log lines are appended to /output/{job_id}/job_logs.jsonl in batches from a background thread, so logging
+# doesn't add a file open and write per record to every phase
+job_log_writer = JobLogWriter(lambda job_id: f"/output/{job_id}/job_logs.jsonl", on_flush=publish_log_events)
+
+
+class JobLogFilter(logging.Filter):
+    """
+    Drops records a job's log shouldn't get. As a filter, it runs before the handler takes its lock, so records logged
+    on the log writer's thread (its write failures, or Modal's own logs while publishing log events) never wait on a
+    handler whose thread may be waiting on the writer.
+    """
+
+    # Noisy logs from Modal's internal libraries and operations, by logger name (module)
+    NOISY_MODULES = (
+        'hpack',
+        'ssa',
+        'byteflow',
+        'PngImagePlugin',
+    )
+
+    def filter(self, record):
+        if record.threadName == JobLogWriter.THREAD_NAME:
+            return False
+        return not record.name.startswith(self.NOISY_MODULES)
+
+
 class JobLogHandler(logging.Handler):
     """Custom logging handler that outputs to both Modal's native logging and local log files"""
 
     def __init__(self, job_id: str):
         super().__init__()
+        self.addFilter(JobLogFilter())
         self.job_id = job_id
         # Prevent recursion by not processing our own log messages
         self.processing = False
@@ -233,10 +289,6 @@ class JobLogHandler(logging.Handler):
         try:
             self.processing = True
 
-            # Filter out noisy logs from Modal's internal operations
-            if self._should_filter_log(record):
-                return
-
             # Format the log message
             message = self.format(record)
 
@@ -246,27 +298,12 @@ class JobLogHandler(logging.Handler):
             # Print to stdout for Modal's native logging
             print(f"[{log_entry['level']}] {log_entry['message']}")
             
-            # Also write to local log file (JSONL format - one JSON object per line)
-            try:
-                # Ensure the directory exists - use more robust directory creation
-                import os
-                directory = self.log_file_path.parent
-                if not directory.exists():
-                    directory.mkdir(parents=True, exist_ok=True)
-                
-                # Append to the log file (JSONL format) with explicit error handling
-                with open(self.log_file_path, "a", encoding="utf-8") as f:
-                    f.write(json.dumps(log_entry) + "\n")
-                    f.flush()  # Ensure data is written immediately
-                    
-
-                    
-            except PermissionError as e:
-                print(f"[WARNING] Permission denied writing to log file {self.log_file_path}: {e}")
-            except OSError as e:
-                print(f"[WARNING] OS error writing to log file {self.log_file_path}: {e}")
-            except Exception as e:
-                print(f"[WARNING] Unexpected error writing to local log file {self.log_file_path}: {e}")
+            # Also queue it for the local log file (JSONL format - one JSON object per line)
+            job_log_writer.write(self.job_id, log_entry)
+            # Errors are often the last thing a failing job logs, so write them out now (without waiting on the
+            # writer while holding the handler's lock)
+            if record.levelno >= logging.ERROR:
+                job_log_writer.flush(wait=False)
 
         except Exception as e:
             # Print error for debugging but don't crash
@@ -274,22 +311,6 @@ class JobLogHandler(logging.Handler):
         finally:
             self.processing = False
 
-    def _should_filter_log(self, record):
-        """Filter out noisy logs from Modal's internal libraries and operations."""
-        
-        # Filter by logger name (module)
-        noisy_modules = [
-            'hpack',
-            'ssa',
-            'byteflow',
-            'PngImagePlugin'
-        ]
-        if any(record.name.startswith(module) for module in noisy_modules):
-            return True
-
-        # Keep all other logs
-        return False
-
     def flush(self):
         """Flush any pending log writes to disk."""
         try:
@@ -297,20 +318,17 @@ class JobLogHandler(logging.Handler):
             import sys
             sys.stdout.flush()
             
-            # Force filesystem sync if the log file exists
-            if self.log_file_path.exists():
-                try:
-                    import os
-                    # Open and close to ensure all writes are flushed
-                    with open(self.log_file_path, "a") as f:
-                        f.flush()
-                        os.fsync(f.fileno())
-                except (PermissionError, OSError, Exception):
-                    pass  # Fail silently on flush errors
+            # Wait for queued log lines to be written to the log file
+            job_log_writer.flush()
         except Exception as e:
             # Don't crash on flush errors
             print(f"[WARNING] Could not flush log file: {e}")
 
+    def close(self):
+        """Flush pending log writes when the job's handler is removed, at the end of the job or on failure."""
+        self.flush()
+        super().close()
+
 
 def setup_job_logging(job_id: str):
     """Set up logging to capture all messages for a job"""
@@ -393,19 +411,10 @@ def log_message(job_id: str, level: str, message: str):
     # Print to stdout for Modal's native logging
     print(f"[{level}] {message}")
     
-    # Also write to local log file
-    try:
-        log_file_path = Path(f"/output/{job_id}/job_logs.jsonl")
-        
-        # Ensure the directory exists
-        log_file_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Append to the log file (JSONL format)
-        with open(log_file_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(log_entry) + "\n")
-    except Exception as e:
-        # If local file write fails, just print the error but don't crash
-        print(f"[WARNING] Could not write to local log file: {e}")
+    # Also queue it for the local log file, writing errors out straight away
+    job_log_writer.write(job_id, log_entry)
+    if level in ("ERROR", "CRITICAL"):
+        job_log_writer.flush()
 
 
 # Cache Utility Functions
@@ -608,6 +617,33 @@ def warm_cache():
         return {"status": "error", "message": str(e)}
 
 
+# Status counts are updated as jobs change, but writers in different containers can race, so recount them regularly
+@app.function(
+    image=karaoke_image,
+    schedule=modal.Period(hours=6),
+    timeout=600,  # 10 minutes to recount every job summary
+    retries=0,
+)
+def reconcile_job_status_counts():
+    """Recount job status counts from the job summaries."""
+    status_counts = job_store.reconcile_status_counts()
+    print(f"Reconciled job status counts: {status_counts}")
+    return {"status": "success", "status_counts": status_counts}
+
+
+@app.function(
+    image=karaoke_image,
+    schedule=modal.Period(minutes=15),
+    timeout=300,
+    retries=0,
+)
+def prune_job_events():
+    """Drop job events older than the event log's retention period."""
+    pruned = job_event_log.prune()
+    print(f"Pruned {pruned} job event buckets")
+    return {"status": "success", "pruned": pruned}
+
+
 # GPU Worker Functions
 @app.function(
     image=karaoke_image,
@@ -633,13 +669,14 @@ async def process_part_one(job_id: str, youtube_url: str, cookies_str: Optional[
 
         # CRITICAL: Reload volume to see files written by other containers
         output_volume.reload()
+        cache_volume.reload()  # Also reload cache volume, for stems separated by other containers
         log_message(job_id, "DEBUG", "Output volume reloaded to fetch latest files")
 
         # Update status
         update_job_status_with_timeline(job_id, "processing", progress=10, url=youtube_url, created_at=datetime.datetime.now().isoformat())
 
         # Initialize processor - this now uses the same code path as the CLI
-        processor = ServerlessKaraokeProcessor(model_dir="/models", output_dir="/output")
+        processor = ServerlessKaraokeProcessor(model_dir="/models", output_dir="/output", stem_cache_dir=STEM_CACHE_DIR)
 
         # Verify styles files exist before processing
         verified_styles_file = None
@@ -678,6 +715,9 @@ async def process_part_one(job_id: str, youtube_url: str, cookies_str: Optional[
         
         result = await processor.process_url(job_id, youtube_url, cookies_str, override_artist, override_title, verified_styles_file, verified_styles_archive)
         
+        # Persist any newly separated stems so other containers can reuse them
+        cache_volume.commit()
+
         log_message(job_id, "INFO", f"✅ KaraokePrep workflow completed successfully")
         log_message(job_id, "DEBUG", f"Result status: {result.get('status', 'unknown')}")
         log_message(job_id, "DEBUG", f"Result keys: {list(result.keys()) if result else 'none'}")
@@ -731,6 +771,8 @@ async def process_part_one(job_id: str, youtube_url: str, cookies_str: Optional[
             root_logger = logging.getLogger()
             if 'log_handler' in locals():
                 root_logger.removeHandler(log_handler)
+                # Write out the job's buffered log lines before the container can exit
+                log_handler.close()
         except:
             pass
 
@@ -764,7 +806,7 @@ def process_part_two(job_id: str, updated_correction_data: Optional[Dict[str, An
         log_message(job_id, "INFO", f"Starting phase 2 (video generation only) for job {job_id}")
 
         # Update status
-        job_data = job_status_dict.get(job_id, {})
+        job_data = job_store.get(job_id, {})
         update_job_status_with_timeline(
             job_id,
             "rendering",
@@ -895,7 +937,7 @@ def process_part_two(job_id: str, updated_correction_data: Optional[Dict[str, An
         timeout_msg = f"Function timed out after {600} seconds (10 minutes)"
         log_message(job_id, "ERROR", f"Phase 2 timed out: {timeout_msg}")
         
-        job_data = job_status_dict.get(job_id, {})
+        job_data = job_store.get(job_id, {})
         update_job_status_with_timeline(
             job_id,
             "timeout",
@@ -915,7 +957,7 @@ def process_part_two(job_id: str, updated_correction_data: Optional[Dict[str, An
         log_message(job_id, "ERROR", f"Phase 2 failed: {error_msg}")
         log_message(job_id, "ERROR", f"Traceback: {error_traceback}")
 
-        job_data = job_status_dict.get(job_id, {})
+        job_data = job_store.get(job_id, {})
         update_job_status_with_timeline(
             job_id,
             "error",
@@ -932,6 +974,8 @@ def process_part_two(job_id: str, updated_correction_data: Optional[Dict[str, An
             root_logger = logging.getLogger()
             if 'log_handler' in locals():
                 root_logger.removeHandler(log_handler)
+                # Write out the job's buffered log lines before the container can exit
+                log_handler.close()
         except:
             pass
 
@@ -962,7 +1006,7 @@ def process_part_three(job_id: str, selected_instrumental: Optional[str] = None)
             log_message(job_id, "INFO", f"Using selected instrumental: {selected_instrumental}")
 
         # Update status
-        job_data = job_status_dict.get(job_id, {})
+        job_data = job_store.get(job_id, {})
         update_job_status_with_timeline(
             job_id,
             "finalizing",
@@ -1012,6 +1056,7 @@ def process_part_three(job_id: str, selected_instrumental: Optional[str] = None)
 
         # Import the existing finalization class
         from karaoke_gen.karaoke_finalise.karaoke_finalise import KaraokeFinalise
+        from karaoke_gen.ffmpeg_capabilities import DEFAULT_CAPABILITY_CACHE_FILE
 
         # Change to the track directory for processing
         original_cwd = os.getcwd()
@@ -1089,6 +1134,16 @@ def process_part_three(job_id: str, selected_instrumental: Optional[str] = None)
             else:
                 log_message(job_id, "DEBUG", "YouTube upload not enabled in config or not requested by user")
 
+            last_progress_update = [0.0]
+
+            def report_encode_progress(description, progress):
+                # ffmpeg reports progress several times a second; only write it to the job dict every couple of seconds
+                now = time.monotonic()
+                if progress["progress"] != "end" and now - last_progress_update[0] < 2:
+                    return
+                last_progress_update[0] = now
+                update_job_progress_details(job_id, "finalizing", encode_progress={"step": description, **progress})
+
             # Set up KaraokeFinalise with full configuration (logs go to Modal stdout)
             finalizer = KaraokeFinalise(
                 logger=None,
@@ -1111,6 +1166,9 @@ def process_part_three(job_id: str, selected_instrumental: Optional[str] = None)
                 keep_brand_code=False,  # Don't keep existing brand code, generate new one
                 user_youtube_credentials=youtube_credentials,  # Pass user's YouTube credentials
                 server_side_mode=True,  # CRITICAL: enable server-side mode for Modal deployment
+                ffmpeg_capability_cache_file=DEFAULT_CAPABILITY_CACHE_FILE,  # Warm containers skip the NVENC probes
+                encode_threads=16,  # Matches the CPUs reserved for this function
+                progress_callback=report_encode_progress,  # Live encode progress for the job status
             )
                 
             # Log which features are enabled
@@ -1293,6 +1351,8 @@ def process_part_three(job_id: str, selected_instrumental: Optional[str] = None)
             youtube_url=result.get("youtube_url"),
             brand_code=result.get("brand_code"),
             brand_code_dir_sharing_link=result.get("brand_code_dir_sharing_link"),
+            # Wall/CPU time and realtime factor of each ffmpeg command, for the timeline
+            command_timings=result.get("command_timings", []),
             **{k: v for k, v in job_data.items() if k not in ["status", "progress", "timeline", "last_updated", "video_path", "lrc_path"]},
         )
 
@@ -1305,7 +1365,7 @@ def process_part_three(job_id: str, selected_instrumental: Optional[str] = None)
         timeout_msg = f"Function timed out after {600} seconds (30 minutes)"
         log_message(job_id, "ERROR", f"Phase 3 timed out: {timeout_msg}")
         
-        job_data = job_status_dict.get(job_id, {})
+        job_data = job_store.get(job_id, {})
         update_job_status_with_timeline(
             job_id,
             "timeout",
@@ -1325,7 +1385,7 @@ def process_part_three(job_id: str, selected_instrumental: Optional[str] = None)
         log_message(job_id, "ERROR", f"Phase 3 failed: {error_msg}")
         log_message(job_id, "ERROR", f"Traceback: {error_traceback}")
 
-        job_data = job_status_dict.get(job_id, {})
+        job_data = job_store.get(job_id, {})
         update_job_status_with_timeline(
             job_id,
             "error",
@@ -1342,6 +1402,8 @@ def process_part_three(job_id: str, selected_instrumental: Optional[str] = None)
             root_logger = logging.getLogger()
             if 'log_handler' in locals():
                 root_logger.removeHandler(log_handler)
+                # Write out the job's buffered log lines before the container can exit
+                log_handler.close()
         except:
             pass
 
@@ -1364,7 +1426,7 @@ def prepare_review_data(job_id: str):
         output_volume.reload()
 
         # Check if job data exists
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise Exception(f"Job {job_id} not found")
 
@@ -1462,7 +1524,7 @@ def prepare_review_data(job_id: str):
         log_message(job_id, "ERROR", f"Review data preparation failed: {error_msg}")
 
         # Update job status to error
-        job_data = job_status_dict.get(job_id, {})
+        job_data = job_store.get(job_id, {})
         update_job_status_with_timeline(
             job_id,
             "error",
@@ -1554,7 +1616,7 @@ async def process_part_one_uploaded(
 
         # Initialize processor - this now uses the same code path as the CLI
         log_message(job_id, "DEBUG", "Initializing ServerlessKaraokeProcessor...")
-        processor = ServerlessKaraokeProcessor(model_dir="/models", output_dir="/output")
+        processor = ServerlessKaraokeProcessor(model_dir="/models", output_dir="/output", stem_cache_dir=STEM_CACHE_DIR)
         log_message(job_id, "DEBUG", "ServerlessKaraokeProcessor initialized successfully")
 
         # Process using the full KaraokePrep workflow (same as CLI)
@@ -1563,6 +1625,9 @@ async def process_part_one_uploaded(
             log_message(job_id, "INFO", f"Using custom styles from: {styles_file_path}")
         result = await processor.process_uploaded_file(job_id, audio_file_path, artist, title, styles_file_path, styles_archive_path)
 
+        # Persist any newly separated stems so other containers can reuse them
+        cache_volume.commit()
+
         # Cache the processing results for future use
         if result.get("track_data"):
             cache_manager.cache_transcription_result(
@@ -1628,6 +1693,8 @@ async def process_part_one_uploaded(
             root_logger = logging.getLogger()
             if 'log_handler' in locals():
                 root_logger.removeHandler(log_handler)
+                # Write out the job's buffered log lines before the container can exit
+                log_handler.close()
         except:
             pass
 
@@ -1744,9 +1811,11 @@ def track_job_usage(token: str, job_id: str) -> bool:
     if "jobs" not in usage_data:
         usage_data["jobs"] = []
 
-    usage_data["jobs"].append({"job_id": job_id, "created_at": time.time()})
+    created_at = time.time()
+    usage_data["jobs"].append({"job_id": job_id, "created_at": created_at})
 
     token_usage_dict[token] = usage_data
+    job_store.add_job_for_token(token, job_id, created_at)
     return True
 
 
@@ -3235,26 +3304,19 @@ async def submit_youtube_job(
         return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
 
 
-@api_app.get("/api/jobs")
-async def get_all_jobs(user: dict = Depends(authenticate_user)):
-    """Get status of all jobs for authenticated user."""
-    try:
-        all_jobs = dict(job_status_dict.items())
-
-        # For admin users, return all jobs
-        if user["user_type"] == UserType.ADMIN:
-            return JSONResponse(all_jobs)
+def get_user_job_summaries(user: dict, offset: int = 0, limit: Optional[int] = None):
+    """Summaries of the jobs user can see, newest first, as ({job_id: summary}, total): every job for admins."""
+    if user["user_type"] == UserType.ADMIN:
+        return job_store.all_summaries(offset=offset, limit=limit)
+    return job_store.summaries_for_token(user["token"], offset=offset, limit=limit)
 
-        # For regular users, only return their jobs
-        user_jobs = {}
-        usage_data = token_usage_dict.get(user["token"], {"jobs": []})
-        user_job_ids = [job["job_id"] for job in usage_data.get("jobs", [])]
 
-        for job_id, job_data in all_jobs.items():
-            if job_id in user_job_ids or job_data.get("user_type") == user["user_type"].value:
-                user_jobs[job_id] = job_data
-
-        return JSONResponse(user_jobs)
+@api_app.get("/api/jobs")
+async def get_all_jobs(user: dict = Depends(authenticate_user), offset: int = 0, limit: Optional[int] = None):
+    """Get summaries of the authenticated user's jobs, newest first, optionally one page at a time."""
+    try:
+        jobs, total = get_user_job_summaries(user, offset=max(0, offset), limit=limit)
+        return JSONResponse(jobs, headers={"X-Total-Count": str(total)})
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
@@ -3265,17 +3327,100 @@ def check_job_access(job_id: str, user: dict) -> bool:
         return True
 
     # Check if user created this job
+    if job_store.token_has_job(user["token"], job_id):
+        return True
+
+    # Jobs created before the token index existed are only recorded in the token's usage data
     usage_data = token_usage_dict.get(user["token"], {"jobs": []})
-    user_job_ids = [job["job_id"] for job in usage_data.get("jobs", [])]
+    return any(job["job_id"] == job_id for job in usage_data.get("jobs", []))
+
+
+# Event streams end after this long and the client reconnects with Last-Event-ID, so no request runs for hours
+EVENT_STREAM_SECONDS = 10 * 60
+EVENT_STREAM_KEEPALIVE_SECONDS = 15
+
+
+def format_server_sent_event(event: Dict[str, Any]) -> str:
+    lines = []
+    if event["id"]:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps({'job_id': event['job_id'], **event['data']})}")
+    return "\n".join(lines) + "\n\n"
+
 
-    return job_id in user_job_ids
+@api_app.get("/api/events")
+async def stream_job_events(
+    request: Request, user: dict = Depends(authenticate_user_or_token), job_id: Optional[str] = None, last_event_id: Optional[str] = None
+):
+    """
+    Stream status changes and new log lines of the user's jobs (or only job_id's) as server-sent events.
+
+    Events are "status" (data is the job's summary), "deleted", "log" (data has the count of lines written and the
+    latest one) and "resync", sent when events were missed and the client should reload its job list (or job's log).
+    A client reconnecting with the Last-Event-ID header (or last_event_id parameter) gets the events it missed first.
+    """
+    import asyncio
+
+    # Access checks read the job stores, so they run in a thread rather than blocking every stream on this container
+    if job_id and not await asyncio.to_thread(check_job_access, job_id, user):
+        raise HTTPException(status_code=403, detail="Access denied to this job")
+    last_event_id = request.headers.get("last-event-id") or last_event_id
+
+    # Access checks are cached per stream; denials are re-checked later, as a new job's events can arrive before it's indexed
+    access_checked_at = {}
+
+    async def is_visible(event):
+        # Events without a job (resync) are for every stream, including job-scoped ones
+        if event["job_id"] is None:
+            return True
+        if job_id:
+            return event["job_id"] == job_id
+        allowed, checked_at = access_checked_at.get(event["job_id"], (False, 0))
+        if not allowed and time.time() - checked_at > 30:
+            allowed = await asyncio.to_thread(check_job_access, event["job_id"], user)
+            access_checked_at[event["job_id"]] = (allowed, time.time())
+        return allowed
+
+    async def event_stream():
+        # Subscribe before reading missed events, so nothing published in between is lost
+        queue = job_event_hub.subscribe()
+        delivered = set()
+        try:
+            yield "retry: 3000\n\n"
+            if last_event_id:
+                missed = await asyncio.to_thread(job_event_log.events_since, last_event_id)
+                if missed is None:
+                    yield format_server_sent_event({"id": None, "type": "resync", "job_id": None, "data": {}})
+                for event in missed or []:
+                    if await is_visible(event):
+                        delivered.add(event["id"])
+                        yield format_server_sent_event(event)
+
+            stream_ends_at = time.monotonic() + EVENT_STREAM_SECONDS
+            while time.monotonic() < stream_ends_at and not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENT_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event["id"] in delivered or not await is_visible(event):
+                    continue
+                delivered.add(event["id"])
+                yield format_server_sent_event(event)
+        finally:
+            job_event_hub.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @api_app.get("/api/jobs/{job_id}")
 async def get_job_status(job_id: str, user: dict = Depends(authenticate_user)):
     """Get status of a specific job with timeline information."""
     try:
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -3297,7 +3442,7 @@ async def get_job_status(job_id: str, user: dict = Depends(authenticate_user)):
                 "started_at": job_data.get("created_at"),
             }
 
-        return JSONResponse({**job_data, "timeline_summary": timeline_summary})
+        return JSONResponse({**job_data, **job_progress_details(job_id, job_data), "timeline_summary": timeline_summary})
     except HTTPException:
         raise
     except Exception as e:
@@ -3308,7 +3453,7 @@ async def get_job_status(job_id: str, user: dict = Depends(authenticate_user)):
 async def get_job_timeline(job_id: str, user: dict = Depends(authenticate_user)):
     """Get detailed timeline data for a specific job."""
     try:
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -3463,7 +3608,7 @@ def _estimate_remaining_time(timeline: List[Dict], current_status: str) -> Optio
 async def delete_job(job_id: str, user: dict = Depends(authenticate_user)):
     """Delete a specific job."""
     try:
-        if job_id not in job_status_dict:
+        if job_id not in job_store:
             raise HTTPException(status_code=404, detail="Job not found")
 
         # Check if user has access to this job
@@ -3471,7 +3616,8 @@ async def delete_job(job_id: str, user: dict = Depends(authenticate_user)):
             raise HTTPException(status_code=403, detail="Access denied to this job")
 
         # Remove from status
-        del job_status_dict[job_id]
+        job_store.delete(job_id)
+        clear_job_progress_details(job_id)
         # Note: Logs are now stored in Modal's native logging, no cleanup needed
 
         return JSONResponse({"status": "success", "message": f"Job {job_id} deleted"})
@@ -3487,7 +3633,7 @@ async def retry_job(job_id: str, user: dict = Depends(authenticate_user)):
     from pathlib import Path
 
     try:
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -3522,7 +3668,8 @@ async def retry_job(job_id: str, user: dict = Depends(authenticate_user)):
             # This was a file upload job - use process_part_one_uploaded
             artist = job_data.get("artist", "Unknown")
             title = job_data.get("title", "Unknown")
-            audio_file_path = f"/output/{job_id}/uploaded.flac"  # Standard upload path
+            # Uploads keep their original extension; the job's filename records which one
+            audio_file_path = f"/output/{job_id}/{job_data['filename']}"
             styles_file_path = job_data.get("styles_file_path")
             styles_archive_path = f"/output/{job_id}/styles_archive.zip" if Path(f"/output/{job_id}/styles_archive.zip").exists() else None
 
@@ -3567,8 +3714,8 @@ async def get_all_logs(
 ):
     """Get logs for all jobs by querying Modal directly (admin only)."""
     try:
-        # Get all jobs and their associated container info
-        all_jobs = dict(job_status_dict.items())
+        # Get all jobs' summaries; only jobs without a log file read their full record, for its timeline
+        all_jobs, _ = job_store.all_summaries()
         
         logs_by_job = {}
         
@@ -3602,32 +3749,40 @@ async def get_job_logs(
     exclude: str = "",
     level: str = "",
     limit: int = 1000,
-    regex: bool = False
+    regex: bool = False,
+    cursor: Optional[int] = None
 ):
-    """Get logs for a specific job by querying Modal directly."""
+    """
+    Get logs for a specific job by querying Modal directly.
+
+    Pass the next_cursor of a previous response as cursor to get only the log lines written since, so tailing a log
+    doesn't re-read all of it. next_cursor is null when the job has no log file yet.
+    """
     try:
         # Check if user has access to this job
         if not check_job_access(job_id, user):
             raise HTTPException(status_code=403, detail="Access denied to this job")
 
         # Get job data to find associated containers
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
         # Get logs from Modal with filtering
-        logs = await get_modal_logs_for_job(
+        logs, next_cursor = await read_job_logs(
             job_id, job_data,
             include_filter=include,
             exclude_filter=exclude, 
             level_filter=level,
             limit=limit,
-            use_regex=regex
+            use_regex=regex,
+            cursor=cursor
         )
         
         # Return logs with metadata about filtering
         return JSONResponse({
             "logs": logs,
+            "next_cursor": next_cursor,
             "total_count": len(logs),
             "filters_applied": {
                 "include": include,
@@ -3689,23 +3844,16 @@ async def get_raw_job_logs(job_id: str, user: dict = Depends(authenticate_user))
 async def get_stats(user: dict = Depends(authenticate_user)):
     """Get statistics about jobs accessible to the user."""
     try:
-        all_jobs = dict(job_status_dict.items())
-
-        # For admin users, show stats for all jobs
-        if user["user_type"] == UserType.ADMIN:
-            jobs = all_jobs
-        else:
-            # For regular users, only show stats for their jobs
-            usage_data = token_usage_dict.get(user["token"], {"jobs": []})
-            user_job_ids = [job["job_id"] for job in usage_data.get("jobs", [])]
-            jobs = {job_id: job_data for job_id, job_data in all_jobs.items() if job_id in user_job_ids}
+        # Admins get stats for all jobs, regular users for their own, read from the maintained status counts
+        is_admin = user["user_type"] == UserType.ADMIN
+        status_counts = job_store.status_counts_for(None if is_admin else user["token"])
 
         stats = {
-            "total": len(jobs),
-            "processing": len([j for j in jobs.values() if j.get("status") in ["queued", "processing_audio", "transcribing", "rendering"]]),
-            "awaiting_review": len([j for j in jobs.values() if j.get("status") == "awaiting_review"]),
-            "complete": len([j for j in jobs.values() if j.get("status") == "complete"]),
-            "error": len([j for j in jobs.values() if j.get("status") == "error"]),
+            "total": sum(status_counts.values()),
+            "processing": sum(status_counts.get(status, 0) for status in ["queued", "processing_audio", "transcribing", "rendering"]),
+            "awaiting_review": status_counts.get("awaiting_review", 0),
+            "complete": status_counts.get("complete", 0),
+            "error": status_counts.get("error", 0),
         }
 
         # Add user-specific stats
@@ -3721,7 +3869,7 @@ async def get_stats(user: dict = Depends(authenticate_user)):
 async def get_lyrics_for_review(job_id: str):
     """Get lyrics data for review interface."""
     try:
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -3777,7 +3925,7 @@ async def get_lyrics_for_review(job_id: str):
 async def start_review(job_id: str):
     """Start the review process for a specific job."""
     try:
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -3812,7 +3960,7 @@ def get_base_api_url() -> str:
 async def download_video(job_id: str, request: Request, user: dict = Depends(authenticate_user_or_token)):
     """Download the Final Karaoke Lossy 4k MP4 video."""
     try:
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -3855,7 +4003,7 @@ async def get_audio_file(job_id: str):
         import shutil
         import tempfile
 
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -3925,7 +4073,7 @@ async def generate_preview_video(job_id: str, request: Request):
     try:
         log_message(job_id, "INFO", f"🎬 [STAGE 1] Preview video request received at {datetime.datetime.now().isoformat()}")
         
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -3969,7 +4117,7 @@ async def get_audio_by_hash(job_id: str, audio_hash: str):
         from pathlib import Path
         import hashlib
 
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -4058,7 +4206,7 @@ async def get_preview_video(job_id: str, preview_hash: str):
         except Exception as e:
             log_message(job_id, "WARNING", f"📁 [STAGE 4] Preview volume reload failed: {str(e)} - proceeding anyway")
 
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -4199,13 +4347,12 @@ async def add_lyrics(job_id: str, request: Request):
 async def clear_error_jobs(admin: dict = Depends(authenticate_admin)):
     """Clear all jobs with error status."""
     try:
-        jobs_to_delete = []
-        for job_id, job_data in job_status_dict.items():
-            if job_data.get("status") == "error":
-                jobs_to_delete.append(job_id)
+        all_jobs, _ = job_store.all_summaries()
+        jobs_to_delete = [job_id for job_id, job_summary in all_jobs.items() if job_summary.get("status") == "error"]
 
         for job_id in jobs_to_delete:
-            del job_status_dict[job_id]
+            job_store.delete(job_id)
+            clear_job_progress_details(job_id)
             # Note: Logs are now stored in Modal's native logging, no cleanup needed
 
         return JSONResponse({"status": "success", "message": f"Cleared {len(jobs_to_delete)} error jobs"})
@@ -4213,6 +4360,57 @@ async def clear_error_jobs(admin: dict = Depends(authenticate_admin)):
         return JSONResponse({"error": str(e)}, status_code=500)
 
 
+def rebuild_job_store_index():
+    """
+    Rebuild job summaries and the per-token job index from the full job records and token usage, and record that
+    the index has been built. Returns (number of jobs, number of tokens).
+    """
+    token_jobs = {
+        token: {job["job_id"]: job.get("created_at", 0) for job in usage_data.get("jobs", [])}
+        for token, usage_data in token_usage_dict.items()
+    }
+    count = job_store.rebuild(token_jobs)
+    system_config_dict[JOB_INDEX_BUILT_KEY] = datetime.datetime.now().isoformat()
+    return count, len(token_jobs)
+
+
+def ensure_job_store_index():
+    """
+    Backfill job summaries and the token index the first time an API container starts after they were introduced,
+    so jobs stored before then show up in job lists and stats without an admin rebuilding the index by hand.
+    """
+    if system_config_dict.get(JOB_INDEX_BUILT_KEY):
+        return
+    try:
+        count, token_count = rebuild_job_store_index()
+        print(f"Backfilled job summaries for {count} jobs and indexed jobs for {token_count} tokens")
+    except Exception as e:
+        # Serve requests anyway; the next container start (or an admin rebuild) tries again
+        print(f"Could not backfill job summaries and token index: {e}")
+
+
+@api_app.post("/api/admin/rebuild-job-index")
+async def rebuild_job_index(admin: dict = Depends(authenticate_admin)):
+    """Rebuild job summaries and the per-token job index from the full job records and token usage (admin only)."""
+    import asyncio
+
+    try:
+        count, token_count = await asyncio.to_thread(rebuild_job_store_index)
+        return JSONResponse({"status": "success", "message": f"Rebuilt summaries for {count} jobs and indexed jobs for {token_count} tokens"})
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@api_app.post("/api/admin/reconcile-job-stats")
+async def reconcile_job_stats(admin: dict = Depends(authenticate_admin)):
+    """Recount job status counts from the job summaries, correcting any drift (admin only)."""
+    try:
+        status_counts = job_store.reconcile_status_counts()
+        return JSONResponse({"status": "success", "status_counts": status_counts})
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
 @api_app.get("/api/admin/cache/stats")
 async def get_cache_stats(admin: dict = Depends(authenticate_admin)):
     """Get cache statistics and usage information."""
@@ -4266,6 +4464,11 @@ async def get_cache_stats(admin: dict = Depends(authenticate_admin)):
         stats["total_size_mb"] = round(actual_total_size / 1024 / 1024, 2)
         stats["total_size_gb"] = round(actual_total_size / 1024 / 1024 / 1024, 2)
 
+        # Separated stems live in their own subdirectory with size-bounded eviction and hit/miss counters
+        from karaoke_gen.stem_cache import StemCache
+
+        stats["stem_cache"] = StemCache(STEM_CACHE_DIR).stats()
+
         return JSONResponse(stats)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
@@ -4380,8 +4583,8 @@ async def delete_audioshake_cache(audio_hash: str, admin: dict = Depends(authent
 async def export_logs(admin: dict = Depends(authenticate_admin)):
     """Export all job data and detailed logs as JSON file."""
     try:
-        # Get all jobs
-        all_jobs = dict(job_status_dict.items())
+        # Get all jobs, in full since this is an export
+        all_jobs = dict(job_store.jobs.items())
         
         # Get logs for all jobs from local log files
         logs_by_job = {}
@@ -4515,7 +4718,7 @@ async def get_correction_data(job_id: str):
         # CRITICAL: Reload the volume to see files written by other containers
         output_volume.reload()
 
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -4608,7 +4811,7 @@ async def get_correction_data(job_id: str):
 async def complete_review(job_id: str, request: Request):
     """Complete the review process with corrected lyrics data (Phase 2 - video generation only)."""
     try:
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -4664,7 +4867,7 @@ async def complete_review(job_id: str, request: Request):
                 "selected_instrumental": selected_instrumental,
                 "upload_to_youtube": upload_to_youtube
             }
-            job_status_dict[job_id] = job_data
+            job_store.save(job_id, job_data)
             log_message(job_id, "INFO", "Stored finalization options for Phase 3")
 
         # Spawn Phase 2 to generate the "With Vocals" video only
@@ -4683,7 +4886,7 @@ async def complete_review(job_id: str, request: Request):
 async def finalize_with_instrumental(job_id: str, request: Request):
     """Complete Phase 3 (finalization) with selected instrumental and YouTube upload decision."""
     try:
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -4709,7 +4912,7 @@ async def finalize_with_instrumental(job_id: str, request: Request):
             "selected_instrumental": selected_instrumental,
             "upload_to_youtube": upload_to_youtube
         }
-        job_status_dict[job_id] = job_data
+        job_store.save(job_id, job_data)
 
         # Spawn Phase 3 to generate final formats with selected instrumental
         # Pass the selected instrumental as a parameter for backward compatibility
@@ -4728,6 +4931,15 @@ async def finalize_with_instrumental(job_id: str, request: Request):
 # For now, we're using a simpler approach where the review interface handles everything client-side
 
 
+def uploaded_audio_path(output_dir: Path, original_filename: Optional[str]) -> Path:
+    """Where to save an uploaded audio file, keeping its real extension so format detection and conversion see it."""
+    extension = Path(original_filename or "").suffix.lower()
+    # Only keep plain extensions from the client-supplied name; anything else is left for ffprobe to identify
+    if not (2 <= len(extension) <= 6 and extension[1:].isalnum()):
+        extension = ".bin"
+    return output_dir / f"uploaded{extension}"
+
+
 @api_app.post("/api/submit-file")
 async def submit_file(
     audio_file: UploadFile = File(...),
@@ -4751,7 +4963,7 @@ async def submit_file(
         output_dir.mkdir(parents=True, exist_ok=True)
 
         # Save audio file
-        audio_file_path = output_dir / "uploaded.flac"
+        audio_file_path = uploaded_audio_path(output_dir, audio_file.filename)
         with open(audio_file_path, "wb") as buffer:
             shutil.copyfileobj(audio_file.file, buffer)
 
@@ -4838,6 +5050,7 @@ def api_endpoint():
     Expose the FastAPI application as a web endpoint for API access.
     Frontend is served separately via GitHub Pages.
     """
+    ensure_job_store_index()
     return api_app
 
 
@@ -4864,7 +5077,7 @@ def add_lyrics_source(job_id: str, source: str, lyrics_text: str):
         log_message(job_id, "INFO", f"Adding lyrics source '{source}' with {len(lyrics_text)} characters")
 
         # Get job data
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise Exception(f"Job {job_id} not found")
 
@@ -4923,6 +5136,8 @@ def add_lyrics_source(job_id: str, source: str, lyrics_text: str):
             root_logger = logging.getLogger()
             if 'log_handler' in locals():
                 root_logger.removeHandler(log_handler)
+                # Write out the job's buffered log lines before the container can exit
+                log_handler.close()
         except:
             pass
 
@@ -4932,7 +5147,7 @@ async def get_available_instrumentals(job_id: str):
     """Get list of available instrumental files for a job."""
     track_output_dir = None  # Initialize to avoid UnboundLocalError
     try:
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -5039,7 +5254,7 @@ async def get_visualization_image(job_id: str, viz_type: str, filename: str):
         time.sleep(0.1)  # Brief pause to allow volume reload to complete
         output_volume.reload()
 
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -5131,7 +5346,7 @@ async def debug_visualizations(job_id: str):
         time.sleep(0.1)
         output_volume.reload()
         
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -5166,7 +5381,7 @@ async def debug_visualizations(job_id: str):
 async def get_backing_vocals_preview(job_id: str, filename: str):
     """Get backing vocals audio file for preview."""
     try:
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -5244,7 +5459,7 @@ def generate_preview_video_modal(job_id: str, updated_data: Dict[str, Any]):
         config_prep_start = time.time()
         log_message(job_id, "INFO", f"⚙️ [STAGE 2] Starting config preparation at {datetime.datetime.now().isoformat()}")
         
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise Exception(f"Job {job_id} not found")
 
@@ -5393,6 +5608,8 @@ def generate_preview_video_modal(job_id: str, updated_data: Dict[str, Any]):
             root_logger = logging.getLogger()
             if 'log_handler' in locals():
                 root_logger.removeHandler(log_handler)
+                # Write out the job's buffered log lines before the container can exit
+                log_handler.close()
         except:
             pass
 
@@ -5405,7 +5622,7 @@ async def list_job_files(job_id: str, user: dict = Depends(authenticate_user)):
         # Reload volume to see files from other containers
         output_volume.reload()
 
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -5549,7 +5766,7 @@ async def download_job_file(job_id: str, file_path: str, request: Request, user:
         # Reload volume to see files from other containers
         output_volume.reload()
 
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -5600,7 +5817,7 @@ async def create_job_zip(job_id: str, request: Request, user: dict = Depends(aut
         # Reload volume to see files from other containers
         output_volume.reload()
 
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -5713,7 +5930,7 @@ def update_job_status_with_timeline(job_id: str, new_status: str, progress: int
     current_time = datetime.datetime.now().isoformat()
 
     # Get existing job data
-    job_data = job_status_dict.get(job_id, {})
+    job_data = job_store.get(job_id, {})
 
     # Initialize timeline if it doesn't exist
     if "timeline" not in job_data:
@@ -5742,10 +5959,34 @@ def update_job_status_with_timeline(job_id: str, new_status: str, progress: int
         total_duration = int((datetime.datetime.now() - job_started).total_seconds())
         updated_job_data["total_duration_seconds"] = total_duration
 
-    job_status_dict[job_id] = updated_job_data
+    job_store.save(job_id, updated_job_data)
     return updated_job_data
 
 
+def update_job_progress_details(job_id: str, status: str, **details):
+    """
+    Record live progress details of a job's status phase, without touching the job record or its timeline.
+
+    Progress is stored apart from the job so a report racing a status change (e.g. to error) can't put the old
+    status back; get_job_status only shows details recorded for the job's current status.
+    """
+    job_progress_dict[job_id] = {**details, "status": status, "updated_at": datetime.datetime.now().isoformat()}
+
+
+def clear_job_progress_details(job_id: str):
+    if job_id in job_progress_dict:
+        del job_progress_dict[job_id]
+
+
+def job_progress_details(job_id: str, job_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Live progress details recorded for the job's current status, if any."""
+    progress_details = dict(job_progress_dict.get(job_id) or {})
+    if progress_details.pop("status", None) != job_data.get("status"):
+        return {}
+    progress_details.pop("updated_at", None)
+    return progress_details
+
+
 def get_job_timeline_summary(job_data: Dict[str, Any]) -> Dict[str, Any]:
     """Generate a summary of job timeline data."""
     timeline = job_data.get("timeline", [])
@@ -5811,32 +6052,42 @@ async def get_modal_logs_for_job(
     use_regex: bool = False
 ) -> List[Dict[str, Any]]:
     """Get detailed job logs from local log file plus timeline information with server-side filtering."""
+    log_entries, _ = await read_job_logs(job_id, job_data, include_filter, exclude_filter, level_filter, limit, use_regex)
+    return log_entries
+
+
+async def read_job_logs(
+    job_id: str,
+    job_data: Dict[str, Any],
+    include_filter: str = "",
+    exclude_filter: str = "",
+    level_filter: str = "",
+    limit: int = 1000,
+    use_regex: bool = False,
+    cursor: Optional[int] = None,
+):
+    """
+    Read a job's logs with server-side filtering, returning (log_entries, next_cursor).
+
+    Without a cursor, returns the last limit matching entries of the job's log file, or entries made up from the job's
+    timeline if it has no log file (next_cursor is then None). With a cursor (a byte offset from a previous read), only
+    the log lines written since are read. Either way the entries end with the job's current status (and error), which
+    are marked "source": "status" so clients appending new lines can replace them.
+    """
     from datetime import datetime
-    import re
     import asyncio
     
+    log_file_path = Path(f"/output/{job_id}/job_logs.jsonl")
+    matches = make_log_filter(include_filter, exclude_filter, level_filter, use_regex)
     log_entries = []
+    next_cursor = None
     
     # First, try to read detailed logs from the local log file
     try:
-        # CRITICAL: Reload volume and wait a moment for sync to complete
+        # Reload the volume to see lines written by the worker containers since the last read
         output_volume.reload()
-        await asyncio.sleep(0.5)  # Give volume sync time to complete
-        
-        log_file_path = Path(f"/output/{job_id}/job_logs.jsonl")
-        
-        if log_file_path.exists():
-            with open(log_file_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        try:
-                            log_entry = json.loads(line)
-                            log_entries.append(log_entry)
-                        except json.JSONDecodeError:
-                            # Skip malformed lines
-                            continue
-        
+        if log_file_path.exists() and log_file_path.stat().st_size > 0:
+            log_entries, next_cursor = await asyncio.to_thread(read_log_entries, log_file_path, cursor, limit, matches)
     except Exception as e:
         # If we can't read the log file, add an error entry
         log_entries.append({
@@ -5846,64 +6097,93 @@ async def get_modal_logs_for_job(
         })
     
     # If we don't have any detailed logs, fall back to timeline-based logs
-    if not log_entries or len(log_entries) <= 1:  # Only header or empty
-        log_entries = []
+    if next_cursor is None:
+        # Summaries leave out the timeline, which only the full job record has
+        timeline_job_data = job_data if "timeline" in job_data else (job_store.get(job_id) or job_data)
+        log_entries = [log_entry for log_entry in timeline_log_entries(timeline_job_data) if matches(log_entry)]
+    
+    status_entries = [log_entry for log_entry in current_status_log_entries(job_data) if matches(log_entry)]
+    
+    # File entries are already in order; made up entries are sorted by timestamp (oldest first)
+    if next_cursor is None:
+        log_entries = sorted(log_entries + status_entries, key=lambda x: x["timestamp"])
+    else:
+        log_entries = log_entries + status_entries
+    
+    # Apply limit (get most recent entries if limit is specified)
+    if limit > 0 and len(log_entries) > limit:
+        log_entries = log_entries[-limit:]
+    
+    return log_entries, next_cursor
+
+
+def timeline_log_entries(job_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Log entries made up from a job's creation info and timeline, for jobs without a log file."""
+    log_entries = []
+    
+    # Add job creation info  
+    if job_data.get("created_at"):
+        artist = job_data.get("artist", "Unknown")
+        title = job_data.get("title", "Unknown")
+        log_entries.append({
+            "timestamp": job_data["created_at"],
+            "level": "INFO",
+            "message": f"🎵 Job created: {artist} - {title}"
+        })
         
-        # Add job creation info  
-        if job_data.get("created_at"):
-            artist = job_data.get("artist", "Unknown")
-            title = job_data.get("title", "Unknown")
+        # Add URL or filename info
+        if job_data.get("url"):
+            log_entries.append({
+                "timestamp": job_data["created_at"],
+                "level": "INFO", 
+                "message": f"🔗 Source: {job_data['url']}"
+            })
+        elif job_data.get("filename"):
             log_entries.append({
                 "timestamp": job_data["created_at"],
                 "level": "INFO",
-                "message": f"🎵 Job created: {artist} - {title}"
+                "message": f"📁 Uploaded file: {job_data['filename']}"
             })
-            
-            # Add URL or filename info
-            if job_data.get("url"):
-                log_entries.append({
-                    "timestamp": job_data["created_at"],
-                    "level": "INFO", 
-                    "message": f"🔗 Source: {job_data['url']}"
-                })
-            elif job_data.get("filename"):
-                log_entries.append({
-                    "timestamp": job_data["created_at"],
-                    "level": "INFO",
-                    "message": f"📁 Uploaded file: {job_data['filename']}"
-                })
+    
+    # Add timeline entries
+    timeline = job_data.get("timeline", [])
+    for phase in timeline:
+        status = phase["status"]
+        started_at = phase["started_at"]
+        ended_at = phase.get("ended_at")
+        duration = phase.get("duration_seconds")
         
-        # Add timeline entries
-        timeline = job_data.get("timeline", [])
-        for phase in timeline:
-            status = phase["status"]
-            started_at = phase["started_at"]
-            ended_at = phase.get("ended_at")
-            duration = phase.get("duration_seconds")
-            
-            # Status start message
-            status_emoji = {
-                "queued": "⏳", "processing": "⚙️", "awaiting_review": "👀",
-                "reviewing": "✏️", "ready_for_finalization": "🎬", "rendering": "🎨",
-                "finalizing": "🎯", "complete": "✅", "error": "❌"
-            }.get(status, "📝")
-            
+        # Status start message
+        status_emoji = {
+            "queued": "⏳", "processing": "⚙️", "awaiting_review": "👀",
+            "reviewing": "✏️", "ready_for_finalization": "🎬", "rendering": "🎨",
+            "finalizing": "🎯", "complete": "✅", "error": "❌"
+        }.get(status, "📝")
+        
+        log_entries.append({
+            "timestamp": started_at,
+            "level": "INFO",
+            "message": f"{status_emoji} Phase started: {status.replace('_', ' ').title()}"
+        })
+        
+        # Status end message with duration
+        if ended_at and duration is not None:
+            duration_str = format_duration(duration)
             log_entries.append({
-                "timestamp": started_at,
-                "level": "INFO",
-                "message": f"{status_emoji} Phase started: {status.replace('_', ' ').title()}"
+                "timestamp": ended_at,
+                "level": "INFO", 
+                "message": f"✓ Phase completed: {status.replace('_', ' ').title()} ({duration_str})"
             })
-            
-            # Status end message with duration
-            if ended_at and duration is not None:
-                duration_str = format_duration(duration)
-                log_entries.append({
-                    "timestamp": ended_at,
-                    "level": "INFO", 
-                    "message": f"✓ Phase completed: {status.replace('_', ' ').title()} ({duration_str})"
-                })
     
-    # Always add current status at the end
+    return log_entries
+
+
+def current_status_log_entries(job_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Log entries describing a job's current status and error."""
+    from datetime import datetime
+    
+    log_entries = []
+    
     current_status = job_data.get("status", "unknown")
     progress = job_data.get("progress", 0)
     last_updated = job_data.get("last_updated", datetime.now().isoformat())
@@ -5917,7 +6197,8 @@ async def get_modal_logs_for_job(
     log_entries.append({
         "timestamp": last_updated,
         "level": "INFO",
-        "message": f"{status_emoji} Current Status: {current_status.replace('_', ' ').title()} ({progress}%)"
+        "message": f"{status_emoji} Current Status: {current_status.replace('_', ' ').title()} ({progress}%)",
+        "source": "status",
     })
     
     # Add error info if present
@@ -5925,97 +6206,18 @@ async def get_modal_logs_for_job(
         log_entries.append({
             "timestamp": last_updated,
             "level": "ERROR",
-            "message": f"❌ Error: {job_data['error']}"
+            "message": f"❌ Error: {job_data['error']}",
+            "source": "status",
         })
     
-    # Sort by timestamp (oldest first for chronological order)
-    log_entries.sort(key=lambda x: x["timestamp"])
-    
-    # Apply server-side filtering
-    filtered_entries = apply_server_side_log_filters(
-        log_entries, include_filter, exclude_filter, level_filter, use_regex
-    )
-    
-    # Apply limit (get most recent entries if limit is specified)
-    if limit > 0 and len(filtered_entries) > limit:
-        filtered_entries = filtered_entries[-limit:]
-    
-    return filtered_entries
-
-
-def apply_server_side_log_filters(
-    log_entries: List[Dict[str, Any]], 
-    include_filter: str, 
-    exclude_filter: str, 
-    level_filter: str, 
-    use_regex: bool
-) -> List[Dict[str, Any]]:
-    """Apply server-side filtering to log entries."""
-    import re
-    
-    filtered_entries = []
-    
-    # Define log levels in order from lowest to highest severity
-    log_levels = {
-        'DEBUG': 0,
-        'INFO': 1,
-        'WARNING': 2,
-        'ERROR': 3,
-        'CRITICAL': 4
-    }
-    
-    for log_entry in log_entries:
-        # Level filtering (show selected level and above)
-        if level_filter:
-            entry_level = log_entry.get("level", "INFO")
-            entry_level_value = log_levels.get(entry_level, 1)
-            selected_level_value = log_levels.get(level_filter, 1)
-            
-            if entry_level_value < selected_level_value:
-                continue
-        
-        # Combine searchable text
-        search_text = f"{log_entry.get('level', '')} {log_entry.get('message', '')}".lower()
-        
-        # Apply exclude filter first
-        if exclude_filter:
-            try:
-                if use_regex:
-                    if re.search(exclude_filter, search_text, re.IGNORECASE):
-                        continue
-                else:
-                    if exclude_filter.lower() in search_text:
-                        continue
-            except re.error:
-                # If regex is invalid, fall back to string matching
-                if exclude_filter.lower() in search_text:
-                    continue
-        
-        # Apply include filter
-        if include_filter:
-            try:
-                if use_regex:
-                    if not re.search(include_filter, search_text, re.IGNORECASE):
-                        continue
-                else:
-                    if include_filter.lower() not in search_text:
-                        continue
-            except re.error:
-                # If regex is invalid, fall back to string matching
-                if include_filter.lower() not in search_text:
-                    continue
-        
-        # If we reach here, the entry passed all filters
-        filtered_entries.append(log_entry)
-    
-    return filtered_entries
+    return log_entries
 
 
 @api_app.get("/api/corrections/{job_id}/instrumental-preview/{filename}")
 async def get_instrumental_preview(job_id: str, filename: str):
     """Get instrumental audio file for preview."""
     try:
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
 
@@ -6088,7 +6290,7 @@ async def clone_job(job_id: str, request: CloneJobRequest, admin: dict = Depends
 async def get_clone_info(job_id: str, admin: dict = Depends(authenticate_admin)):
     """Get information about available clone points for a job (admin only)."""
     try:
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
         
@@ -6159,7 +6361,7 @@ def clone_job_at_phase(source_job_id: str, target_phase: str):
         log_message(new_job_id, "INFO", f"Cloning job {source_job_id} at phase {target_phase}")
         
         # Get source job data
-        source_job_data = job_status_dict.get(source_job_id)
+        source_job_data = job_store.get(source_job_id)
         if not source_job_data:
             raise Exception(f"Source job {source_job_id} not found")
         
@@ -6261,7 +6463,7 @@ def clone_job_at_phase(source_job_id: str, target_phase: str):
         }]
         
         # Store cloned job data
-        job_status_dict[new_job_id] = clone_data
+        job_store.save(new_job_id, clone_data)
         
         # Clone job logging will be handled by Modal's native logging
         # Initial clone message will appear in Modal logs
@@ -6302,6 +6504,8 @@ def clone_job_at_phase(source_job_id: str, target_phase: str):
             root_logger = logging.getLogger()
             if 'log_handler' in locals():
                 root_logger.removeHandler(log_handler)
+                # Write out the job's buffered log lines before the container can exit
+                log_handler.close()
         except:
             pass
 
@@ -6333,7 +6537,7 @@ async def resume_job_at_phase(job_id: str, request: dict, admin: dict = Depends(
         if not target_phase:
             raise HTTPException(status_code=400, detail="target_phase is required")
         
-        job_data = job_status_dict.get(job_id)
+        job_data = job_store.get(job_id)
         if not job_data:
             raise HTTPException(status_code=404, detail="Job not found")
         
@@ -6382,10 +6586,10 @@ async def manual_status_update(job_id: str, request: ManualStatusUpdateRequest,
     """Manually update job status with timeline tracking (admin only)."""
     try:
         # Check if job exists
-        if job_id not in job_status_dict:
+        if job_id not in job_store:
             return JSONResponse({"success": False, "message": f"Job {job_id} not found"}, status_code=404)
         
-        old_job_data = job_status_dict.get(job_id, {})
+        old_job_data = job_store.get(job_id, {})
         old_status = old_job_data.get("status", "unknown")
         
         # Prepare additional data, ensuring we don't override critical fields
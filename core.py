@@ -40,9 +40,11 @@ class ServerlessKaraokeProcessor:
     Uses the same code path as the CLI for consistency.
     """
     
-    def __init__(self, model_dir: str = "/models", output_dir: str = "/output"):
+    def __init__(self, model_dir: str = "/models", output_dir: str = "/output", stem_cache_dir: Optional[str] = None):
         self.model_dir = model_dir
         self.output_dir = output_dir
+        # Persistent stem cache shared by all jobs, so re-submitted audio skips separation
+        self.stem_cache_dir = stem_cache_dir
         # Use the logger from this module - job-specific logging will be set up externally
         self.logger = logging.getLogger(__name__)
     
@@ -141,6 +143,7 @@ class ServerlessKaraokeProcessor:
                 other_stems_models=["htdemucs_6s.yaml"],
                 model_file_dir=self.model_dir,
                 existing_instrumental=None,
+                stem_cache_dir=self.stem_cache_dir,
                 skip_separation=False,
                 lyrics_artist=artist,
                 lyrics_title=title,
@@ -319,6 +322,7 @@ class ServerlessKaraokeProcessor:
                     other_stems_models=["htdemucs_6s.yaml"],
                     model_file_dir=self.model_dir,
                     existing_instrumental=None,
+                    stem_cache_dir=self.stem_cache_dir,
                     skip_separation=False,
                     lyrics_artist=None,
                     lyrics_title=None,
@@ -4,6 +4,11 @@ const API_BASE_URL = 'https://nomadkaraoke--karaoke-generator-webapp-api-endpoin
 // Global state
 let autoRefreshInterval = null;
 let logTailInterval = null;
+let jobEventSource = null; // Server-sent job status stream, used instead of auto-refresh polling when available
+let logEventSource = null; // Server-sent stream of the tailed job's events
+let logTailReloadTimeout = null;
+let jobsRenderTimeout = null;
+let currentJobs = {}; // Latest job summaries, kept up to date by the job event stream
 let currentTailJobId = null;
 let logFontSizeIndex = 2; // Default to 'font-md'
 let autoScrollEnabled = false;
@@ -1574,19 +1579,28 @@ function startAutoRefresh() {
         return;
     }
     
-    if (autoRefreshInterval) {
+    if (autoRefreshInterval || jobEventSource) {
         console.log('Auto-refresh already running');
         return; // Already running
     }
     
-    console.log('Starting auto-refresh (5s intervals)');
-    
     // Add visual indicator
     const autoRefreshCheckbox = document.getElementById('auto-refresh');
     if (autoRefreshCheckbox) {
         autoRefreshCheckbox.parentElement.classList.add('auto-refresh-active');
     }
     
+    // Prefer having job changes pushed by the server; poll only where server-sent events aren't available
+    if (window.EventSource) {
+        startJobEventStream();
+    } else {
+        startJobPolling();
+    }
+}
+
+function startJobPolling() {
+    console.log('Starting auto-refresh (5s intervals)');
+    
     autoRefreshInterval = setInterval(() => {
         try {
             // Check if user is still authenticated before refreshing
@@ -1610,17 +1624,74 @@ function startAutoRefresh() {
     }, 5000); // 5 second refresh
 }
 
+function startJobEventStream() {
+    console.log('Starting job event stream');
+    let opened = false;
+    
+    jobEventSource = new EventSource(`${API_BASE_URL}/events?token=${encodeURIComponent(getAuthToken())}`);
+    
+    jobEventSource.onopen = () => {
+        // Catch up on anything that changed before the stream opened; reconnects resume from the last event id instead
+        if (!opened) {
+            opened = true;
+            loadJobsWithoutScroll();
+        }
+    };
+    
+    jobEventSource.addEventListener('status', event => {
+        const { job_id: jobId, ...summary } = JSON.parse(event.data);
+        currentJobs[jobId] = summary;
+        scheduleJobsRender();
+    });
+    
+    jobEventSource.addEventListener('deleted', event => {
+        delete currentJobs[JSON.parse(event.data).job_id];
+        scheduleJobsRender();
+    });
+    
+    // Sent when events were missed, e.g. after a long disconnect
+    jobEventSource.addEventListener('resync', () => loadJobsWithoutScroll());
+    
+    jobEventSource.onerror = () => {
+        // EventSource reconnects by itself unless the server refused the stream, e.g. an expired session
+        if (jobEventSource && jobEventSource.readyState === EventSource.CLOSED) {
+            console.log('Job event stream closed, falling back to polling');
+            jobEventSource = null;
+            startJobPolling();
+        }
+    };
+}
+
+function scheduleJobsRender() {
+    // Batch bursts of events into one re-render
+    if (jobsRenderTimeout) return;
+    jobsRenderTimeout = setTimeout(() => {
+        jobsRenderTimeout = null;
+        // Like polling, don't re-render the job list while tailing logs; stopLogTail renders it
+        if (currentTailJobId) return;
+        checkForJobNotifications(currentJobs);
+        updateJobsList(currentJobs);
+        updateStats(currentJobs);
+    }, 500);
+}
+
 function stopAutoRefresh() {
+    if (jobEventSource) {
+        console.log('Stopping job event stream');
+        jobEventSource.close();
+        jobEventSource = null;
+    }
+    
     if (autoRefreshInterval) {
         console.log('Stopping auto-refresh');
         clearInterval(autoRefreshInterval);
         autoRefreshInterval = null;
-        
-        // Remove visual indicator
-        const autoRefreshCheckbox = document.getElementById('auto-refresh');
-        if (autoRefreshCheckbox) {
-            autoRefreshCheckbox.parentElement.classList.remove('auto-refresh-active');
-        }
+    }
+    
+    // Remove visual indicator
+    const autoRefreshCheckbox = document.getElementById('auto-refresh');
+    if (autoRefreshCheckbox) {
+        autoRefreshCheckbox.parentElement.classList.remove('auto-refresh-active');
     }
 }
 
@@ -1645,6 +1716,7 @@ async function loadJobs() {
         }
         
         const jobs = await response.json();
+        currentJobs = jobs;
         // console.log(`Loaded ${Object.keys(jobs).length} jobs`);
         
         // Check for job state changes that require notifications
@@ -1872,7 +1944,12 @@ function getJobEndTime(job) {
         return parseServerTime(job.updated_at);
     }
     
-    // 5. Fallback to current time (shouldn't happen for finished jobs, but safety net)
+    // 5. Job summaries (which leave out the timeline) record when the job last changed status
+    if (job.last_updated) {
+        return parseServerTime(job.last_updated);
+    }
+    
+    // 6. Fallback to current time (shouldn't happen for finished jobs, but safety net)
     return new Date();
 }
 
@@ -2698,13 +2775,49 @@ function tailJobLogs(jobId) {
     
     currentTailJobId = jobId;
     
-    // Start tailing
+    // Start tailing: reload when the job logs something or changes status, or poll without server-sent events
+    if (window.EventSource) {
+        startLogEventStream(jobId);
+    } else {
+        startLogTailPolling(jobId);
+    }
+    
+    // Load initial data
+    loadLogTailData(jobId);
+}
+
+function startLogTailPolling(jobId) {
     logTailInterval = setInterval(() => {
         loadLogTailData(jobId);
     }, 2000); // Update every 2 seconds
+}
+
+function startLogEventStream(jobId) {
+    logEventSource = new EventSource(`${API_BASE_URL}/events?job_id=${encodeURIComponent(jobId)}&token=${encodeURIComponent(getAuthToken())}`);
     
-    // Load initial data
-    loadLogTailData(jobId);
+    const reload = () => scheduleLogTailReload(jobId);
+    logEventSource.addEventListener('log', reload);
+    logEventSource.addEventListener('status', reload);
+    logEventSource.addEventListener('resync', reload);
+    
+    logEventSource.onerror = () => {
+        if (logEventSource && logEventSource.readyState === EventSource.CLOSED && currentTailJobId === jobId) {
+            console.log('Log event stream closed, falling back to polling');
+            logEventSource = null;
+            startLogTailPolling(jobId);
+        }
+    };
+}
+
+function scheduleLogTailReload(jobId) {
+    // Reload at most once a second however many lines are logged
+    if (logTailReloadTimeout) return;
+    logTailReloadTimeout = setTimeout(() => {
+        logTailReloadTimeout = null;
+        if (currentTailJobId === jobId) {
+            loadLogTailData(jobId);
+        }
+    }, 1000);
 }
 
 function stopLogTail() {
@@ -2712,7 +2825,21 @@ function stopLogTail() {
         clearInterval(logTailInterval);
         logTailInterval = null;
     }
+    if (logEventSource) {
+        logEventSource.close();
+        logEventSource = null;
+    }
+    if (logTailReloadTimeout) {
+        clearTimeout(logTailReloadTimeout);
+        logTailReloadTimeout = null;
+    }
+    const wasTailing = currentTailJobId !== null;
     currentTailJobId = null;
+    
+    // The job event stream skips re-rendering while tailing, so catch up now
+    if (wasTailing && jobEventSource) {
+        scheduleJobsRender();
+    }
 }
 
 function showLogTailModal(jobId) {
@@ -7000,6 +7127,11 @@ async function fetchFilteredLogs() {
         if (logFilters.limit > 0) params.append('limit', logFilters.limit.toString());
         if (logFilters.regex) params.append('regex', 'true');
         
+        // With the same job and filters as the last fetch, only fetch the lines logged since
+        const filtersKey = JSON.stringify({ jobId: currentJobId, ...logFilters });
+        const resuming = currentLogData && currentLogData.filtersKey === filtersKey && currentLogData.next_cursor != null;
+        if (resuming) params.append('cursor', currentLogData.next_cursor.toString());
+        
         const apiUrl = `${API_BASE_URL}/logs/${currentJobId}?${params}`;
         
         // Fetch filtered logs from server using authenticated fetch
@@ -7014,6 +7146,14 @@ async function fetchFilteredLogs() {
         }
         
         const data = await response.json();
+        if (resuming && data.next_cursor != null) {
+            // Replace the previous current status lines and append the new lines, keeping the last `limit`
+            let logs = currentLogData.logs.filter(entry => entry.source !== 'status').concat(data.logs || []);
+            if (logFilters.limit > 0) logs = logs.slice(-logFilters.limit);
+            data.logs = logs;
+            data.total_count = logs.length;
+        }
+        data.filtersKey = filtersKey;
         currentLogData = data;
         
         // Store current scroll position before updating
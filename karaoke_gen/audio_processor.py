@@ -1,16 +1,20 @@
 import os
 import sys
-import json
+import time
 import logging
 import glob
 import shutil
 import tempfile
-import time
-import fcntl
-import errno
-import psutil
-from datetime import datetime
-from pydub import AudioSegment
+import threading
+import numpy as np
+import soundfile as sf
+from .model_pool import SeparatorModelPool
+from .separation_scheduler import SeparationScheduler
+from .stage_graph import StageGraph
+
+# torch's intra-op thread count is process-wide, so it's set once per process rather than around each track
+_torch_threads_lock = threading.Lock()
+_torch_threads = None
 
 
 # Placeholder class or functions for audio processing
@@ -26,6 +30,13 @@ class AudioProcessor:
         backing_vocals_models,
         other_stems_models,
         ffmpeg_base_command,
+        model_pool=None,
+        separation_scheduler=None,
+        stem_cache=None,
+        separation_threads=None,
+        max_parallel_stages=2,
+        chunk_duration=None,
+        chunk_overlap=5.0,
     ):
         self.logger = logger
         self.log_level = log_level
@@ -35,7 +46,41 @@ class AudioProcessor:
         self.clean_instrumental_model = clean_instrumental_model
         self.backing_vocals_models = backing_vocals_models
         self.other_stems_models = other_stems_models
-        self.ffmpeg_base_command = ffmpeg_base_command  # Needed for combined instrumentals
+        self.ffmpeg_base_command = ffmpeg_base_command
+
+        # Loaded separation models are kept resident in the pool and reused across stems and tracks.
+        # Callers processing many tracks (e.g. bulk CLI) pass in a shared pool so every KaraokePrep reuses it.
+        if model_pool is None:
+            model_pool = SeparatorModelPool(logger=logger, log_level=log_level, log_formatter=log_formatter)
+        self.model_pool = model_pool
+
+        # Bounded queue of concurrent separations, shared with other processes on this host via per-slot lock files
+        if separation_scheduler is None:
+            separation_scheduler = SeparationScheduler(logger=logger)
+        self.separation_scheduler = separation_scheduler
+
+        # Optional StemCache, so re-submissions of audio we've already separated skip the models entirely
+        self.stem_cache = stem_cache
+
+        # CPU thread budget for one track's separation, split between the stages that run in parallel
+        self._separation_threads = separation_threads
+        self.max_parallel_stages = max_parallel_stages
+
+        # Inputs longer than chunk_duration seconds are separated in overlapping windows, to bound peak memory
+        self.chunk_duration = chunk_duration
+        self.chunk_overlap = chunk_overlap
+
+    @property
+    def separation_threads(self):
+        if self._separation_threads is None:
+            # Each scheduler slot separates one track at a time, so a track gets its slot's share of the cores.
+            # Resolved on first use, like the scheduler's slot count it depends on.
+            self._separation_threads = max(1, (os.cpu_count() or 1) // self.separation_scheduler.max_slots)
+        return self._separation_threads
+
+    @property
+    def stage_workers(self):
+        return max(1, min(self.max_parallel_stages, self.separation_threads))
 
     def _file_exists(self, file_path):
         """Check if a file exists and log the result."""
@@ -51,20 +96,10 @@ class AudioProcessor:
         self.logger.debug(f"audio_file is valid file: {audio_file}")
 
         self.logger.info(
-            f"instantiating Separator with model_file_dir: {self.model_file_dir}, model_filename: {model_name} output_format: {self.lossless_output_format}"
+            f"Separating with model_file_dir: {self.model_file_dir}, model_filename: {model_name} output_format: {self.lossless_output_format}"
         )
 
-        from audio_separator.separator import Separator
-
-        separator = Separator(
-            log_level=self.log_level,
-            log_formatter=self.log_formatter,
-            model_file_dir=self.model_file_dir,
-            output_format=self.lossless_output_format,
-        )
-
-        separator.load_model(model_filename=model_name)
-        output_files = separator.separate(audio_file)
+        output_files = self._run_separation(model_name, audio_file)
 
         self.logger.debug(f"Separator output files: {output_files}")
 
@@ -103,104 +138,47 @@ class AudioProcessor:
 
         self.logger.info(f"Separation complete! Output file(s): {vocals_path} {instrumental_path}")
 
-    def process_audio_separation(self, audio_file, artist_title, track_output_dir):
-        from audio_separator.separator import Separator
-
+    def process_audio_separation(self, audio_file, artist_title, track_output_dir, priority=0):
         self.logger.info(f"Starting audio separation process for {artist_title}")
 
-        # Define lock file path in system temp directory
-        lock_file_path = os.path.join(tempfile.gettempdir(), "audio_separator.lock")
+        stems_dir = self._create_stems_directory(track_output_dir)
+        result = {"clean_instrumental": {}, "other_stems": {}, "backing_vocals": {}, "combined_instrumentals": {}}
 
-        # Try to acquire lock
-        while True:
-            try:
-                # First check if there's a stale lock
-                if os.path.exists(lock_file_path):
-                    try:
-                        with open(lock_file_path, "r") as f:
-                            lock_data = json.load(f)
-                            pid = lock_data.get("pid")
-                            start_time = datetime.fromisoformat(lock_data.get("start_time"))
-                            running_track = lock_data.get("track")
-
-                            # Check if process is still running
-                            if not psutil.pid_exists(pid):
-                                self.logger.warning(f"Found stale lock from dead process {pid}, removing...")
-                                os.remove(lock_file_path)
-                            else:
-                                # Calculate runtime
-                                runtime = datetime.now() - start_time
-                                runtime_mins = runtime.total_seconds() / 60
-
-                                # Get process command line
-                                try:
-                                    proc = psutil.Process(pid)
-                                    cmdline_args = proc.cmdline()
-                                    # Handle potential bytes in cmdline args (cross-platform compatibility)
-                                    cmd = " ".join(arg.decode('utf-8', errors='replace') if isinstance(arg, bytes) else arg for arg in cmdline_args)
-                                except (psutil.AccessDenied, psutil.NoSuchProcess):
-                                    cmd = "<command unavailable>"
-
-                                self.logger.info(
-                                    f"Waiting for other audio separation process to complete before starting separation for {artist_title}...\n"
-                                    f"Currently running process details:\n"
-                                    f"  Track: {running_track}\n"
-                                    f"  PID: {pid}\n"
-                                    f"  Running time: {runtime_mins:.1f} minutes\n"
-                                    f"  Command: {cmd}\n"
-                                    f"To force clear the lock and kill the process, run:\n"
-                                    f"  kill {pid} && rm {lock_file_path}"
-                                )
-                    except (json.JSONDecodeError, KeyError, ValueError) as e:
-                        self.logger.warning(f"Found invalid lock file, removing: {e}")
-                        os.remove(lock_file_path)
-
-                # Try to acquire lock
-                lock_file = open(lock_file_path, "w")
-                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
-
-                # Write metadata to lock file
-                lock_data = {
-                    "pid": os.getpid(),
-                    "start_time": datetime.now().isoformat(),
-                    "track": f"{artist_title}",
-                }
-                json.dump(lock_data, lock_file)
-                lock_file.flush()
-                break
-
-            except IOError as e:
-                if e.errno != errno.EAGAIN:
-                    raise
-                # Lock is held by another process
-                time.sleep(30)  # Wait 30 seconds before trying again
-                continue
-
-        try:
-            separator = Separator(
-                log_level=self.log_level,
-                log_formatter=self.log_formatter,
-                model_file_dir=self.model_file_dir,
-                output_format=self.lossless_output_format,
-            )
-
-            stems_dir = self._create_stems_directory(track_output_dir)
-            result = {"clean_instrumental": {}, "other_stems": {}, "backing_vocals": {}, "combined_instrumentals": {}}
-
-            if os.environ.get("KARAOKE_GEN_SKIP_AUDIO_SEPARATION"):
-                return result
+        if os.environ.get("KARAOKE_GEN_SKIP_AUDIO_SEPARATION"):
+            return result
 
-            result["clean_instrumental"] = self._separate_clean_instrumental(
-                separator, audio_file, artist_title, track_output_dir, stems_dir
+        # Wait for a free separation slot; lower priority values are scheduled first, FIFO otherwise
+        with self.separation_scheduler.slot(artist_title, priority=priority):
+            # Only backing vocals (and what follows) depend on the clean vocals, so other stems run alongside that chain
+            stages = StageGraph(logger=self.logger)
+            stages.add_stage(
+                "clean_instrumental",
+                lambda: self._separate_clean_instrumental(audio_file, artist_title, track_output_dir, stems_dir),
             )
-            result["other_stems"] = self._separate_other_stems(separator, audio_file, artist_title, stems_dir)
-            result["backing_vocals"] = self._separate_backing_vocals(
-                separator, result["clean_instrumental"]["vocals"], artist_title, stems_dir
+            stages.add_stage("other_stems", lambda: self._separate_other_stems(audio_file, artist_title, stems_dir))
+            stages.add_stage(
+                "backing_vocals",
+                lambda clean_instrumental: self._separate_backing_vocals(clean_instrumental["vocals"], artist_title, stems_dir),
+                depends_on=["clean_instrumental"],
             )
-            result["combined_instrumentals"] = self._generate_combined_instrumentals(
-                result["clean_instrumental"]["instrumental"], result["backing_vocals"], artist_title, track_output_dir
+            stages.add_stage(
+                "combined_instrumentals",
+                lambda clean_instrumental, backing_vocals: self._generate_combined_instrumentals(
+                    clean_instrumental["instrumental"], backing_vocals, artist_title, track_output_dir
+                ),
+                depends_on=["clean_instrumental", "backing_vocals"],
             )
+
+            stage_results, stage_timings = stages.run(max_workers=self.stage_workers)
+
+            result.update(stage_results)
+            normalize_start = time.monotonic()
             self._normalize_audio_files(result, artist_title, track_output_dir)
+            stage_timings["normalize"] = time.monotonic() - normalize_start
+            result["stage_timings"] = stage_timings
+            self.logger.info(
+                "Separation stage timings: " + ", ".join(f"{name}: {seconds:.1f}s" for name, seconds in stage_timings.items())
+            )
 
             # Create Audacity LOF file
             lof_path = os.path.join(stems_dir, f"{artist_title} (Audacity).lof")
@@ -233,14 +211,23 @@ class AudioProcessor:
 
             self.logger.info("Audio separation, combination, and normalization process completed")
             return result
-        finally:
-            # Release lock
-            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
-            lock_file.close()
-            try:
-                os.remove(lock_file_path)
-            except OSError:
-                pass
+
+    def _set_torch_threads(self):
+        """
+        Limit torch intra-op threads to one parallel stage's share of the track's CPU budget, so concurrent stages
+        and tracks share the cores instead of oversubscribing them. Set once, by the first separation after torch
+        is loaded, since the setting applies to the whole process.
+        """
+        global _torch_threads
+        torch = sys.modules.get("torch")
+        if torch is None or _torch_threads is not None:
+            return
+
+        with _torch_threads_lock:
+            if _torch_threads is None:
+                _torch_threads = max(1, self.separation_threads // self.stage_workers)
+                torch.set_num_threads(_torch_threads)
+                self.logger.info(f"Using {_torch_threads} torch threads per separation stage")
 
     def _create_stems_directory(self, track_output_dir):
         stems_dir = os.path.join(track_output_dir, "stems")
@@ -248,7 +235,129 @@ class AudioProcessor:
         self.logger.info(f"Created stems directory: {stems_dir}")
         return stems_dir
 
-    def _separate_clean_instrumental(self, separator, audio_file, artist_title, track_output_dir, stems_dir):
+    def _run_separation(self, model_name, audio_file):
+        """Separate audio_file with model_name, restoring the stems from the stem cache if this audio was separated before."""
+        if self.stem_cache is not None:
+            cached_files = self.stem_cache.restore(audio_file, model_name, self.lossless_output_format, os.path.dirname(os.path.abspath(audio_file)))
+            if cached_files is not None:
+                return cached_files
+
+        with self.model_pool.acquire(model_name, self.model_file_dir, self.lossless_output_format) as separator:
+            # Loading the model imported torch, if nothing had yet
+            self._set_torch_threads()
+            if self._should_separate_in_chunks(audio_file):
+                output_files = self._separate_in_chunks(separator, audio_file)
+            else:
+                output_files = self._resolve_output_files(separator, separator.separate(audio_file))
+
+        if self.stem_cache is not None:
+            try:
+                self.stem_cache.store(audio_file, model_name, self.lossless_output_format, output_files)
+            except OSError as e:
+                self.logger.warning(f"Failed to store stems in stem cache, continuing without caching: {e}")
+
+        return output_files
+
+    def _should_separate_in_chunks(self, audio_file):
+        if not self.chunk_duration:
+            return False
+        try:
+            duration = sf.info(audio_file).duration
+        except RuntimeError:
+            # Not something libsndfile can read in windows, so let the separator decode it whole
+            return False
+        return duration > self.chunk_duration
+
+    def _separate_in_chunks(self, separator, audio_file):
+        """
+        Separate audio_file in overlapping windows of chunk_duration seconds, so peak memory doesn't grow with the input's length.
+
+        Each window's stems are linearly crossfaded with the previous window's over chunk_overlap seconds and streamed
+        straight to the output files, which are named the way the separator would name them for audio_file.
+        """
+        info = sf.info(audio_file)
+        chunk_frames = int(self.chunk_duration * info.samplerate)
+        overlap_frames = min(int(self.chunk_overlap * info.samplerate), chunk_frames // 2)
+        hop_frames = chunk_frames - overlap_frames
+
+        input_base = os.path.splitext(os.path.basename(audio_file))[0]
+        output_dir = os.path.dirname(os.path.abspath(audio_file))
+        chunk_dir = tempfile.mkdtemp(prefix=f".{input_base}_chunks_", dir=output_dir)
+
+        self.logger.info(
+            f"Separating {audio_file} ({info.duration:.0f}s) in {self.chunk_duration}s chunks with {self.chunk_overlap}s crossfades"
+        )
+
+        writers = {}
+        tails = {}
+        try:
+            start = 0
+            chunk_index = 0
+            while True:
+                stop = min(start + chunk_frames, info.frames)
+                is_last_chunk = stop >= info.frames
+
+                chunk_base = f"chunk{chunk_index:05d}"
+                chunk_path = os.path.join(chunk_dir, f"{chunk_base}.wav")
+                chunk_audio, _ = sf.read(audio_file, start=start, stop=stop, dtype="float32", always_2d=True)
+                sf.write(chunk_path, chunk_audio, info.samplerate, subtype="FLOAT")
+                del chunk_audio
+
+                self.logger.debug(f"Separating chunk {chunk_index} (frames {start}-{stop} of {info.frames})")
+                for chunk_output in self._resolve_output_files(separator, separator.separate(chunk_path)):
+                    # The part of the name after the chunk's base name identifies the stem, e.g. "_(Vocals)_model_name.flac"
+                    suffix = os.path.basename(chunk_output)[len(chunk_base) :]
+                    stem_audio, samplerate, subtype = self._read_audio(chunk_output)
+                    os.remove(chunk_output)
+
+                    if suffix not in writers:
+                        writers[suffix] = sf.SoundFile(
+                            os.path.join(output_dir, f"{input_base}{suffix}"),
+                            mode="w",
+                            samplerate=samplerate,
+                            channels=stem_audio.shape[1],
+                            subtype=subtype,
+                            format=self.lossless_output_format.upper(),
+                        )
+
+                    tail = tails.pop(suffix, None)
+                    if tail is not None:
+                        fade_frames = min(len(tail), len(stem_audio))
+                        fade_in = np.linspace(0.0, 1.0, fade_frames, dtype=np.float32)[:, np.newaxis]
+                        stem_audio[:fade_frames] = tail[:fade_frames] * (1.0 - fade_in) + stem_audio[:fade_frames] * fade_in
+
+                    if is_last_chunk or len(stem_audio) <= overlap_frames:
+                        writers[suffix].write(stem_audio)
+                    else:
+                        # Hold back the overlap so it can be crossfaded with the start of the next chunk
+                        writers[suffix].write(stem_audio[:-overlap_frames])
+                        tails[suffix] = stem_audio[-overlap_frames:].copy()
+
+                os.remove(chunk_path)
+
+                if is_last_chunk:
+                    break
+                start += hop_frames
+                chunk_index += 1
+
+            # Any stem missing from the final chunk still has its held-back overlap to write out
+            for suffix, tail in tails.items():
+                writers[suffix].write(tail)
+        finally:
+            for writer in writers.values():
+                writer.close()
+            shutil.rmtree(chunk_dir, ignore_errors=True)
+
+        return [writer.name for writer in writers.values()]
+
+    def _resolve_output_files(self, separator, output_files):
+        """Separator returns output paths relative to its output_dir, which is fixed when the pooled Separator is created."""
+        output_dir = getattr(separator, "output_dir", None)
+        if not isinstance(output_dir, str):
+            return output_files
+        return [file if os.path.isabs(file) else os.path.join(output_dir, file) for file in output_files]
+
+    def _separate_clean_instrumental(self, audio_file, artist_title, track_output_dir, stems_dir):
         self.logger.info(f"Separating using clean instrumental model: {self.clean_instrumental_model}")
         instrumental_path = os.path.join(
             track_output_dir, f"{artist_title} (Instrumental {self.clean_instrumental_model}).{self.lossless_output_format}"
@@ -257,8 +366,7 @@ class AudioProcessor:
 
         result = {}
         if not self._file_exists(instrumental_path) or not self._file_exists(vocals_path):
-            separator.load_model(model_filename=self.clean_instrumental_model)
-            clean_output_files = separator.separate(audio_file)
+            clean_output_files = self._run_separation(self.clean_instrumental_model, audio_file)
 
             for file in clean_output_files:
                 if "(Vocals)" in file and not self._file_exists(vocals_path):
@@ -273,7 +381,7 @@ class AudioProcessor:
 
         return result
 
-    def _separate_other_stems(self, separator, audio_file, artist_title, stems_dir):
+    def _separate_other_stems(self, audio_file, artist_title, stems_dir):
         self.logger.info(f"Separating using other stems models: {self.other_stems_models}")
         result = {}
         for model in self.other_stems_models:
@@ -289,8 +397,7 @@ class AudioProcessor:
                     stem_name = os.path.basename(stem_file).split("(")[1].split(")")[0].strip()
                     result[model][stem_name] = stem_file
             else:
-                separator.load_model(model_filename=model)
-                other_stems_output = separator.separate(audio_file)
+                other_stems_output = self._run_separation(model, audio_file)
 
                 for file in other_stems_output:
                     file_name = os.path.basename(file)
@@ -303,7 +410,7 @@ class AudioProcessor:
 
         return result
 
-    def _separate_backing_vocals(self, separator, vocals_path, artist_title, stems_dir):
+    def _separate_backing_vocals(self, vocals_path, artist_title, stems_dir):
         self.logger.info(f"Separating clean vocals using backing vocals models: {self.backing_vocals_models}")
         result = {}
         for model in self.backing_vocals_models:
@@ -313,8 +420,7 @@ class AudioProcessor:
             backing_vocals_path = os.path.join(stems_dir, f"{artist_title} (Backing Vocals {model}).{self.lossless_output_format}")
 
             if not self._file_exists(lead_vocals_path) or not self._file_exists(backing_vocals_path):
-                separator.load_model(model_filename=model)
-                backing_vocals_output = separator.separate(vocals_path)
+                backing_vocals_output = self._run_separation(model, vocals_path)
 
                 for file in backing_vocals_output:
                     if "(Vocals)" in file and not self._file_exists(lead_vocals_path):
@@ -331,29 +437,48 @@ class AudioProcessor:
     def _generate_combined_instrumentals(self, instrumental_path, backing_vocals_result, artist_title, track_output_dir):
         self.logger.info("Generating combined instrumental tracks with backing vocals")
         result = {}
+        instrumental = None
         for model, paths in backing_vocals_result.items():
             backing_vocals_path = paths["backing_vocals"]
             combined_path = os.path.join(track_output_dir, f"{artist_title} (Instrumental +BV {model}).{self.lossless_output_format}")
 
             if not self._file_exists(combined_path):
-                ffmpeg_command = (
-                    f'{self.ffmpeg_base_command} -i "{instrumental_path}" -i "{backing_vocals_path}" '
-                    f'-filter_complex "[0:a][1:a]amix=inputs=2:duration=longest:weights=1 1" '
-                    f'-c:a {self.lossless_output_format.lower()} "{combined_path}"'
-                )
-
-                self.logger.debug(f"Running command: {ffmpeg_command}")
-                os.system(ffmpeg_command)
+                # Decode the instrumental once and reuse it for every backing vocals model
+                if instrumental is None:
+                    instrumental = self._read_audio(instrumental_path)
+                self._mix_and_normalize(instrumental, backing_vocals_path, combined_path)
 
             result[model] = combined_path
         return result
 
+    def _mix_and_normalize(self, instrumental, backing_vocals_path, combined_path, target_level=0.0):
+        """Sum the instrumental with a backing vocals stem and write the peak-normalized mix in a single pass."""
+        instrumental_audio, samplerate, subtype = instrumental
+        backing_vocals_audio, backing_vocals_samplerate, _ = self._read_audio(backing_vocals_path)
+
+        if backing_vocals_samplerate != samplerate:
+            raise ValueError(
+                f"Sample rate mismatch between instrumental ({samplerate} Hz) and backing vocals ({backing_vocals_samplerate} Hz): {backing_vocals_path}"
+            )
+
+        # Same as ffmpeg amix with duration=longest: the shorter input is padded with silence. amix's 1/N input
+        # scaling is irrelevant here since the mix is peak-normalized straight afterwards.
+        channels = max(instrumental_audio.shape[1], backing_vocals_audio.shape[1])
+        mixed = np.zeros((max(len(instrumental_audio), len(backing_vocals_audio)), channels), dtype=np.float32)
+        mixed[: len(instrumental_audio)] += instrumental_audio
+        mixed[: len(backing_vocals_audio)] += backing_vocals_audio
+
+        self._apply_peak_gain(mixed, combined_path, target_level)
+        self._write_audio(combined_path, mixed, samplerate, subtype)
+        self.logger.info(f"Combined instrumental written: {combined_path}")
+
     def _normalize_audio_files(self, separation_result, artist_title, track_output_dir):
-        self.logger.info("Normalizing clean instrumental and combined instrumentals")
+        # Combined instrumentals are already peak-normalized as they are mixed, so only the clean instrumental is left
+        self.logger.info("Normalizing clean instrumental")
 
         files_to_normalize = [
             ("clean_instrumental", separation_result["clean_instrumental"]["instrumental"]),
-        ] + [("combined_instrumentals", path) for path in separation_result["combined_instrumentals"].values()]
+        ]
 
         for key, file_path in files_to_normalize:
             if self._file_exists(file_path):
@@ -377,25 +502,38 @@ class AudioProcessor:
     def _normalize_audio(self, input_path, output_path, target_level=0.0):
         self.logger.info(f"Normalizing audio file: {input_path}")
 
-        # Load audio file
-        audio = AudioSegment.from_file(input_path, format=self.lossless_output_format.lower())
-
-        # Calculate the peak amplitude
-        peak_amplitude = float(audio.max_dBFS)
-
-        # Calculate the necessary gain
-        gain_db = target_level - peak_amplitude
-
-        # Apply gain
-        normalized_audio = audio.apply_gain(gain_db)
+        audio, samplerate, subtype = self._read_audio(input_path)
+        self._apply_peak_gain(audio, input_path, target_level)
+        self._write_audio(output_path, audio, samplerate, subtype)
 
-        # Ensure the audio is not completely silent
-        if normalized_audio.rms == 0:
-            self.logger.warning(f"Normalized audio is silent for {input_path}. Using original audio.")
-            normalized_audio = audio
+        self.logger.info(f"Normalized audio saved, replacing: {output_path}")
 
-        # Export normalized audio, overwriting the original file
-        normalized_audio.export(output_path, format=self.lossless_output_format.lower())
+    def _apply_peak_gain(self, audio, path, target_level):
+        """Scale audio in place so its peak sits at target_level dBFS. Silent audio is left as it is."""
+        peak = float(np.max(np.abs(audio))) if audio.size else 0.0
+        if peak == 0:
+            self.logger.warning(f"Normalized audio is silent for {path}. Using original audio.")
+            return
 
-        self.logger.info(f"Normalized audio saved, replacing: {output_path}")
+        peak_amplitude = 20 * np.log10(peak)
+        gain_db = target_level - peak_amplitude
+        audio *= np.float32(10 ** (gain_db / 20))
         self.logger.debug(f"Original peak: {peak_amplitude} dB, Applied gain: {gain_db} dB")
+
+    def _read_audio(self, path):
+        """Decode an audio file to a (frames, channels) float32 array, returning it with its sample rate and subtype."""
+        with sf.SoundFile(path) as audio_file:
+            return audio_file.read(dtype="float32", always_2d=True), audio_file.samplerate, audio_file.subtype
+
+    def _write_audio(self, path, audio, samplerate, subtype):
+        """
+        Encode audio to path via a temporary file in the same directory, so a failed write leaves any existing file
+        untouched. Replacing rather than truncating also avoids writing through hardlinks into the stem cache.
+        """
+        temp_path = os.path.join(os.path.dirname(os.path.abspath(path)), f".{os.path.basename(path)}.tmp")
+        try:
+            sf.write(temp_path, audio, samplerate, subtype=subtype, format=self.lossless_output_format.upper())
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
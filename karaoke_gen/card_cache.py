@@ -0,0 +1,100 @@
+import os
+import json
+import time
+import hashlib
+
+from .content_cache import ContentAddressedCache
+
+
+class CardRenderCache(ContentAddressedCache):
+    """
+    Persistent, content-addressed cache of rendered title/end card images and their video encodes.
+
+    Image entries are keyed by a hash of everything that decides the rendered pixels: the format dict, the bytes
+    of the font and background image it refers to, the (already transformed) text and the resolution. Video
+    entries are keyed by a hash of the source image bytes, duration, resolution and encode settings, so an
+    encode is reused whenever the image matches, however it was produced. End cards rarely depend on the track,
+    so in an album run most cards are rendered once and then restored.
+
+    An entry holds named files (e.g. "png", "jpg", "video"), added to as more outputs of the same card are
+    produced. See ContentAddressedCache for how entries are stored, restored and evicted.
+    """
+
+    DESCRIPTION = "card render cache"
+
+    def manifest_filenames(self, manifest):
+        return manifest.get("files", {}).values()
+
+    def file_hash(self, file_path):
+        """SHA-256 of a file's bytes, memoized by path, mtime and size, or None if there's no such file."""
+        if not file_path or not os.path.isfile(file_path):
+            return None
+        return self._memoized_file_hash(file_path, self._hash_file_bytes)
+
+    def image_key(self, format, font_path, texts, resolution, render_bounding_boxes):
+        """Key for a card rendered from format with font_path and texts (a dict of the transformed text elements)."""
+        key_parts = {
+            "kind": "image",
+            "format": format,
+            "font": self.file_hash(font_path),
+            "background_image": self.file_hash(format.get("background_image")),
+            "texts": texts,
+            "resolution": list(resolution),
+            "render_bounding_boxes": render_bounding_boxes,
+        }
+        return self._hash_key_parts(key_parts)
+
+    def video_key(self, image_path, duration, resolution, encode_settings):
+        """Key for a video encoded from image_path, identified by its bytes rather than how it was rendered."""
+        key_parts = {
+            "kind": "video",
+            "image": self.file_hash(image_path),
+            "duration": duration,
+            "resolution": list(resolution),
+            "encode_settings": encode_settings,
+        }
+        return self._hash_key_parts(key_parts)
+
+    def restore(self, cache_key, destinations):
+        """
+        Link or copy the cached files named in destinations (a dict of name -> destination path) into place.
+        Returns False, restoring nothing, unless the entry exists and has all of them.
+        """
+        entry_dir = self._entry_dir(cache_key)
+        with self._locked():
+            manifest = self._read_manifest(entry_dir)
+            if manifest is None or not set(destinations) <= set(manifest["files"]):
+                self.misses += 1
+                return False
+
+            for name, destination_path in destinations.items():
+                self._link_or_copy(os.path.join(entry_dir, manifest["files"][name]), destination_path)
+
+            self._mark_used(entry_dir)
+            self.hits += 1
+
+        self.logger.info(f"Card render cache hit, restored {', '.join(destinations.values())}")
+        return True
+
+    def store(self, cache_key, files):
+        """Add files (a dict of name -> path) to the cache under cache_key, merging with any files already cached."""
+        entry_dir = self._entry_dir(cache_key)
+        with self._locked():
+            manifest = self._read_manifest(entry_dir) or {"files": {}}
+            if set(files) <= set(manifest["files"]):
+                return
+
+            with self._staged_entry(entry_dir, manifest) as staging_dir:
+                for name, filename in manifest["files"].items():
+                    self._link_or_copy(os.path.join(entry_dir, filename), os.path.join(staging_dir, filename))
+                for name, file_path in files.items():
+                    filename = f"{name}{os.path.splitext(file_path)[1]}"
+                    self._link_or_copy(file_path, os.path.join(staging_dir, filename))
+                    manifest["files"][name] = filename
+                manifest["created_at"] = time.time()
+
+            self.logger.info(f"Stored {', '.join(files)} in card render cache")
+            self._evict_to_fit()
+
+    def _hash_key_parts(self, key_parts):
+        return hashlib.sha256(json.dumps(key_parts, sort_keys=True, default=str).encode()).hexdigest()
@@ -0,0 +1,160 @@
+import os
+import json
+import fcntl
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+
+class ContentAddressedCache:
+    """
+    Base for persistent caches of files keyed by a hash of the content they were produced from.
+
+    Each entry is a directory named after its key (under a two character prefix directory) holding the cached
+    files and a manifest listing them. Entries are built in a staging directory and renamed into place, so
+    readers never see a partial one, and are restored by hardlink where possible (falling back to a copy), so
+    code that rewrites a restored file in place must replace it rather than truncating it. The cache is bounded
+    to max_size_bytes, evicting least-recently-used entries first, and reads and writes take a lock on the cache
+    directory so processes can share it.
+
+    Subclasses decide what goes in an entry and its manifest, naming the manifest's files in manifest_filenames.
+    """
+
+    MANIFEST_FILENAME = "manifest.json"
+    LOCK_FILENAME = ".lock"
+
+    # Name of the cache in log messages
+    DESCRIPTION = "cache"
+
+    def __init__(self, cache_dir, logger=None, max_size_bytes=2 * 1024**3):
+        self.cache_dir = cache_dir
+        self.logger = logger or logging.getLogger(__name__)
+        self.max_size_bytes = max_size_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self._file_hashes = {}
+        self._hash_lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def manifest_filenames(self, manifest):
+        """Names of the files in an entry with this manifest, besides the manifest itself."""
+        raise NotImplementedError
+
+    def _memoized_file_hash(self, file_path, compute_hash):
+        """compute_hash(file_path), memoized by path, mtime and size so unchanged files aren't hashed again."""
+        file_stat = os.stat(file_path)
+        memo_key = (os.path.abspath(file_path), file_stat.st_mtime_ns, file_stat.st_size)
+
+        with self._hash_lock:
+            if memo_key in self._file_hashes:
+                return self._file_hashes[memo_key]
+
+        file_hash = compute_hash(file_path)
+        with self._hash_lock:
+            self._file_hashes[memo_key] = file_hash
+        return file_hash
+
+    @staticmethod
+    def _hash_file_bytes(file_path):
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _entry_dir(self, cache_key):
+        return os.path.join(self.cache_dir, cache_key[:2], cache_key)
+
+    def _read_manifest(self, entry_dir):
+        """The entry's manifest, or None if there's no such entry or any of its files are missing."""
+        try:
+            with open(os.path.join(entry_dir, self.MANIFEST_FILENAME), "r") as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        if not all(os.path.isfile(os.path.join(entry_dir, filename)) for filename in self.manifest_filenames(manifest)):
+            self.logger.warning(f"{self.DESCRIPTION.capitalize()} entry is incomplete, ignoring it: {entry_dir}")
+            return None
+        return manifest
+
+    def _mark_used(self, entry_dir):
+        """Bump the entry's mtime so eviction treats it as recently used."""
+        os.utime(os.path.join(entry_dir, self.MANIFEST_FILENAME))
+
+    @contextmanager
+    def _staged_entry(self, entry_dir, manifest):
+        """
+        Yield a staging directory to build an entry in, then write manifest (which the block may still add to) to
+        it and rename it to entry_dir, replacing any entry already there. Caller holds the cache lock.
+        """
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        staging_dir = tempfile.mkdtemp(prefix=".staging-", dir=self.cache_dir)
+        try:
+            yield staging_dir
+
+            with open(os.path.join(staging_dir, self.MANIFEST_FILENAME), "w") as f:
+                json.dump(manifest, f)
+
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.rename(staging_dir, entry_dir)
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+    def _link_or_copy(self, source_path, destination_path):
+        if os.path.exists(destination_path):
+            os.remove(destination_path)
+        try:
+            os.link(source_path, destination_path)
+        except OSError:
+            shutil.copy2(source_path, destination_path)
+
+    def _entries(self):
+        """List (entry_dir, last_used, size_bytes) for every complete cache entry."""
+        entries = []
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if prefix.startswith(".") or not os.path.isdir(prefix_dir):
+                continue
+            for cache_key in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, cache_key)
+                manifest_path = os.path.join(entry_dir, self.MANIFEST_FILENAME)
+                if not os.path.isfile(manifest_path):
+                    continue
+                size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+                entries.append((entry_dir, os.path.getmtime(manifest_path), size))
+        return entries
+
+    def _evict_to_fit(self):
+        """
+        Remove least-recently-used entries until the cache fits in max_size_bytes, returning how many were removed.
+        Caller holds the cache lock.
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total_size = sum(size for _, _, size in entries)
+
+        evicted = 0
+        for entry_dir, _, size in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            self.logger.info(f"Evicting {self.DESCRIPTION} entry to stay within {self.max_size_bytes / 1024**3:.1f} GB: {entry_dir}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
+            evicted += 1
+        return evicted
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive flock on the cache directory, held across processes sharing the cache."""
+        with open(os.path.join(self.cache_dir, self.LOCK_FILENAME), "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
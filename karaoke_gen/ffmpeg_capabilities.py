@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import fcntl
+import shutil
+import logging
+import tempfile
+
+DEFAULT_CAPABILITY_CACHE_FILE = os.path.join(tempfile.gettempdir(), "karaoke-gen", "ffmpeg_capabilities.json")
+
+
+def nvidia_driver_version():
+    """Installed NVIDIA kernel driver version, read without running nvidia-smi, or None if there isn't one."""
+    try:
+        with open("/proc/driver/nvidia/version", "r") as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+class FFmpegCapabilityCache:
+    """
+    On-disk cache of what an ffmpeg binary on this host can do (best AAC encoder, working NVENC, ...).
+
+    Probing capabilities means running ffmpeg several times plus nvidia-smi and a test encode, which adds
+    seconds to every KaraokeFinalise. Results are cached per ffmpeg binary, identified by its resolved path,
+    mtime and size (so upgrading ffmpeg invalidates the entry), plus the NVIDIA driver version and any extra
+    key parts the caller passes. Entries expire after ttl_seconds. The cache file is shared by every process
+    on the host; updates take an flock and replace the file atomically.
+    """
+
+    def __init__(self, cache_file=DEFAULT_CAPABILITY_CACHE_FILE, logger=None, ttl_seconds=24 * 60 * 60):
+        self.cache_file = cache_file
+        self.logger = logger or logging.getLogger(__name__)
+        self.ttl_seconds = ttl_seconds
+
+    def cache_key(self, ffmpeg_path, **extra):
+        """Key for ffmpeg_path's capabilities, or None if the binary can't be found (so it can't be cached)."""
+        resolved_path = shutil.which(ffmpeg_path)
+        if resolved_path is None:
+            return None
+        resolved_path = os.path.realpath(resolved_path)
+        stat = os.stat(resolved_path)
+
+        key_parts = {
+            "ffmpeg": resolved_path,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "nvidia_driver": nvidia_driver_version(),
+            **extra,
+        }
+        return json.dumps(key_parts, sort_keys=True)
+
+    def get(self, ffmpeg_path, probe, **extra):
+        """Return the cached capabilities for ffmpeg_path, calling probe() and caching its result on a miss."""
+        try:
+            key = self.cache_key(ffmpeg_path, **extra)
+        except OSError as e:
+            self.logger.warning(f"Could not identify ffmpeg binary for capability cache, probing instead: {e}")
+            key = None
+        if key is None:
+            return probe()
+
+        entry = self._read().get(key)
+        if entry is not None and time.time() - entry["probed_at"] < self.ttl_seconds:
+            self.logger.info(f"Using cached ffmpeg capabilities from {self.cache_file}: {entry['capabilities']}")
+            return entry["capabilities"]
+
+        capabilities = probe()
+        try:
+            self._store(key, capabilities)
+        except OSError as e:
+            self.logger.warning(f"Could not write ffmpeg capability cache {self.cache_file}: {e}")
+        return capabilities
+
+    def _read(self):
+        try:
+            with open(self.cache_file, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _store(self, key, capabilities):
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        with open(f"{self.cache_file}.lock", "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                entries = self._read()
+                now = time.time()
+                # Drop expired entries (e.g. for ffmpeg builds that have since been replaced) while we're here
+                entries = {k: v for k, v in entries.items() if now - v["probed_at"] < self.ttl_seconds}
+                entries[key] = {"probed_at": now, "capabilities": capabilities}
+
+                temp_path = f"{self.cache_file}.{os.getpid()}.tmp"
+                with open(temp_path, "w") as f:
+                    json.dump(entries, f)
+                os.replace(temp_path, self.cache_file)
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
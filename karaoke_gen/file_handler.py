@@ -1,19 +1,24 @@
 import os
+import json
 import glob
+import shlex
 import logging
 import shutil
 import tempfile
+import soundfile as sf
 import yt_dlp.YoutubeDL as ydl
 from .utils import sanitize_filename
+from .process_runner import ProcessRunner
 
 
 # Placeholder class or functions for file handling
 class FileHandler:
-    def __init__(self, logger, ffmpeg_base_command, create_track_subfolders, dry_run):
+    def __init__(self, logger, ffmpeg_base_command, create_track_subfolders, dry_run, process_runner=None):
         self.logger = logger
         self.ffmpeg_base_command = ffmpeg_base_command
         self.create_track_subfolders = create_track_subfolders
         self.dry_run = dry_run
+        self.process_runner = process_runner or ProcessRunner(logger=logger)
 
     def _file_exists(self, file_path):
         """Check if a file exists and log the result."""
@@ -101,13 +106,57 @@ class FileHandler:
     def extract_still_image_from_video(self, input_filename, output_filename_no_extension):
         output_filename = output_filename_no_extension + ".png"
         self.logger.info(f"Extracting still image from position 30s input media")
-        ffmpeg_command = f'{self.ffmpeg_base_command} -i "{input_filename}" -ss 00:00:30 -vframes 1 "{output_filename}"'
-        self.logger.debug(f"Running command: {ffmpeg_command}")
-        os.system(ffmpeg_command)
+        ffmpeg_command = [*shlex.split(self.ffmpeg_base_command), "-i", input_filename, "-ss", "00:00:30", "-vframes", "1", output_filename]
+        # Audio-only downloads have no video stream to take a frame from, which isn't a reason to fail the track
+        result = self.process_runner.run(ffmpeg_command, "Extracting still image", check=False)
+        if result.returncode != 0:
+            self.logger.warning(f"Could not extract a still image from {input_filename} (it may be audio only), continuing without one")
+            return None
         return output_filename
 
-    def convert_to_wav(self, input_filename, output_filename_no_extension):
-        """Convert input audio to WAV format, with input validation."""
+    def probe_audio(self, input_filename):
+        """
+        Probe input_filename's container and first audio stream with a single ffprobe call.
+
+        Returns a dict with format_name, duration (seconds), audio_streams and video_streams (counts), and the
+        codec_name, sample_rate, channels and sample_fmt of the first audio stream (None if there isn't one).
+        """
+        probe_command = [
+            "ffprobe", "-v", "error",
+            "-show_entries", "format=format_name,duration:stream=codec_type,codec_name,sample_rate,channels,sample_fmt",
+            "-of", "json", input_filename,
+        ]
+        try:
+            result = self.process_runner.run(probe_command, "Probing input media", check=False)
+            probe_output = json.loads(result.stdout) if result.returncode == 0 else {}
+        except OSError as e:
+            self.logger.warning(f"Could not run ffprobe on {input_filename}: {e}")
+            probe_output = {}
+        except json.JSONDecodeError:
+            probe_output = {}
+
+        streams = probe_output.get("streams", [])
+        audio_streams = [stream for stream in streams if stream.get("codec_type") == "audio"]
+        audio_stream = audio_streams[0] if audio_streams else {}
+        format_info = probe_output.get("format", {})
+
+        return {
+            "format_name": format_info.get("format_name"),
+            "duration": float(format_info["duration"]) if format_info.get("duration") not in (None, "N/A") else None,
+            "audio_streams": len(audio_streams),
+            "video_streams": sum(1 for stream in streams if stream.get("codec_type") == "video"),
+            "codec_name": audio_stream.get("codec_name"),
+            "sample_rate": int(audio_stream["sample_rate"]) if audio_stream.get("sample_rate") else None,
+            "channels": audio_stream.get("channels"),
+            "sample_fmt": audio_stream.get("sample_fmt"),
+        }
+
+    def convert_to_wav(self, input_filename, output_filename_no_extension, probe=None):
+        """
+        Convert input audio to a 16-bit PCM WAV file, with input validation, taking the cheapest route for the input:
+        a 16-bit PCM WAV is linked (or copied) as-is, FLAC is decoded in-process and anything else is transcoded
+        with ffmpeg. Pass the result of probe_audio as probe if the input has already been probed.
+        """
         # Validate input file exists and is readable
         if not os.path.isfile(input_filename):
             raise Exception(f"Input audio file not found: {input_filename}")
@@ -116,20 +165,51 @@ class FileHandler:
             raise Exception(f"Input audio file is empty: {input_filename}")
 
         # Validate input file format using ffprobe
-        probe_command = f'ffprobe -v error -show_entries stream=codec_type -of default=noprint_wrappers=1 "{input_filename}"'
-        probe_output = os.popen(probe_command).read()
+        if probe is None:
+            probe = self.probe_audio(input_filename)
 
-        if "codec_type=audio" not in probe_output:
+        if not probe["audio_streams"]:
             raise Exception(f"No valid audio stream found in file: {input_filename}")
 
         output_filename = output_filename_no_extension + ".wav"
-        self.logger.info(f"Converting input media to audio WAV file")
-        ffmpeg_command = f'{self.ffmpeg_base_command} -n -i "{input_filename}" "{output_filename}"'
-        self.logger.debug(f"Running command: {ffmpeg_command}")
-        if not self.dry_run:
-            os.system(ffmpeg_command)
+        if self.dry_run:
+            return output_filename
+
+        if os.path.exists(output_filename):
+            # As with ffmpeg -n, never overwrite an existing WAV
+            self.logger.info(f"WAV file already exists, skipping conversion: {output_filename}")
+            return output_filename
+
+        if probe["format_name"] == "wav" and probe["codec_name"] == "pcm_s16le" and probe["audio_streams"] == 1:
+            # Already what ffmpeg would produce, so the samples don't need decoding at all
+            self.logger.info(f"Input media is already a 16-bit PCM WAV file, linking it")
+            try:
+                os.link(input_filename, output_filename)
+            except OSError:
+                shutil.copy2(input_filename, output_filename)
+        elif probe["format_name"] == "flac" and probe["codec_name"] == "flac":
+            self.logger.info(f"Decoding FLAC input media to audio WAV file")
+            self._decode_to_wav(input_filename, output_filename)
+        else:
+            self.logger.info(f"Converting input media to audio WAV file")
+            ffmpeg_command = [*shlex.split(self.ffmpeg_base_command), "-n", "-i", input_filename, output_filename]
+            self.process_runner.run(ffmpeg_command, "Converting input media to WAV")
         return output_filename
 
+    def _decode_to_wav(self, input_filename, output_filename, block_frames=1024 * 1024):
+        """Decode an audio file libsndfile can read to a 16-bit PCM WAV in blocks, without starting ffmpeg."""
+        temp_filename = f"{output_filename}.{os.getpid()}.tmp"
+        try:
+            with sf.SoundFile(input_filename) as source:
+                with sf.SoundFile(temp_filename, "w", samplerate=source.samplerate, channels=source.channels, subtype="PCM_16", format="WAV") as output:
+                    for block in source.blocks(blocksize=block_frames, dtype="int16", always_2d=True):
+                        output.write(block)
+            os.replace(temp_filename, output_filename)
+        except Exception:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+            raise
+
     def setup_output_paths(self, output_dir, artist, title):
         if title is None and artist is None:
             raise ValueError("Error: At least title or artist must be provided")
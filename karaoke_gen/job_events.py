@@ -0,0 +1,157 @@
+import time
+import uuid
+import asyncio
+import logging
+import threading
+
+
+class JobEventLog:
+    """
+    Short-lived, time-ordered log of job events (status changes and new log lines), which API containers stream to
+    dashboards instead of every client polling job lists and log files.
+
+    Events are grouped into one bucket per second of publish time, so reading what happened since an event only reads
+    the buckets from that event's second until now, however many jobs there are. Event ids sort in publish order
+    (nanosecond timestamp, then a per-process id and sequence number to break ties), which lets a client resume a
+    stream from the last id it saw. prune drops buckets older than retention_seconds; events_since returns None for
+    an id from before then, and the client should reload the full job list instead.
+
+    Like JobStore, the store only needs dict-style get/set/delete/keys, and a process lock makes each append one step
+    within a process. Publishers in different containers appending in the same second can still overwrite each
+    other's append, so events are notifications rather than the source of truth: status events carry the job's whole
+    summary, which the job's next event repairs, and log events are followed by reading the job's log.
+    """
+
+    # How far back to re-read buckets, for events published with a clock slightly behind the reader's
+    LATE_EVENT_SECONDS = 2
+
+    def __init__(self, events, retention_seconds=15 * 60):
+        self.events = events
+        self.retention_seconds = retention_seconds
+        self.publisher_id = uuid.uuid4().hex[:8]
+
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def publish(self, event_type, job_id, data):
+        """Append an event of event_type ("status", "deleted", "log", ...) about job_id, returning it."""
+        with self._lock:
+            self._sequence += 1
+            timestamp_ns = time.time_ns()
+            event = {
+                "id": f"{timestamp_ns:020d}-{self.publisher_id}-{self._sequence:08d}",
+                "type": event_type,
+                "job_id": job_id,
+                "data": data,
+            }
+            second = timestamp_ns // 1_000_000_000
+            self.events[second] = [*self.events.get(second, []), event]
+        return event
+
+    @staticmethod
+    def event_second(event_id):
+        """The second an event was published in, from its id, or None if event_id isn't an event id."""
+        try:
+            return int(event_id.split("-", 1)[0]) // 1_000_000_000
+        except (AttributeError, ValueError):
+            return None
+
+    def events_between(self, start_second, end_second):
+        """Events published from start_second to end_second inclusive, in id order."""
+        events = []
+        for second in range(start_second, end_second + 1):
+            events.extend(self.events.get(second, []))
+        return sorted(events, key=lambda event: event["id"])
+
+    def events_since(self, last_event_id, now=None):
+        """
+        Events published after last_event_id, in id order, or None if last_event_id is unknown or older than the
+        retention period, in which case the caller has to resynchronize from the job store.
+        """
+        now = int(now if now is not None else time.time())
+        last_second = self.event_second(last_event_id)
+        if last_second is None or last_second < now - self.retention_seconds:
+            return None
+
+        events = self.events_between(last_second - self.LATE_EVENT_SECONDS, now)
+        return [event for event in events if event["id"] > last_event_id]
+
+    def prune(self, now=None):
+        """Delete buckets older than the retention period, returning how many were deleted."""
+        cutoff = int(now if now is not None else time.time()) - self.retention_seconds
+        expired = [second for second in list(self.events.keys()) if second < cutoff]
+        for second in expired:
+            del self.events[second]
+        return len(expired)
+
+
+class JobEventHub:
+    """
+    Fans events from a JobEventLog out to the event streams open in this process.
+
+    However many streams are open, one poller reads the recent buckets every poll_interval seconds, so reads scale
+    with the number of API containers rather than the number of clients. Each subscriber gets an asyncio.Queue; a
+    subscriber that falls max_queued events behind has its queue replaced by a single "resync" event.
+    """
+
+    def __init__(self, event_log, poll_interval=1.0, max_queued=1000, logger=None):
+        self.event_log = event_log
+        self.logger = logger or logging.getLogger(__name__)
+        self.poll_interval = poll_interval
+        self.max_queued = max_queued
+        self.subscribers = set()
+
+        # Ids delivered in the re-read window, so events aren't delivered twice
+        self._seen = {}
+        self._last_polled_second = None
+        self._task = None
+
+    def subscribe(self):
+        """Register a subscriber, starting the poller if it isn't running, and return the subscriber's queue."""
+        queue = asyncio.Queue(maxsize=self.max_queued)
+        self.subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def poll_once(self, now=None):
+        """Read the buckets published since the last poll, returning the events not seen yet, in id order."""
+        now = int(now if now is not None else time.time())
+        start_second = (self._last_polled_second if self._last_polled_second is not None else now) - self.event_log.LATE_EVENT_SECONDS
+        self._last_polled_second = now
+
+        new_events = []
+        for event in self.event_log.events_between(start_second, now):
+            if event["id"] not in self._seen:
+                self._seen[event["id"]] = self.event_log.event_second(event["id"])
+                new_events.append(event)
+
+        # Forget ids older than the next poll's first bucket
+        self._seen = {event_id: second for event_id, second in self._seen.items() if second >= now - self.event_log.LATE_EVENT_SECONDS}
+        return new_events
+
+    def deliver(self, events):
+        for queue in list(self.subscribers):
+            for event in events:
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait({"id": None, "type": "resync", "job_id": None, "data": {}})
+                    break
+
+    async def _run(self):
+        # Forget the last poll from a previous run, which would re-read every bucket since
+        self._last_polled_second = None
+        while self.subscribers:
+            try:
+                events = await asyncio.to_thread(self.poll_once)
+            except Exception as e:
+                events = []
+                self.logger.warning(f"Could not read job events: {e}")
+            self.deliver(events)
+            await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,249 @@
+import os
+import re
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from collections import deque
+
+# Log levels in order from lowest to highest severity
+LOG_LEVELS = {"DEBUG": 0, "INFO": 1, "WARNING": 2, "ERROR": 3, "CRITICAL": 4}
+
+# Bytes read at a time when reading a log backwards from its end
+TAIL_BLOCK_SIZE = 64 * 1024
+
+
+def make_log_filter(include_filter="", exclude_filter="", level_filter="", use_regex=False):
+    """
+    Predicate for log entries ({"timestamp", "level", "message"} dicts) at level_filter or above, matching
+    include_filter and not exclude_filter. Filters match the level and message, case-insensitively, as regular
+    expressions if use_regex (falling back to substrings for an invalid expression), else as substrings.
+    """
+    minimum_level = LOG_LEVELS.get(level_filter, 1) if level_filter else None
+
+    def compile_filter(text):
+        if not text:
+            return None
+        if use_regex:
+            try:
+                return re.compile(text, re.IGNORECASE).search
+            except re.error:
+                pass
+        lowered = text.lower()
+        return lambda search_text: lowered in search_text
+
+    include, exclude = compile_filter(include_filter), compile_filter(exclude_filter)
+
+    def matches(log_entry):
+        if minimum_level is not None and LOG_LEVELS.get(log_entry.get("level", "INFO"), 1) < minimum_level:
+            return False
+        search_text = f"{log_entry.get('level', '')} {log_entry.get('message', '')}".lower()
+        if exclude is not None and exclude(search_text):
+            return False
+        if include is not None and not include(search_text):
+            return False
+        return True
+
+    return matches
+
+
+def _parse_line(line):
+    try:
+        log_entry = json.loads(line.decode("utf-8", errors="replace"))
+    except json.JSONDecodeError:
+        # Skip malformed lines
+        return None
+    return log_entry if isinstance(log_entry, dict) else None
+
+
+def read_log_entries(log_file_path, cursor=None, limit=0, matches=None):
+    """
+    Read entries from a JSONL job log, returning (entries, next_cursor).
+
+    Cursors are byte offsets: with a cursor, only the lines written after it are parsed, and next_cursor is where the
+    following read should start. Only complete lines are read, so a line still being written is returned by the next
+    read. Without a cursor and with a limit, the log is read backwards from its end until limit matching entries are
+    found, so tailing a large log doesn't parse all of it. matches (see make_log_filter) is applied as lines are
+    read, and at most the last limit matching entries (all of them if limit <= 0) are returned, oldest first.
+    A cursor beyond the end of the log (it was replaced) reads it from the start.
+    """
+    matches = matches or (lambda log_entry: True)
+    if not os.path.exists(log_file_path):
+        return [], 0
+
+    with open(log_file_path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        if cursor is None and limit > 0:
+            return _read_tail(f, size, limit, matches)
+
+        start = cursor if cursor is not None and 0 <= cursor <= size else 0
+        f.seek(start)
+        entries = deque(maxlen=limit if limit > 0 else None)
+        next_cursor = start
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            next_cursor += len(line)
+            log_entry = _parse_line(line)
+            if log_entry is not None and matches(log_entry):
+                entries.append(log_entry)
+        return list(entries), next_cursor
+
+
+def _complete_lines_end(f, size):
+    """Offset just after the last newline in f, leaving out a trailing line that's still being written."""
+    position = size
+    while position > 0:
+        read_size = min(TAIL_BLOCK_SIZE, position)
+        position -= read_size
+        f.seek(position)
+        last_newline = f.read(read_size).rfind(b"\n")
+        if last_newline >= 0:
+            return position + last_newline + 1
+    return 0
+
+
+def _read_tail(f, size, limit, matches):
+    """Read blocks backwards from the end of f until limit matching entries are found."""
+    end = position = _complete_lines_end(f, size)
+    entries = []
+    remainder = b""
+    while position > 0 and len(entries) < limit:
+        read_size = min(TAIL_BLOCK_SIZE, position)
+        position -= read_size
+        f.seek(position)
+        lines = (f.read(read_size) + remainder).split(b"\n")
+        # The first piece may be the end of a line that starts in an earlier block
+        remainder = lines.pop(0) if position > 0 else b""
+        for line in reversed(lines):
+            if not line:
+                continue
+            log_entry = _parse_line(line)
+            if log_entry is not None and matches(log_entry):
+                entries.append(log_entry)
+                if len(entries) == limit:
+                    break
+
+    entries.reverse()
+    return entries, end
+
+
+class JobLogWriter:
+    """
+    Appends entries to JSONL job logs from a background thread, in batches.
+
+    Job phases log thousands of records, and opening, appending to and closing a log on a network volume for each one
+    costs more than much of the work being logged. write only queues the entry; the writer thread gathers entries for
+    up to flush_interval seconds, then appends each job's batch with one open and write, and calls
+    on_flush(job_id, entries) if given. At most max_buffered entries wait at a time, after which write blocks until
+    the thread catches up, so a stalled volume can't use unbounded memory.
+
+    flush waits until every entry the caller wrote before it is in its log, which callers do when a job ends or fails;
+    close flushes and stops the thread, and runs at exit. Log handlers feeding the writer must drop records logged on
+    the writer thread (its name is THREAD_NAME), e.g. its own write failure warnings, or a handler blocked in write
+    while the thread waits for that handler's lock would deadlock.
+    """
+
+    THREAD_NAME = "job-log-writer"
+
+    _STOP = object()
+
+    def __init__(self, log_file_path_for, flush_interval=1.0, max_buffered=10000, on_flush=None, logger=None):
+        self.log_file_path_for = log_file_path_for
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.on_flush = on_flush
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._queue = queue.Queue(maxsize=max_buffered)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def write(self, job_id, log_entry):
+        """Queue log_entry to be appended to job_id's log."""
+        self._ensure_thread()
+        self._queue.put((job_id, log_entry))
+
+    def flush(self, wait=True):
+        """
+        Write out the entries queued so far without waiting for the flush interval. If wait, block until they're in
+        their logs; entries queued after the call, e.g. by other jobs, aren't waited for.
+        """
+        if self._thread is None or threading.current_thread() is self._thread:
+            return
+        # The writer sets the marker's event once the batch it ends is written
+        flushed = threading.Event()
+        if not wait:
+            try:
+                self._queue.put_nowait(flushed)
+            except queue.Full:
+                # A full queue is written straight away anyway
+                pass
+            return
+        self._queue.put(flushed)
+        flushed.wait()
+
+    def close(self):
+        """Flush and stop the writer thread. Writing again starts a new one."""
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(self._STOP)
+        thread.join()
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.THREAD_NAME, daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # Flush markers (events) and the stop marker end a batch early
+            while isinstance(items[-1], tuple) and len(items) < self.max_buffered:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_batch([item for item in items if isinstance(item, tuple)])
+            finally:
+                for item in items:
+                    if isinstance(item, threading.Event):
+                        item.set()
+
+            if items[-1] is self._STOP:
+                return
+
+    def _write_batch(self, entries):
+        entries_by_job = {}
+        for job_id, log_entry in entries:
+            entries_by_job.setdefault(job_id, []).append(log_entry)
+
+        for job_id, job_entries in entries_by_job.items():
+            log_file_path = self.log_file_path_for(job_id)
+            try:
+                os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
+                with open(log_file_path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(log_entry) + "\n" for log_entry in job_entries))
+            except OSError as e:
+                self.logger.warning(f"Could not write {len(job_entries)} log entries to {log_file_path}: {e}")
+                continue
+
+            if self.on_flush is not None:
+                try:
+                    self.on_flush(job_id, job_entries)
+                except Exception as e:
+                    self.logger.warning(f"Job log on_flush callback failed for job {job_id}: {e}")
@@ -0,0 +1,216 @@
+import time
+import threading
+from collections import Counter
+
+
+class JobStore:
+    """
+    Job status records, plus a compact summary of each job and an index of job ids per auth token.
+
+    Full job records carry large blobs (track_data, corrections, command timings), so listing jobs by
+    reading every record costs time proportional to all the data ever stored. Every save also writes the job's
+    summary (SUMMARY_FIELDS), so job lists and stats only read summaries, and a user's jobs are found through
+    the token index instead of scanning every job.
+
+    Job counts per status are kept up to date as jobs are saved and deleted, globally and per token (via
+    job_owners), so stats don't walk any jobs at all. The stores (modal.Dicts in production) have no atomic
+    increment, so a process lock makes each status change and its counter updates one step within a process;
+    writers in different containers can still race, which reconcile_status_counts corrects.
+
+    If an event_log (a JobEventLog) is given, every save publishes a "status" event carrying the job's summary and
+    every delete a "deleted" event, which the API streams to dashboards.
+
+    The stores only need dict-style get/set/delete/contains/items, so production passes modal.Dicts and tests
+    use InMemoryJobStore.
+    """
+
+    # Key of the global counts in status_counts; the other keys are tokens
+    ALL_JOBS = "__all__"
+
+    # Everything the job list, stats and status logs read from a job. The timeline grows with every status change,
+    # so it's left to the full record, which the timeline endpoint reads for one job at a time.
+    SUMMARY_FIELDS = (
+        "status",
+        "progress",
+        "artist",
+        "title",
+        "url",
+        "filename",
+        "brand_code",
+        "created_at",
+        "last_updated",
+        "completed_at",
+        "user_type",
+        "total_duration_seconds",
+        "review_url",
+        "youtube_url",
+        "brand_code_dir_sharing_link",
+        "error",
+    )
+
+    def __init__(self, jobs, summaries, token_index, job_owners, status_counts, event_log=None):
+        self.jobs = jobs
+        self.summaries = summaries
+        self.token_index = token_index
+        self.job_owners = job_owners
+        self.status_counts = status_counts
+        self.event_log = event_log
+
+        self._lock = threading.Lock()
+
+    @classmethod
+    def summarize(cls, job_data):
+        return {field: job_data[field] for field in cls.SUMMARY_FIELDS if field in job_data}
+
+    def get(self, job_id, default=None):
+        return self.jobs.get(job_id, default)
+
+    def __contains__(self, job_id):
+        return job_id in self.jobs
+
+    def save(self, job_id, job_data):
+        """Store job_data as the job's full record, refresh its summary and move it between status counts."""
+        with self._lock:
+            previous = self.summaries.get(job_id)
+            summary = self.summarize(job_data)
+            self.jobs[job_id] = job_data
+            self.summaries[job_id] = summary
+
+            if previous is None:
+                self._adjust_counts(job_id, job_data.get("status"), 1)
+            elif previous.get("status") != job_data.get("status"):
+                self._adjust_counts(job_id, previous.get("status"), -1)
+                self._adjust_counts(job_id, job_data.get("status"), 1)
+
+        if self.event_log is not None:
+            self.event_log.publish("status", job_id, summary)
+
+    def update(self, job_id, **fields):
+        """Merge fields into the job's record, returning the updated record."""
+        job_data = {**self.jobs.get(job_id, {}), **fields}
+        self.save(job_id, job_data)
+        return job_data
+
+    def delete(self, job_id):
+        """Remove a job and its summary. Token index entries for it are skipped from then on."""
+        with self._lock:
+            previous = self.summaries.get(job_id)
+            del self.jobs[job_id]
+            if previous is not None:
+                del self.summaries[job_id]
+                self._adjust_counts(job_id, previous.get("status"), -1)
+            if job_id in self.job_owners:
+                del self.job_owners[job_id]
+
+        if self.event_log is not None:
+            self.event_log.publish("deleted", job_id, {})
+
+    def _adjust_counts(self, job_id, status, delta):
+        """Add delta to status's count globally and for the job's owner. Caller holds the lock."""
+        scopes = [self.ALL_JOBS]
+        owner = self.job_owners.get(job_id)
+        if owner is not None:
+            scopes.append(owner)
+
+        for scope in scopes:
+            counts = self.status_counts.get(scope, {})
+            counts[status] = counts.get(status, 0) + delta
+            if counts[status] <= 0:
+                del counts[status]
+            self.status_counts[scope] = counts
+
+    def status_counts_for(self, token=None):
+        """Job counts by status for token's jobs, or for all jobs if token is None."""
+        return dict(self.status_counts.get(self.ALL_JOBS if token is None else token, {}))
+
+    def reconcile_status_counts(self):
+        """Recount jobs by status from the summaries and replace every stored count. Returns the global counts."""
+        with self._lock:
+            return self._reconcile_status_counts()
+
+    def _reconcile_status_counts(self):
+        """reconcile_status_counts for a caller holding self._lock."""
+        statuses = {job_id: summary.get("status") for job_id, summary in self.summaries.items()}
+        counts = {self.ALL_JOBS: dict(Counter(statuses.values()))}
+        for token, token_jobs in self.token_index.items():
+            counts[token] = dict(Counter(statuses[job_id] for job_id in token_jobs if job_id in statuses))
+
+        for scope in list(self.status_counts.keys()):
+            if scope not in counts:
+                del self.status_counts[scope]
+        for scope, scope_counts in counts.items():
+            self.status_counts[scope] = scope_counts
+        return counts[self.ALL_JOBS]
+
+    def add_job_for_token(self, token, job_id, created_at=None):
+        """Record that token created job_id at created_at (a Unix timestamp, now by default)."""
+        with self._lock:
+            token_jobs = self.token_index.get(token, {})
+            token_jobs[job_id] = created_at if created_at is not None else time.time()
+            self.token_index[token] = token_jobs
+
+            if self.job_owners.get(job_id) != token:
+                self.job_owners[job_id] = token
+                # A job saved before it was indexed is already in the global counts, but not yet the token's
+                summary = self.summaries.get(job_id)
+                if summary is not None:
+                    counts = self.status_counts.get(token, {})
+                    counts[summary.get("status")] = counts.get(summary.get("status"), 0) + 1
+                    self.status_counts[token] = counts
+
+    def job_ids_for_token(self, token):
+        """Ids of the jobs token created, newest first."""
+        token_jobs = self.token_index.get(token, {})
+        return sorted(token_jobs, key=lambda job_id: token_jobs[job_id], reverse=True)
+
+    def token_has_job(self, token, job_id):
+        return job_id in self.token_index.get(token, {})
+
+    def summaries_for_token(self, token, offset=0, limit=None):
+        """
+        Summaries of the jobs token created, newest first, as ({job_id: summary}, total). Only the requested page
+        of summaries is read.
+        """
+        job_ids = self.job_ids_for_token(token)
+        page = job_ids[offset : offset + limit if limit is not None else None]
+        summaries = {}
+        for job_id in page:
+            summary = self.summaries.get(job_id)
+            # Deleted jobs stay in the token index, but have no summary
+            if summary is not None:
+                summaries[job_id] = summary
+        return summaries, len(job_ids)
+
+    def all_summaries(self, offset=0, limit=None):
+        """Summaries of every job, newest first, as ({job_id: summary}, total)."""
+        summaries = sorted(self.summaries.items(), key=lambda item: item[1].get("created_at") or "", reverse=True)
+        page = summaries[offset : offset + limit if limit is not None else None]
+        return dict(page), len(summaries)
+
+    def rebuild(self, token_jobs):
+        """
+        Rebuild every summary from the full job records and merge token_jobs ({token: {job_id: created_at}}) into
+        the token index, for jobs stored before the summaries and index existed. Returns the number of summaries.
+
+        Holds the process lock throughout, so a save in this process can't be overwritten with a stale summary.
+        """
+        with self._lock:
+            count = 0
+            for job_id, job_data in list(self.jobs.items()):
+                self.summaries[job_id] = self.summarize(job_data)
+                count += 1
+
+            for token, jobs in token_jobs.items():
+                self.token_index[token] = {**jobs, **self.token_index.get(token, {})}
+                for job_id in jobs:
+                    self.job_owners[job_id] = token
+
+            self._reconcile_status_counts()
+            return count
+
+
+class InMemoryJobStore(JobStore):
+    """JobStore backed by plain dicts, for tests and local runs without Modal."""
+
+    def __init__(self, event_log=None):
+        super().__init__({}, {}, {}, {}, {}, event_log=event_log)
@@ -15,14 +15,25 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.http import MediaFileUpload
 import subprocess
+import threading
 import time
 from google.oauth2.credentials import Credentials
 import base64
 from email.mime.text import MIMEText
 from lyrics_transcriber.output.cdg import CDGGenerator
+from karaoke_gen.ffmpeg_capabilities import FFmpegCapabilityCache
+from karaoke_gen.stage_graph import StageGraph
+from karaoke_gen.process_runner import run_process, FFMPEG_PROGRESS_OPTION
+from karaoke_gen.video_encoding_profile import probe_concat_copy_parameters, concat_copy_mismatches
 
 
 class KaraokeFinalise:
+    # Slowest realtime factor (seconds of media encoded per wall-clock second) expected from a full 4K encode
+    # on each kind of encoder; encode timeouts allow ENCODE_TIMEOUT_MARGIN times the resulting duration
+    DEFAULT_ENCODE_REALTIME_FACTORS = {"gpu": 1.0, "cpu": 0.2}
+    ENCODE_TIMEOUT_MARGIN = 2.0
+    MIN_ENCODE_TIMEOUT = 120
+
     def __init__(
         self,
         logger=None,
@@ -46,6 +57,12 @@ class KaraokeFinalise:
         non_interactive=False,
         user_youtube_credentials=None,  # Add support for pre-stored credentials
         server_side_mode=False,  # New parameter for server-side deployment
+        ffmpeg_capability_cache_file=None,  # Share ffmpeg/NVENC probe results across runs, see FFmpegCapabilityCache
+        cpu_only=False,  # Skip NVENC detection entirely and encode in software
+        encode_threads=None,  # CPU thread budget shared by ffmpeg jobs running in parallel (default: all cores)
+        progress_callback=None,  # Called with (description, progress report) while ffmpeg commands run
+        encode_realtime_factors=None,  # Slowest expected encode speed per encoder kind, see DEFAULT_ENCODE_REALTIME_FACTORS
+        encode_stall_timeout=120,  # Kill an ffmpeg command whose progress doesn't advance for this many seconds
     ):
         self.log_level = log_level
         self.log_formatter = log_formatter
@@ -69,9 +86,11 @@ class KaraokeFinalise:
         )
 
         # Path to the Windows PyInstaller frozen bundled ffmpeg.exe, or the system-installed FFmpeg binary on Mac/Linux
-        ffmpeg_path = os.path.join(sys._MEIPASS, "ffmpeg.exe") if getattr(sys, "frozen", False) else "ffmpeg"
+        self.ffmpeg_path = os.path.join(sys._MEIPASS, "ffmpeg.exe") if getattr(sys, "frozen", False) else "ffmpeg"
+
+        self.ffprobe_path = os.path.join(sys._MEIPASS, "ffprobe.exe") if getattr(sys, "frozen", False) else "ffprobe"
 
-        self.ffmpeg_base_command = f"{ffmpeg_path} -hide_banner -nostats"
+        self.ffmpeg_base_command = f"{self.ffmpeg_path} -hide_banner -nostats"
 
         if self.log_level == logging.DEBUG:
             self.ffmpeg_base_command += " -loglevel verbose"
@@ -138,9 +157,6 @@ class KaraokeFinalise:
 
         self.cdg_styles = cdg_styles
 
-        # Determine best available AAC codec
-        self.aac_codec = self.detect_best_aac_codec()
-
         self.keep_brand_code = keep_brand_code
 
         # MP4 output flags for better compatibility and streaming
@@ -150,8 +166,30 @@ class KaraokeFinalise:
         if self.non_interactive:
             self.ffmpeg_base_command += " -y"
 
-        # Detect and configure hardware acceleration
-        self.nvenc_available = self.detect_nvenc_support()
+        self.progress_callback = progress_callback
+        # One timing record per command run, see process_runner.run_process
+        self.command_timings = []
+
+        # Encode timeouts are sized from the duration of the media being finalised, once it's known
+        self.media_duration = None
+        self.encode_realtime_factors = {**self.DEFAULT_ENCODE_REALTIME_FACTORS, **(encode_realtime_factors or {})}
+        self.measured_realtime_factors = {}
+        self.encode_stall_timeout = encode_stall_timeout
+
+        self.encode_threads = encode_threads or os.cpu_count() or 1
+        # Set when a stage running in parallel fails, so the others stop before starting their next command
+        self.cancel_event = threading.Event()
+
+        self.cpu_only = cpu_only or bool(os.environ.get("KARAOKE_GEN_CPU_ONLY"))
+        ffmpeg_capability_cache_file = ffmpeg_capability_cache_file or os.environ.get("KARAOKE_GEN_FFMPEG_CAPABILITY_CACHE")
+        self.ffmpeg_capability_cache = (
+            FFmpegCapabilityCache(ffmpeg_capability_cache_file, logger=self.logger) if ffmpeg_capability_cache_file else None
+        )
+
+        # Determine best available AAC codec, then detect and configure hardware acceleration
+        capabilities = self.detect_ffmpeg_capabilities()
+        self.aac_codec = capabilities["aac_codec"]
+        self.nvenc_available = capabilities["nvenc_available"]
         self.configure_hardware_acceleration()
 
     def check_input_files_exist(self, base_name, with_vocals_file, instrumental_audio_file):
@@ -689,8 +727,70 @@ class KaraokeFinalise:
         artist, title = base_name.split(" - ", 1)
         return base_name, artist, title
 
+    def raise_if_cancelled(self, description):
+        if self.cancel_event.is_set():
+            raise Exception(f"Cancelled because another finalise step failed: {description}")
+
+    def probe_media_duration(self, file_path):
+        """Duration of file_path in seconds according to ffprobe, or None if it can't be determined."""
+        command = [self.ffprobe_path, "-v", "error", "-show_entries", "format=duration", "-of", "json", file_path]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=60)
+            return float(json.loads(result.stdout)["format"]["duration"])
+        except (OSError, subprocess.TimeoutExpired, ValueError, KeyError, TypeError):
+            return None
+
+    def encode_timeout(self, encoder_kind, default_timeout):
+        """
+        Timeout for an ffmpeg command over the media being finalised, or default_timeout if its duration is unknown.
+
+        Uses the configured realtime factor for encoder_kind, or the slowest one measured on this host if lower.
+        """
+        if self.media_duration is None:
+            return default_timeout
+
+        realtime_factor = min([self.encode_realtime_factors[encoder_kind]] + self.measured_realtime_factors.get(encoder_kind, []))
+        return max(self.MIN_ENCODE_TIMEOUT, round(self.media_duration / realtime_factor * self.ENCODE_TIMEOUT_MARGIN))
+
+    def run_command(self, command, description, timeout, encoder_kind="cpu"):
+        """
+        Run a shell command, reporting ffmpeg progress to progress_callback and recording its timing.
+
+        ffmpeg commands get a timeout sized from the media duration (see encode_timeout) and are killed if their
+        progress stalls; other commands use timeout as given.
+        """
+        stall_timeout = None
+        if command.startswith(self.ffmpeg_base_command):
+            command = command.replace(self.ffmpeg_base_command, f"{self.ffmpeg_base_command} {FFMPEG_PROGRESS_OPTION}", 1)
+            timeout = self.encode_timeout(encoder_kind, timeout)
+            stall_timeout = self.encode_stall_timeout
+            self.logger.debug(f"Timeout for {description}: {timeout}s, or {stall_timeout}s without progress")
+
+        progress_callback = None
+        if self.progress_callback is not None:
+            progress_callback = lambda progress: self.progress_callback(description, progress)
+
+        # Another finalise stage failing sets cancel_event, which kills this command rather than letting it run to the end
+        result = run_process(
+            command,
+            description=description,
+            progress_callback=progress_callback,
+            timeout=timeout,
+            stall_timeout=stall_timeout,
+            cancel_event=self.cancel_event,
+        )
+        self.command_timings.append(result.timing)
+        if stall_timeout is not None and result.returncode == 0 and result.timing["realtime_factor"]:
+            self.measured_realtime_factors.setdefault(encoder_kind, []).append(result.timing["realtime_factor"])
+        self.logger.info(
+            f"{description} took {result.timing['wall_seconds']:.1f}s"
+            + (f" ({result.timing['realtime_factor']}x realtime)" if result.timing["realtime_factor"] else "")
+        )
+        return result
+
     def execute_command(self, command, description):
         """Execute a shell command and log the output. For general commands (rclone, etc.)"""
+        self.raise_if_cancelled(description)
         self.logger.info(f"{description}")
         self.logger.debug(f"Executing command: {command}")
         
@@ -699,7 +799,7 @@ class KaraokeFinalise:
             return
         
         try:
-            result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=600)
+            result = self.run_command(command, description, timeout=600)
             
             # Log command output for debugging
             if result.stdout and result.stdout.strip():
@@ -719,8 +819,8 @@ class KaraokeFinalise:
             else:
                 self.logger.info(f"✓ Command completed successfully")
                 
-        except subprocess.TimeoutExpired:
-            error_msg = f"Command timed out after 600 seconds"
+        except subprocess.TimeoutExpired as e:
+            error_msg = str(e)
             self.logger.error(error_msg)
             raise Exception(f"{error_msg}: {command}")
         except Exception as e:
@@ -776,31 +876,35 @@ class KaraokeFinalise:
         
         self.execute_command_with_fallback(gpu_command, cpu_command, "Creating MP4 version with PCM audio")
 
-    def encode_lossy_mp4(self, input_file, output_file):
+    def ffmpeg_threads_option(self, threads):
+        """Output option limiting an ffmpeg job to its share of the CPU budget, or nothing to let ffmpeg decide."""
+        return f"-threads {threads} " if threads else ""
+
+    def encode_lossy_mp4(self, input_file, output_file, threads=None):
         """Create MP4 with AAC audio (lossy, for wider compatibility)"""
         # This is primarily an audio re-encoding operation, video is copied
         # Hardware acceleration doesn't provide significant benefit for copy operations
         ffmpeg_command = (
-            f'{self.ffmpeg_base_command} -i "{input_file}" '
+            f'{self.ffmpeg_base_command} -i "{input_file}" {self.ffmpeg_threads_option(threads)}'
             f'-c:v copy -c:a {self.aac_codec} -b:a 320k {self.mp4_flags} "{output_file}"'
         )
         self.execute_command(ffmpeg_command, "Creating MP4 version with AAC audio")
 
-    def encode_lossless_mkv(self, input_file, output_file):
+    def encode_lossless_mkv(self, input_file, output_file, threads=None):
         """Create MKV with FLAC audio (for YouTube)"""
         # This is primarily an audio re-encoding operation, video is copied
         # Hardware acceleration doesn't provide significant benefit for copy operations
         ffmpeg_command = (
-            f'{self.ffmpeg_base_command} -i "{input_file}" '
+            f'{self.ffmpeg_base_command} -i "{input_file}" {self.ffmpeg_threads_option(threads)}'
             f'-c:v copy -c:a flac "{output_file}"'
         )
         self.execute_command(ffmpeg_command, "Creating MKV version with FLAC audio for YouTube")
 
-    def encode_720p_version(self, input_file, output_file):
+    def encode_720p_version(self, input_file, output_file, threads=None):
         """Create 720p MP4 with AAC audio (for smaller file size) using hardware acceleration when available"""
         # Hardware-accelerated version with GPU scaling and encoding
         gpu_command = (
-            f'{self.ffmpeg_base_command} {self.hwaccel_decode_flags} -i "{input_file}" '
+            f'{self.ffmpeg_base_command} {self.hwaccel_decode_flags} -i "{input_file}" {self.ffmpeg_threads_option(threads)}'
             f'-c:v {self.video_encoder} -vf "{self.scale_filter}=1280:720" '
             f'{self.get_nvenc_quality_settings("medium")} -b:v 2000k '
             f'-c:a {self.aac_codec} -b:a 128k {self.mp4_flags} "{output_file}"'
@@ -808,13 +912,129 @@ class KaraokeFinalise:
         
         # Software fallback version
         cpu_command = (
-            f'{self.ffmpeg_base_command} -i "{input_file}" '
+            f'{self.ffmpeg_base_command} -i "{input_file}" {self.ffmpeg_threads_option(threads)}'
             f'-c:v libx264 -vf "scale=1280:720" -b:v 2000k -preset medium -tune animation '
             f'-c:a {self.aac_codec} -b:a 128k {self.mp4_flags} "{output_file}"'
         )
         
         self.execute_command_with_fallback(gpu_command, cpu_command, "Encoding 720p version of the final video")
 
+    def encode_all_outputs_single_pass(self, title_mov_file, karaoke_mp4_file, env_mov_input, ffmpeg_filter, output_files):
+        """
+        Create the lossless 4K MP4, AAC 4K MP4, FLAC MKV and 720p MP4 from one decode of the concatenated inputs.
+
+        The concat output is split in a filter graph: the 4K video is encoded once and written to all three 4K
+        files through the tee muxer (each with its own audio encoding), while a scaled copy feeds the 720p
+        output. Returns False if the single pass fails, so the caller can fall back to one command per output.
+        """
+        outputs = {
+            name: os.path.abspath(output_files[name])
+            for name in ["final_karaoke_lossless_mp4", "final_karaoke_lossy_mp4", "final_karaoke_lossless_mkv", "final_karaoke_lossy_720p_mp4"]
+        }
+
+        def tee_path(path):
+            # Escape the characters the tee muxer treats specially in its output list
+            return path.replace("\\", "\\\\").replace("'", "\\'").replace("|", "\\|")
+
+        mp4_movflags = "movflags=+faststart+frag_keyframe+empty_moov"
+        tee_outputs = shlex.quote(
+            f"[select=\\'v:0,a:0\\':f=mp4:{mp4_movflags}]{tee_path(outputs['final_karaoke_lossless_mp4'])}|"
+            f"[select=\\'v:0,a:1\\':f=mp4:{mp4_movflags}]{tee_path(outputs['final_karaoke_lossy_mp4'])}|"
+            f"[select=\\'v:0,a:2\\':f=matroska]{tee_path(outputs['final_karaoke_lossless_mkv'])}"
+        )
+
+        # Extend the concat graph so its output is split between the 4K tee output and the 720p output
+        split_filter = (
+            f'{ffmpeg_filter[:-1]};[outv]split=2[v4k][v720src];[v720src]{self.scale_filter}=1280:720[v720];'
+            f'[outa]asplit=4[apcm][aaac][aflac][a720]"'
+        )
+        tee_audio = (
+            f'-map "[apcm]" -map "[aaac]" -map "[aflac]" '
+            f"-c:a:0 pcm_s16le -c:a:1 {self.aac_codec} -b:a:1 320k -c:a:2 flac -flags +global_header "
+        )
+        output_720p_audio = f'-map "[a720]" -c:a {self.aac_codec} -b:a 128k {self.mp4_flags} {shlex.quote(outputs["final_karaoke_lossy_720p_mp4"])}'
+
+        gpu_command = (
+            f"{self.ffmpeg_base_command} {self.hwaccel_decode_flags} -i {title_mov_file} "
+            f"{self.hwaccel_decode_flags} -i {karaoke_mp4_file} {env_mov_input} {split_filter} "
+            f'-map "[v4k]" -c:v {self.video_encoder} {self.get_nvenc_quality_settings("lossless")} -pix_fmt yuv420p '
+            f"{tee_audio}-f tee {tee_outputs} "
+            f'-map "[v720]" -c:v {self.video_encoder} {self.get_nvenc_quality_settings("medium")} -b:v 2000k {output_720p_audio}'
+        )
+        cpu_command = (
+            f"{self.ffmpeg_base_command} -i {title_mov_file} -i {karaoke_mp4_file} {env_mov_input} {split_filter} "
+            f'-map "[v4k]" -c:v libx264 -pix_fmt yuv420p '
+            f"{tee_audio}-f tee {tee_outputs} "
+            f'-map "[v720]" -c:v libx264 -b:v 2000k -preset medium -tune animation {output_720p_audio}'
+        )
+
+        try:
+            self.execute_command_with_fallback(gpu_command, cpu_command, "Encoding all final video versions in a single pass")
+            return True
+        except Exception as e:
+            self.logger.warning(f"Single-pass encode failed, falling back to encoding each output separately: {e}")
+            # Don't leave partial outputs around for the per-output commands to trip over
+            for output_file in outputs.values():
+                if os.path.isfile(output_file):
+                    os.remove(output_file)
+            return False
+
+    def concat_copy_lossless_mp4(self, segment_files, output_file):
+        """
+        Join the title card, karaoke video and end card into the lossless MP4 with the concat demuxer, copying all streams.
+
+        This only works if every segment was encoded with the same parameters (see video_encoding_profile), which is
+        checked with ffprobe first. Returns False if they don't match or the copy fails, so the caller can re-encode.
+        """
+        segment_parameters = [probe_concat_copy_parameters(self.ffprobe_path, segment_file) for segment_file in segment_files]
+        if any(parameters is None for parameters in segment_parameters):
+            self.logger.info("Could not probe all video segments, re-encoding them instead of joining with stream copy")
+            return False
+
+        mismatches = concat_copy_mismatches(segment_parameters)
+        if mismatches:
+            self.logger.info(f"Video segments were encoded differently, re-encoding them instead of joining with stream copy: {'; '.join(mismatches)}")
+            return False
+
+        concat_list_file = f"{output_file}.concat.txt"
+        with open(concat_list_file, "w") as f:
+            for segment_file in segment_files:
+                escaped_path = os.path.abspath(segment_file).replace("'", "'\\''")
+                f.write(f"file '{escaped_path}'\n")
+
+        ffmpeg_command = (
+            f"{self.ffmpeg_base_command} -f concat -safe 0 -i {shlex.quote(concat_list_file)} "
+            f'-map 0 -c copy -movflags +faststart+frag_keyframe+empty_moov "{output_file}"'
+        )
+        try:
+            self.execute_command(ffmpeg_command, "Joining video segments into MP4 with PCM audio using stream copy")
+            return True
+        except Exception as e:
+            self.logger.warning(f"Stream copy join failed, re-encoding the video segments instead: {e}")
+            if os.path.isfile(output_file):
+                os.remove(output_file)
+            return False
+        finally:
+            os.remove(concat_list_file)
+
+    def encode_versions_from_lossless_mp4(self, output_files):
+        """
+        Create the AAC MP4, FLAC MKV and 720p MP4 from the lossless MP4 in parallel, splitting the CPU budget between them.
+
+        The MP4 and MKV only re-encode audio (the video is copied), so they get one thread each and the 720p
+        encode gets the rest.
+        """
+        lossless_mp4 = output_files["final_karaoke_lossless_mp4"]
+        threads_720p = max(1, self.encode_threads - 2)
+
+        stages = StageGraph(logger=self.logger)
+        stages.add_stage("lossy_mp4", lambda: self.encode_lossy_mp4(lossless_mp4, output_files["final_karaoke_lossy_mp4"], threads=1))
+        stages.add_stage("lossless_mkv", lambda: self.encode_lossless_mkv(lossless_mp4, output_files["final_karaoke_lossless_mkv"], threads=1))
+        stages.add_stage(
+            "720p_mp4", lambda: self.encode_720p_version(lossless_mp4, output_files["final_karaoke_lossy_720p_mp4"], threads=threads_720p)
+        )
+        stages.run(max_workers=min(3, self.encode_threads), cancel_event=self.cancel_event)
+
     def prepare_concat_filter(self, input_files):
         """Prepare the concat filter and additional input for end credits if present"""
         env_mov_input = ""
@@ -839,6 +1059,14 @@ class KaraokeFinalise:
                 self.logger.info(f"Skipping Karaoke MP4 remux and Final video renders, existing files will be used.")
                 return
 
+        # Size encode timeouts from the length of the final video (title card, karaoke video and end card)
+        segment_durations = [
+            self.probe_media_duration(path) for path in [input_files["title_mov"], with_vocals_file, input_files.get("end_mov")] if path and os.path.isfile(path)
+        ]
+        if segment_durations and None not in segment_durations:
+            self.media_duration = sum(segment_durations)
+            self.logger.info(f"Final video duration: {self.media_duration:.1f}s")
+
         # Create karaoke version with instrumental audio
         self.remux_with_instrumental(with_vocals_file, input_files["instrumental_audio"], output_files["karaoke_mp4"])
 
@@ -858,11 +1086,17 @@ class KaraokeFinalise:
         # Prepare concat filter for combining videos
         env_mov_input, ffmpeg_filter = self.prepare_concat_filter(input_files)
 
-        # Create all output versions
-        self.encode_lossless_mp4(title_mov_file, karaoke_mp4_file, env_mov_input, ffmpeg_filter, output_files["final_karaoke_lossless_mp4"])
-        self.encode_lossy_mp4(output_files["final_karaoke_lossless_mp4"], output_files["final_karaoke_lossy_mp4"])
-        self.encode_lossless_mkv(output_files["final_karaoke_lossless_mp4"], output_files["final_karaoke_lossless_mkv"])
-        self.encode_720p_version(output_files["final_karaoke_lossless_mp4"], output_files["final_karaoke_lossy_720p_mp4"])
+        segment_files = [input_files["title_mov"], output_files["karaoke_mp4"]]
+        if env_mov_input:
+            segment_files.append(input_files["end_mov"])
+
+        # Create all output versions. If the segments were encoded alike, only the derived versions need encoding;
+        # otherwise re-encode in one ffmpeg pass if possible, or else one command per output
+        if self.concat_copy_lossless_mp4(segment_files, output_files["final_karaoke_lossless_mp4"]):
+            self.encode_versions_from_lossless_mp4(output_files)
+        elif not self.encode_all_outputs_single_pass(title_mov_file, karaoke_mp4_file, env_mov_input, ffmpeg_filter, output_files):
+            self.encode_lossless_mp4(title_mov_file, karaoke_mp4_file, env_mov_input, ffmpeg_filter, output_files["final_karaoke_lossless_mp4"])
+            self.encode_versions_from_lossless_mp4(output_files)
 
         # Skip user confirmation in non-interactive mode for Modal deployment
         if not self.non_interactive:
@@ -1398,6 +1632,22 @@ class KaraokeFinalise:
 
         self.logger.info("Email template test complete. Check your Gmail drafts for the test email.")
 
+    def detect_ffmpeg_capabilities(self):
+        """Probe the AAC codec and NVENC support, via the capability cache if one is configured."""
+
+        def probe():
+            if self.cpu_only:
+                self.logger.info("CPU-only mode enabled, skipping NVENC detection")
+            return {
+                "aac_codec": self.detect_best_aac_codec(),
+                "nvenc_available": False if self.cpu_only else self.detect_nvenc_support(),
+            }
+
+        # Dry runs assume NVENC is available without checking, so they mustn't populate the cache
+        if self.ffmpeg_capability_cache is None or self.dry_run:
+            return probe()
+        return self.ffmpeg_capability_cache.get(self.ffmpeg_path, probe, cpu_only=self.cpu_only)
+
     def detect_best_aac_codec(self):
         """Detect the best available AAC codec (aac_at > libfdk_aac > aac)"""
         self.logger.info("Detecting best available AAC codec...")
@@ -1531,6 +1781,7 @@ class KaraokeFinalise:
 
     def execute_command_with_fallback(self, gpu_command, cpu_command, description):
         """Execute GPU command with automatic fallback to CPU if it fails."""
+        self.raise_if_cancelled(description)
         self.logger.info(f"{description}")
         
         if self.dry_run:
@@ -1544,7 +1795,7 @@ class KaraokeFinalise:
         if self.nvenc_available and gpu_command != cpu_command:
             self.logger.debug(f"Attempting hardware-accelerated encoding: {gpu_command}")
             try:
-                result = subprocess.run(gpu_command, shell=True, capture_output=True, text=True, timeout=300)
+                result = self.run_command(gpu_command, f"{description} (GPU)", timeout=300, encoder_kind="gpu")
                 
                 if result.returncode == 0:
                     self.logger.info(f"✓ Hardware acceleration successful")
@@ -1558,7 +1809,9 @@ class KaraokeFinalise:
                         self.logger.warning("Empty error output detected, retrying with verbose logging...")
                         verbose_gpu_command = gpu_command.replace("-loglevel fatal", "-loglevel error")
                         try:
-                            verbose_result = subprocess.run(verbose_gpu_command, shell=True, capture_output=True, text=True, timeout=300)
+                            verbose_result = self.run_command(
+                                verbose_gpu_command, f"{description} (GPU, verbose retry)", timeout=300, encoder_kind="gpu"
+                            )
                             self.logger.warning(f"Verbose GPU Command: {verbose_gpu_command}")
                             if verbose_result.stderr:
                                 self.logger.warning(f"FFmpeg STDERR (verbose): {verbose_result.stderr}")
@@ -1577,15 +1830,15 @@ class KaraokeFinalise:
                         self.logger.warning("FFmpeg STDOUT: (empty)")
                     self.logger.info("Falling back to software encoding...")
                     
-            except subprocess.TimeoutExpired:
-                self.logger.warning("✗ Hardware acceleration timed out, falling back to software encoding")
+            except subprocess.TimeoutExpired as e:
+                self.logger.warning(f"✗ Hardware acceleration timed out ({e}), falling back to software encoding")
             except Exception as e:
                 self.logger.warning(f"✗ Hardware acceleration failed with exception: {e}, falling back to software encoding")
         
         # Use CPU command (either as fallback or primary method)
         self.logger.debug(f"Running software encoding: {cpu_command}")
         try:
-            result = subprocess.run(cpu_command, shell=True, capture_output=True, text=True, timeout=600)
+            result = self.run_command(cpu_command, description, timeout=600)
             
             if result.returncode != 0:
                 error_msg = f"Software encoding failed with exit code {result.returncode}"
@@ -1603,8 +1856,8 @@ class KaraokeFinalise:
             else:
                 self.logger.info(f"✓ Software encoding successful")
                 
-        except subprocess.TimeoutExpired:
-            error_msg = "Software encoding timed out"
+        except subprocess.TimeoutExpired as e:
+            error_msg = f"Software encoding timed out: {e}"
             self.logger.error(error_msg)
             raise Exception(f"{error_msg}: {cpu_command}")
         except Exception as e:
@@ -1630,13 +1883,25 @@ class KaraokeFinalise:
         input_files = self.check_input_files_exist(base_name, with_vocals_file, instrumental_audio_file)
         output_files = self.prepare_output_filenames(base_name)
 
+        # The CDG/TXT zips don't depend on the video encodes, so in non-interactive mode they run alongside them.
+        # Interactive runs keep the original order so prompts don't interleave.
+        stages = StageGraph(logger=self.logger)
         if self.enable_cdg:
-            self.create_cdg_zip_file(input_files, output_files, artist, title)
+            stages.add_stage("cdg_zip", lambda: self.create_cdg_zip_file(input_files, output_files, artist, title))
 
         if self.enable_txt:
-            self.create_txt_zip_file(input_files, output_files)
+            # The TXT zip includes the MP3 extracted from the CDG zip
+            stages.add_stage(
+                "txt_zip",
+                lambda **_: self.create_txt_zip_file(input_files, output_files),
+                depends_on=["cdg_zip"] if self.enable_cdg else (),
+            )
+
+        stages.add_stage("video", lambda: self.remux_and_encode_output_video_files(with_vocals_file, input_files, output_files))
 
-        self.remux_and_encode_output_video_files(with_vocals_file, input_files, output_files)
+        self.cancel_event.clear()
+        self.command_timings = []
+        stages.run(max_workers=2 if self.non_interactive else 1, cancel_event=self.cancel_event)
 
         self.execute_optional_features(artist, title, base_name, input_files, output_files, replace_existing)
 
@@ -1653,6 +1918,7 @@ class KaraokeFinalise:
             "brand_code": self.brand_code,
             "new_brand_code_dir_path": self.new_brand_code_dir_path,
             "brand_code_dir_sharing_link": self.brand_code_dir_sharing_link,
+            "command_timings": list(self.command_timings),
         }
 
         if self.enable_cdg:
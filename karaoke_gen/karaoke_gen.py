@@ -4,14 +4,17 @@ import re
 import glob
 import logging
 import tempfile
+import copy
 import shutil
 import asyncio
+import functools
 import signal
 import time
 import fcntl
 import errno
 import psutil
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import importlib.resources as pkg_resources
 import json
 from dotenv import load_dotenv
@@ -26,6 +29,9 @@ from .config import (
 from .metadata import extract_info_for_online_media, parse_track_metadata
 from .file_handler import FileHandler
 from .audio_processor import AudioProcessor
+from .stem_cache import StemCache
+from .card_cache import CardRenderCache
+from .process_runner import ProcessRunner
 from .lyrics_processor import LyricsProcessor
 from .video_generator import VideoGenerator
 
@@ -38,6 +44,7 @@ class KaraokePrep:
         artist=None,
         title=None,
         filename_pattern=None,
+        max_concurrent_tracks=1,
         # Logging & Debugging
         dry_run=False,
         logger=None,
@@ -56,6 +63,13 @@ class KaraokePrep:
         other_stems_models=["htdemucs_6s.yaml"],
         model_file_dir=os.path.join(tempfile.gettempdir(), "audio-separator-models"),
         existing_instrumental=None,
+        model_pool=None,
+        separation_scheduler=None,
+        stem_cache_dir=None,
+        stem_cache_max_size_gb=20,
+        separation_threads=None,
+        separation_chunk_duration=None,
+        separation_chunk_overlap=5.0,
         # Lyrics Configuration
         lyrics_artist=None,
         lyrics_title=None,
@@ -67,6 +81,8 @@ class KaraokePrep:
         subtitle_offset_ms=0,
         # Style Configuration
         style_params_json=None,
+        card_cache_dir=None,
+        card_encode_profile="matching",
         # Add the new parameter
         skip_separation=False,
         # YouTube/Online Configuration
@@ -99,6 +115,7 @@ class KaraokePrep:
         self.artist = artist
         self.title = title
         self.filename_pattern = filename_pattern
+        self.max_concurrent_tracks = max(1, max_concurrent_tracks) # Folder/playlist tracks prepped at once
 
         # Input/Output - Keep these as they might be needed for logic outside handlers or passed to multiple handlers
         self.output_dir = output_dir
@@ -121,10 +138,13 @@ class KaraokePrep:
         self.existing_instrumental = existing_instrumental # Used in prep_single_track logic
         self.skip_separation = skip_separation # Used in prep_single_track logic
         self.model_file_dir = model_file_dir # Passed to AudioProcessor
+        self.stem_cache_dir = stem_cache_dir # Passed to AudioProcessor as a StemCache, if set
 
         # Style Config - Keep needed ones
         self.render_bounding_boxes = render_bounding_boxes # Passed to VideoGenerator
         self.style_params_json = style_params_json # Passed to LyricsProcessor
+        self.card_cache_dir = card_cache_dir # Passed to VideoGenerator as a CardRenderCache, if set
+        self.card_encode_profile = card_encode_profile # Passed to VideoGenerator
 
         # YouTube/Online Config
         self.cookies_str = cookies_str # Passed to metadata extraction and file download
@@ -144,11 +164,15 @@ class KaraokePrep:
         self.ffmpeg_base_command = setup_ffmpeg_command(self.log_level)
 
         # Instantiate Handlers
+        # Shared by everything in prep that runs ffmpeg, so their commands are checked and timed the same way
+        self.process_runner = ProcessRunner(logger=self.logger)
+
         self.file_handler = FileHandler(
             logger=self.logger,
             ffmpeg_base_command=self.ffmpeg_base_command,
             create_track_subfolders=self.create_track_subfolders,
             dry_run=self.dry_run,
+            process_runner=self.process_runner,
         )
 
         self.audio_processor = AudioProcessor(
@@ -161,6 +185,16 @@ class KaraokePrep:
              backing_vocals_models=backing_vocals_models, # Passed directly from args
              other_stems_models=other_stems_models, # Passed directly from args
              ffmpeg_base_command=self.ffmpeg_base_command,
+             model_pool=model_pool, # Shared SeparatorModelPool, if the caller is processing many tracks
+             separation_scheduler=separation_scheduler, # Shared SeparationScheduler bounding concurrent separations
+             stem_cache=(
+                 StemCache(self.stem_cache_dir, logger=self.logger, max_size_bytes=int(stem_cache_max_size_gb * 1024**3))
+                 if self.stem_cache_dir
+                 else None
+             ),
+             separation_threads=separation_threads, # CPU thread budget shared by separation stages running in parallel
+             chunk_duration=separation_chunk_duration, # Separate inputs longer than this (seconds) in overlapping windows
+             chunk_overlap=separation_chunk_overlap,
         )
 
         self.lyrics_processor = LyricsProcessor(
@@ -179,6 +213,9 @@ class KaraokePrep:
              render_bounding_boxes=self.render_bounding_boxes,
              output_png=self.output_png,
              output_jpg=self.output_jpg,
+             card_cache=CardRenderCache(self.card_cache_dir, logger=self.logger) if self.card_cache_dir else None,
+             card_encode_profile=self.card_encode_profile,
+             process_runner=self.process_runner,
         )
 
         self.logger.debug(f"Initialized title_format with extra_text: {self.title_format['extra_text']}")
@@ -189,6 +226,8 @@ class KaraokePrep:
 
         self.extracted_info = None  # Will be populated by extract_info_for_online_media if needed
         self.persistent_artist = None  # Used for playlists
+        self.separation_executor = None  # Shared by concurrent folder/playlist tracks, see _prep_tracks
+        self.separation_priority = 0  # Lower values get a separation slot first when tracks are queued
 
         self.logger.debug(f"KaraokePrep lossless_output_format: {self.lossless_output_format}")
 
@@ -320,11 +359,23 @@ class KaraokePrep:
 
                     self.logger.info(f"Copying input media from {self.input_media} to new directory...")
                     # Delegate to FileHandler
-                    processed_track["input_media"] = self.file_handler.copy_input_media(self.input_media, output_filename_no_extension)
+                    processed_track["input_media"] = await asyncio.to_thread(
+                        self.file_handler.copy_input_media, self.input_media, output_filename_no_extension
+                    )
+
+                    # Probe once and keep the result on the track, so later stages needn't probe the input again
+                    processed_track["input_media_probe"] = await asyncio.to_thread(
+                        self.file_handler.probe_audio, processed_track["input_media"]
+                    )
 
                     self.logger.info("Converting input media to WAV for audio processing...")
                     # Delegate to FileHandler
-                    processed_track["input_audio_wav"] = self.file_handler.convert_to_wav(processed_track["input_media"], output_filename_no_extension)
+                    processed_track["input_audio_wav"] = await asyncio.to_thread(
+                        self.file_handler.convert_to_wav,
+                        processed_track["input_media"],
+                        output_filename_no_extension,
+                        processed_track["input_media_probe"],
+                    )
 
             else:
                 # --- URL or Existing Files Handling ---
@@ -350,18 +401,27 @@ class KaraokePrep:
 
                     self.logger.info(f"Downloading input media from {self.url}...")
                     # Delegate to FileHandler
-                    processed_track["input_media"] = self.file_handler.download_video(self.url, output_filename_no_extension, self.cookies_str)
+                    processed_track["input_media"] = await asyncio.to_thread(
+                        self.file_handler.download_video, self.url, output_filename_no_extension, self.cookies_str
+                    )
 
                     self.logger.info("Extracting still image from downloaded media (if input is video)...")
                     # Delegate to FileHandler
-                    processed_track["input_still_image"] = self.file_handler.extract_still_image_from_video(
-                        processed_track["input_media"], output_filename_no_extension
+                    processed_track["input_still_image"] = await asyncio.to_thread(
+                        self.file_handler.extract_still_image_from_video, processed_track["input_media"], output_filename_no_extension
+                    )
+
+                    processed_track["input_media_probe"] = await asyncio.to_thread(
+                        self.file_handler.probe_audio, processed_track["input_media"]
                     )
 
                     self.logger.info("Converting downloaded video to WAV for audio processing...")
                     # Delegate to FileHandler
-                    processed_track["input_audio_wav"] = self.file_handler.convert_to_wav(
-                        processed_track["input_media"], output_filename_no_extension
+                    processed_track["input_audio_wav"] = await asyncio.to_thread(
+                        self.file_handler.convert_to_wav,
+                        processed_track["input_media"],
+                        output_filename_no_extension,
+                        processed_track["input_media_probe"],
                     )
                 else:
                      # This case means input_media was None, not a URL, and no existing files found
@@ -407,9 +467,8 @@ class KaraokePrep:
                     self.logger.info("Creating separation future (not skipping and no existing instrumental)...")
                     # Run separation in a separate thread
                     separation_future = asyncio.create_task(
-                        asyncio.to_thread(
-                            # Delegate to AudioProcessor
-                            self.audio_processor.process_audio_separation,
+                        # Delegate to AudioProcessor
+                        self._separate_audio(
                             audio_file=processed_track["input_audio_wav"],
                             artist_title=artist_title,
                             track_output_dir=track_output_dir,
@@ -515,7 +574,8 @@ class KaraokePrep:
             if not self.file_handler._file_exists(processed_track["title_video"]) and not os.environ.get("KARAOKE_GEN_SKIP_TITLE_END_SCREENS"):
                 self.logger.info(f"Creating title video...")
                 # Delegate to VideoGenerator
-                self.video_generator.create_title_video(
+                await asyncio.to_thread(
+                    self.video_generator.create_title_video,
                     artist=self.artist,
                     title=self.title,
                     format=self.title_format,
@@ -534,7 +594,8 @@ class KaraokePrep:
             if not self.file_handler._file_exists(processed_track["end_video"]) and not os.environ.get("KARAOKE_GEN_SKIP_TITLE_END_SCREENS"):
                 self.logger.info(f"Creating end screen video...")
                  # Delegate to VideoGenerator
-                self.video_generator.create_end_video(
+                await asyncio.to_thread(
+                    self.video_generator.create_end_video,
                     artist=self.artist,
                     title=self.title,
                     format=self.end_format,
@@ -570,8 +631,8 @@ class KaraokePrep:
                 # Only run separation if not skipped
                 if not self.skip_separation:
                     self.logger.info(f"Separating audio for track: {self.title} by {self.artist}")
-                    # Delegate to AudioProcessor (called directly, not in thread here)
-                    separation_results = self.audio_processor.process_audio_separation(
+                    # Delegate to AudioProcessor
+                    separation_results = await self._separate_audio(
                         audio_file=processed_track["input_audio_wav"], artist_title=artist_title, track_output_dir=track_output_dir
                     )
                     processed_track["separated_audio"] = separation_results
@@ -614,21 +675,95 @@ class KaraokePrep:
         self.logger.info("Cleanup complete, exiting...")
         sys.exit(0)  # Add this line to force exit
 
+    async def _separate_audio(self, audio_file, artist_title, track_output_dir):
+        """Run audio separation off the event loop, on the shared separation executor if one is set."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.separation_executor,
+            functools.partial(
+                self.audio_processor.process_audio_separation,
+                audio_file=audio_file,
+                artist_title=artist_title,
+                track_output_dir=track_output_dir,
+                priority=self.separation_priority,
+            ),
+        )
+
+    async def _prep_tracks(self, track_settings, after_prep=None):
+        """
+        Run prep_single_track once per entry in track_settings, up to max_concurrent_tracks at a time.
+
+        Each track runs on a shallow copy of this KaraokePrep with that entry's attributes applied, so tracks
+        don't trample each other's artist/title/input state but still share the handlers, model pool, stem
+        cache and separation scheduler. Separation for all tracks goes through one executor sized to the
+        scheduler's slots, with earlier tracks given priority. A failed track is logged and left out of the
+        results rather than aborting the rest; the results of successful tracks are returned in input order.
+        after_prep(track_index, track), if given, is run in a worker thread for each successfully prepped track.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_tracks)
+        owns_executor = self.max_concurrent_tracks > 1 and self.separation_executor is None
+        if owns_executor:
+            self.separation_executor = ThreadPoolExecutor(
+                max_workers=self.audio_processor.separation_scheduler.max_slots, thread_name_prefix="separation"
+            )
+
+        async def prep_track(track_index, settings):
+            track_prep = copy.copy(self)
+            for name, value in settings.items():
+                setattr(track_prep, name, value)
+            track_prep.separation_priority = track_index
+
+            async with semaphore:
+                track = await track_prep.prep_single_track()
+                if after_prep is not None and track is not None:
+                    await asyncio.to_thread(after_prep, track_index, track)
+                return track
+
+        try:
+            results = await asyncio.gather(
+                *(prep_track(track_index, settings) for track_index, settings in enumerate(track_settings)), return_exceptions=True
+            )
+        finally:
+            if owns_executor:
+                self.separation_executor.shutdown(wait=False)
+                self.separation_executor = None
+
+        tracks = []
+        failures = []
+        for track_index, result in enumerate(results):
+            if isinstance(result, BaseException):
+                if isinstance(result, asyncio.CancelledError):
+                    raise result
+                self.logger.error(f"Failed to prepare track {track_index + 1} of {len(track_settings)}: {result}")
+                failures.append(result)
+            elif result is not None:
+                tracks.append(result)
+
+        if failures and len(failures) == len(track_settings):
+            raise failures[0]
+        if failures:
+            self.logger.warning(f"{len(failures)} of {len(track_settings)} tracks failed to prepare, continuing with the rest")
+
+        return tracks
+
     async def process_playlist(self):
         if self.artist is None or self.title is None:
             raise Exception("Error: Artist and Title are required for processing a local file.")
 
         if "entries" in self.extracted_info:
-            track_results = []
-            self.logger.info(f"Found {len(self.extracted_info['entries'])} entries in playlist, processing each invididually...")
+            self.logger.info(
+                f"Found {len(self.extracted_info['entries'])} entries in playlist, processing up to {self.max_concurrent_tracks} at a time..."
+            )
+            track_settings = []
             for entry in self.extracted_info["entries"]:
-                self.extracted_info = entry
-                self.logger.info(f"Processing playlist entry with title: {self.extracted_info['title']}")
-                if not self.dry_run:
-                    track_results.append(await self.prep_single_track())
-                self.artist = self.persistent_artist
-                self.title = None
-            return track_results
+                self.logger.info(f"Queueing playlist entry with title: {entry['title']}")
+                track_settings.append({"extracted_info": entry, "artist": self.persistent_artist, "title": None})
+
+            self.artist = self.persistent_artist
+            self.title = None
+            if self.dry_run:
+                return []
+            return await self._prep_tracks(track_settings)
         else:
             raise Exception(f"Failed to find 'entries' in playlist, cannot process")
 
@@ -647,33 +782,32 @@ class KaraokePrep:
             self.logger.info(f"Output folder already exists: {output_folder_path}")
 
         pattern = re.compile(self.filename_pattern)
-        tracks = []
+        track_settings = []
+        track_output_dirs = []
 
         for filename in sorted(os.listdir(folder_path)):
             match = pattern.match(filename)
             if match:
                 title = match.group("title")
                 file_path = os.path.join(folder_path, filename)
-                self.input_media = file_path
-                self.title = title
 
                 track_index = match.group("index") if "index" in match.groupdict() else None
 
-                self.logger.info(f"Processing track: {track_index} with title: {title} from file: {filename}")
+                self.logger.info(f"Queueing track: {track_index} with title: {title} from file: {filename}")
 
                 track_output_dir = os.path.join(output_folder_path, f"{track_index} - {self.artist} - {title}")
 
                 if not self.dry_run:
-                    track = await self.prep_single_track()
-                    tracks.append(track)
-
-                    # Move the track folder to the output folder
-                    track_folder = track["track_output_dir"]
-                    shutil.move(track_folder, track_output_dir)
+                    track_settings.append({"input_media": file_path, "title": title})
+                    track_output_dirs.append(track_output_dir)
                 else:
                     self.logger.info(f"DRY RUN: Would move track folder to: {os.path.basename(track_output_dir)}")
 
-        return tracks
+        def move_track_folder(track_index, track):
+            # Move the track folder to the output folder
+            shutil.move(track["track_output_dir"], track_output_dirs[track_index])
+
+        return await self._prep_tracks(track_settings, after_prep=move_track_folder)
 
     async def process(self):
         if self.input_media is not None and os.path.isdir(self.input_media):
@@ -0,0 +1,214 @@
+import os
+import gc
+import sys
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import psutil
+
+
+class _PooledSeparator:
+    """A loaded Separator plus the bookkeeping the pool needs for it."""
+
+    def __init__(self, key, separator, memory_bytes):
+        self.key = key
+        self.separator = separator
+        self.memory_bytes = memory_bytes
+        self.in_use = False
+
+
+class SeparatorModelPool:
+    """
+    Keeps audio-separator models resident so they can be reused across stems and tracks.
+
+    Each model gets its own Separator instance (a Separator only holds one loaded model at a time),
+    keyed by model filename plus the settings that are captured at load time. A Separator is used by
+    one caller at a time, so when every instance of a model is busy and another copy fits in
+    max_memory_bytes alongside the instances in use, the pool loads another instance rather than making
+    concurrent separations with the same model take turns; otherwise callers wait for an instance to be
+    released. Idle instances are evicted least-recently-used first once the estimated memory of all
+    resident instances exceeds max_memory_bytes.
+    A pool can be shared between AudioProcessor instances, e.g. across all rows of a bulk CSV run.
+    """
+
+    def __init__(self, logger=None, log_level=logging.DEBUG, log_formatter=None, max_memory_bytes=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.log_level = log_level
+        self.log_formatter = log_formatter
+
+        self._max_memory_bytes = max_memory_bytes
+
+        # Resident instances in least-recently-used order (values unused), several per key if needed
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._loading = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_memory_bytes(self):
+        if self._max_memory_bytes is None:
+            # Leave the other half of the machine for the separation itself and everything else we run.
+            # Resolved on first use so that constructing a pool (e.g. in KaraokePrep.__init__) stays cheap.
+            self._max_memory_bytes = psutil.virtual_memory().total // 2
+        return self._max_memory_bytes
+
+    @contextmanager
+    def acquire(self, model_filename, model_file_dir, output_format):
+        """
+        Yield a Separator with model_filename loaded, loading it first if no idle instance is resident.
+
+        The Separator is used exclusively by the caller for the duration of the with block and
+        can't be evicted while in use.
+        """
+        entry = self._get_or_load(model_filename, model_file_dir, output_format)
+        try:
+            yield entry.separator
+        finally:
+            with self._available:
+                entry.in_use = False
+                self._evict_to_fit(0)
+                self._available.notify_all()
+
+    def _get_or_load(self, model_filename, model_file_dir, output_format):
+        key = (model_filename, model_file_dir, output_format)
+
+        with self._available:
+            while True:
+                instances = [entry for entry in self._entries if entry.key == key]
+                idle = next((entry for entry in reversed(instances) if not entry.in_use), None)
+                if idle is not None:
+                    self._entries.move_to_end(idle)
+                    idle.in_use = True
+                    self.hits += 1
+                    self.logger.info(f"Reusing resident separation model: {model_filename}")
+                    return idle
+
+                # Load one instance of a model at a time, and another copy only if it fits next to the models in use
+                if key not in self._loading and (not instances or self._fits_in_use(instances[0].memory_bytes)):
+                    self._loading.add(key)
+                    break
+
+                # Wait for an instance to be released or loaded rather than going over the memory budget
+                self._available.wait()
+
+        if instances:
+            self.logger.info(f"All instances of separation model {model_filename} are busy, loading another ({len(instances) + 1} in pool)")
+
+        try:
+            entry = self._load(key)
+        except BaseException:
+            with self._available:
+                self._loading.discard(key)
+                self._available.notify_all()
+            raise
+
+        with self._available:
+            self._loading.discard(key)
+            self.misses += 1
+            self._evict_to_fit(entry.memory_bytes)
+            entry.in_use = True
+            self._entries[entry] = None
+            self._available.notify_all()
+
+        return entry
+
+    def _fits_in_use(self, incoming_bytes):
+        """Whether incoming_bytes fits in the budget once every idle model is evicted. Caller holds self._lock."""
+        in_use_bytes = sum(entry.memory_bytes for entry in self._entries if entry.in_use)
+        return in_use_bytes + incoming_bytes <= self.max_memory_bytes
+
+    def _load(self, key):
+        model_filename, model_file_dir, output_format = key
+
+        from audio_separator.separator import Separator
+
+        self.logger.info(f"Loading separation model into pool: {model_filename} (model_file_dir: {model_file_dir}, output_format: {output_format})")
+
+        memory_before = self._current_memory_usage()
+        separator = Separator(
+            log_level=self.log_level,
+            log_formatter=self.log_formatter,
+            model_file_dir=model_file_dir,
+            output_format=output_format,
+        )
+        separator.load_model(model_filename=model_filename)
+        memory_bytes = self._current_memory_usage() - memory_before
+
+        if memory_bytes <= 0:
+            # RSS deltas are noisy when other threads allocate at the same time, fall back to the size on disk
+            memory_bytes = self._model_file_size(model_filename, model_file_dir)
+
+        self.logger.info(f"Loaded separation model {model_filename}, estimated resident size: {memory_bytes / 1024 / 1024:.0f} MB")
+        return _PooledSeparator(key, separator, memory_bytes)
+
+    def _evict_to_fit(self, incoming_bytes):
+        """Evict idle least-recently-used models until incoming_bytes fits in the budget. Caller holds self._lock."""
+        resident_bytes = sum(entry.memory_bytes for entry in self._entries)
+
+        for entry in list(self._entries):
+            if resident_bytes + incoming_bytes <= self.max_memory_bytes:
+                break
+
+            if entry.in_use:
+                continue
+
+            self.logger.info(f"Evicting separation model from pool to stay within memory budget: {entry.key[0]}")
+            del self._entries[entry]
+            resident_bytes -= entry.memory_bytes
+            self.evictions += 1
+            self._release(entry)
+
+        if resident_bytes + incoming_bytes > self.max_memory_bytes:
+            self.logger.warning(
+                f"Separation models in use exceed the pool memory budget "
+                f"({(resident_bytes + incoming_bytes) / 1024 / 1024:.0f} MB > {self.max_memory_bytes / 1024 / 1024:.0f} MB)"
+            )
+
+    def _release(self, entry):
+        entry.separator = None
+        gc.collect()
+
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def clear(self):
+        """Unload every idle model."""
+        with self._lock:
+            for entry in list(self._entries):
+                if not entry.in_use:
+                    del self._entries[entry]
+                    self._release(entry)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "resident_models": [entry.key[0] for entry in self._entries],
+                "resident_bytes": sum(entry.memory_bytes for entry in self._entries),
+                "max_memory_bytes": self.max_memory_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _current_memory_usage(self):
+        usage = psutil.Process().memory_info().rss
+
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            usage += torch.cuda.memory_allocated()
+
+        return usage
+
+    def _model_file_size(self, model_filename, model_file_dir):
+        model_path = os.path.join(model_file_dir, model_filename)
+        try:
+            return os.path.getsize(model_path)
+        except OSError:
+            return 0
@@ -0,0 +1,322 @@
+import os
+import sys
+import time
+import shlex
+import signal
+import logging
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Makes ffmpeg write machine-readable key=value progress reports to stdout
+FFMPEG_PROGRESS_OPTION = "-progress pipe:1"
+
+FFMPEG_PROGRESS_KEYS = {
+    "frame", "fps", "bitrate", "total_size", "out_time_us", "out_time_ms", "out_time",
+    "dup_frames", "drop_frames", "speed", "progress",
+}
+
+logger = logging.getLogger(__name__)
+
+# Lines of stderr kept from each command, enough to see why ffmpeg failed without holding a verbose log in memory
+STDERR_TAIL_LINES = 200
+
+
+class ProcessFailed(subprocess.CalledProcessError):
+    """Raised by ProcessRunner.run when a command exits with a non-zero status; stderr holds the tail of its stderr."""
+
+    def __init__(self, returncode, cmd, output=None, stderr=None, description=None):
+        super().__init__(returncode, cmd, output=output, stderr=stderr)
+        self.description = description
+
+    def __str__(self):
+        message = f"{self.description or 'Command'} failed with exit status {self.returncode}: {format_command(self.cmd)}"
+        if self.stderr and self.stderr.strip():
+            message += f"\n{self.stderr.strip()}"
+        return message
+
+
+class ProcessStalled(subprocess.TimeoutExpired):
+    """Raised by run_process when a command's ffmpeg progress stops advancing for stall_timeout seconds."""
+
+    def __str__(self):
+        return f"Command '{self.cmd}' made no progress for {self.timeout} seconds"
+
+
+class ProcessCancelled(subprocess.SubprocessError):
+    """Raised by run_process when its cancel_event is set before the command exits."""
+
+    def __init__(self, cmd, output=None, stderr=None):
+        self.cmd = cmd
+        self.output = output
+        self.stderr = stderr
+
+    def __str__(self):
+        return f"Command '{self.cmd}' was cancelled"
+
+
+class ProcessResult:
+    """Outcome of run_process: exit code, captured output (without progress reports) and a timing record."""
+
+    def __init__(self, returncode, stdout, stderr, timing):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timing = timing
+
+
+class FFmpegProgressParser:
+    """
+    Turns the key=value lines ffmpeg writes with -progress into one dict per report.
+
+    Each report has frame, fps, speed (as a multiple of realtime), out_time_seconds, total_size and
+    progress ("continue", or "end" for the last report); values ffmpeg reports as N/A are None.
+    """
+
+    def __init__(self):
+        self._fields = {}
+        self.latest = None
+
+    def feed(self, line):
+        """Consume one line of ffmpeg output, returning a report if the line completes one, else None."""
+        key, separator, value = line.strip().partition("=")
+        if not separator:
+            return None
+
+        self._fields[key] = value.strip()
+        if key != "progress":
+            return None
+
+        fields, self._fields = self._fields, {}
+        self.latest = {
+            "frame": self._number(fields.get("frame"), int),
+            "fps": self._number(fields.get("fps"), float),
+            "speed": self._number(fields.get("speed", "").rstrip("x"), float),
+            # Despite its name, out_time_ms is in microseconds, like out_time_us
+            "out_time_seconds": self._microseconds_to_seconds(fields.get("out_time_us", fields.get("out_time_ms"))),
+            "total_size": self._number(fields.get("total_size"), int),
+            "progress": fields["progress"],
+        }
+        return self.latest
+
+    @staticmethod
+    def is_progress_line(line):
+        key, separator, _ = line.partition("=")
+        key = key.strip()
+        return bool(separator) and (key in FFMPEG_PROGRESS_KEYS or key.startswith("stream_"))
+
+    @staticmethod
+    def _number(value, number_type):
+        try:
+            return number_type(value)
+        except (TypeError, ValueError):
+            return None
+
+    @classmethod
+    def _microseconds_to_seconds(cls, value):
+        microseconds = cls._number(value, int)
+        return microseconds / 1_000_000 if microseconds is not None and microseconds >= 0 else None
+
+
+def format_command(command):
+    """command as it would be typed in a shell, for logs and error messages."""
+    return command if isinstance(command, str) else shlex.join(command)
+
+
+def run_process(
+    command,
+    description=None,
+    progress_callback=None,
+    timeout=None,
+    stall_timeout=None,
+    shell=True,
+    stderr_tail_lines=STDERR_TAIL_LINES,
+    cancel_event=None,
+):
+    """
+    Run command, returning a ProcessResult once it exits.
+
+    Unlike subprocess.run, ffmpeg progress reports on stdout (see FFMPEG_PROGRESS_OPTION) are parsed as they
+    arrive and passed to progress_callback, only the last stderr_tail_lines lines of stderr are kept, and the
+    result carries a timing record: wall and CPU seconds, peak memory, output size, media seconds processed
+    and the realtime factor (media seconds per wall second).
+    If the command runs for longer than timeout seconds, or its progress (out_time) doesn't advance for
+    stall_timeout seconds, its whole process group is killed and subprocess.TimeoutExpired (ProcessStalled
+    for a stall) is raised. Likewise if cancel_event (a threading.Event, e.g. set by StageGraph when another
+    stage fails) is set while it runs, its process group is killed and ProcessCancelled is raised.
+    """
+    start_time = time.monotonic()
+    process = subprocess.Popen(
+        command,
+        shell=shell,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+        # Own process group, so a timeout kills ffmpeg and not just the shell that started it
+        start_new_session=os.name == "posix",
+    )
+
+    last_progress_time = [start_time]
+    killed_because = []
+    finished = threading.Event()
+
+    def watchdog():
+        while not finished.wait(min(1.0, timeout or 1.0, stall_timeout or 1.0)):
+            now = time.monotonic()
+            if cancel_event is not None and cancel_event.is_set():
+                error = ProcessCancelled(command)
+            elif timeout and now - start_time > timeout:
+                error = subprocess.TimeoutExpired(command, timeout)
+            elif stall_timeout and now - last_progress_time[0] > stall_timeout:
+                error = ProcessStalled(command, stall_timeout)
+            else:
+                continue
+            if process.returncode is None:
+                killed_because.append(error)
+                _kill_process_group(process)
+            return
+
+    watchdog_thread = threading.Thread(target=watchdog, daemon=True) if timeout or stall_timeout or cancel_event else None
+    if watchdog_thread:
+        watchdog_thread.start()
+
+    # Read stderr alongside stdout so neither pipe can fill up and block ffmpeg
+    stderr_tail = deque(maxlen=stderr_tail_lines)
+    stderr_reader = threading.Thread(target=lambda: stderr_tail.extend(process.stderr), daemon=True)
+    stderr_reader.start()
+
+    parser = FFmpegProgressParser()
+    stdout_lines = []
+    progress_callback_failures = 0
+    try:
+        for line in process.stdout:
+            if not FFmpegProgressParser.is_progress_line(line):
+                stdout_lines.append(line)
+                continue
+            previous = parser.latest
+            report = parser.feed(line)
+            if report is None:
+                continue
+            # Only count reports that show more output, so a hung encoder still reporting the same position is caught
+            if previous is None or (report["out_time_seconds"] or 0) > (previous["out_time_seconds"] or 0):
+                last_progress_time[0] = time.monotonic()
+            if progress_callback is not None:
+                try:
+                    progress_callback(report)
+                except Exception as e:
+                    # A progress report failing (e.g. a job store write) mustn't abort the command it reports on
+                    progress_callback_failures += 1
+                    log = logger.warning if progress_callback_failures == 1 else logger.debug
+                    log(f"Progress callback failed for {description or format_command(command)}: {e}")
+        returncode, cpu_seconds, max_rss_bytes = _wait_with_resource_usage(process)
+    except BaseException:
+        # Stop the command before closing its pipes, or it could block writing to them and the stderr reader never end
+        _kill_process_group(process)
+        process.wait()
+        raise
+    finally:
+        finished.set()
+        stderr_reader.join()
+        process.stdout.close()
+        process.stderr.close()
+
+    stdout, stderr = "".join(stdout_lines), "".join(stderr_tail)
+    if killed_because:
+        error = killed_because[0]
+        error.output, error.stderr = stdout, stderr
+        raise error
+
+    wall_seconds = time.monotonic() - start_time
+    media_seconds = parser.latest["out_time_seconds"] if parser.latest else None
+    timing = {
+        "description": description,
+        "returncode": returncode,
+        "wall_seconds": round(wall_seconds, 3),
+        "cpu_seconds": round(cpu_seconds, 3) if cpu_seconds is not None else None,
+        "max_rss_bytes": max_rss_bytes,
+        "output_size_bytes": parser.latest["total_size"] if parser.latest else None,
+        "media_seconds": media_seconds,
+        "realtime_factor": round(media_seconds / wall_seconds, 3) if media_seconds and wall_seconds > 0 else None,
+    }
+    return ProcessResult(returncode, stdout, stderr, timing)
+
+
+def _wait_with_resource_usage(process):
+    """
+    Reap process, returning (returncode, CPU seconds, peak resident set size in bytes) for it and its children,
+    with None for the resource usage if it's unavailable.
+    """
+    if not hasattr(os, "wait4"):
+        return process.wait(), None, None
+
+    # wait4 reports the rusage of just this child (including its reaped children, e.g. ffmpeg under a shell),
+    # which RUSAGE_CHILDREN can't do while other commands run in parallel threads
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in kilobytes on Linux but bytes on macOS
+    max_rss_bytes = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+    return process.returncode, rusage.ru_utime + rusage.ru_stime, max_rss_bytes
+
+
+def _kill_process_group(process):
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class ProcessRunner:
+    """
+    Runs external commands (ffmpeg, ffprobe, ...) for prep and finalise, at most max_concurrent at a time.
+
+    Commands given as argument lists run without a shell. A non-zero exit status raises ProcessFailed carrying
+    the tail of the command's stderr, rather than surfacing later as a missing output file. Each command's
+    timing record (see run_process) is logged and kept in timings. One runner can be shared between threads,
+    whose commands then queue for the runner's semaphore.
+    """
+
+    def __init__(self, logger=None, max_concurrent=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.max_concurrent = max_concurrent or os.cpu_count() or 1
+        self.timings = []
+
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+
+    def run(self, command, description, check=True, timeout=None, progress_callback=None):
+        """Run command once a slot is free, returning its ProcessResult. Raises ProcessFailed if check and it fails."""
+        self.logger.debug(f"Running command: {format_command(command)}")
+        with self._semaphore:
+            result = run_process(
+                command,
+                description=description,
+                progress_callback=progress_callback,
+                timeout=timeout,
+                shell=isinstance(command, str),
+            )
+
+        with self._lock:
+            self.timings.append(result.timing)
+        self.logger.debug(f"{description} took {result.timing['wall_seconds']:.1f}s ({result.timing['cpu_seconds']}s CPU)")
+
+        if check and result.returncode != 0:
+            raise ProcessFailed(result.returncode, command, output=result.stdout, stderr=result.stderr, description=description)
+        return result
+
+    def run_all(self, commands, check=True, timeout=None):
+        """
+        Run (command, description) pairs concurrently, up to max_concurrent at a time, returning their results in
+        order. If any fails, the first failure is raised once they have all finished.
+        """
+        commands = list(commands)
+        if not commands:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(len(commands), self.max_concurrent)) as executor:
+            futures = [executor.submit(self.run, command, description, check, timeout) for command, description in commands]
+        return [future.result() for future in futures]
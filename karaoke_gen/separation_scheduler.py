@@ -0,0 +1,218 @@
+import os
+import sys
+import json
+import time
+import fcntl
+import errno
+import heapq
+import logging
+import itertools
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import psutil
+
+
+def default_slot_count(cores_per_slot=4, memory_per_slot_bytes=6 * 1024**3):
+    """
+    Number of separations this machine can run at once, limited by CPU cores, system RAM and (if torch
+    is already loaded with CUDA) GPU memory. Can be overridden with KARAOKE_GEN_SEPARATION_SLOTS.
+    """
+    env_slots = os.environ.get("KARAOKE_GEN_SEPARATION_SLOTS")
+    if env_slots:
+        return max(1, int(env_slots))
+
+    cpu_slots = (os.cpu_count() or 1) // cores_per_slot
+    memory_slots = psutil.virtual_memory().total // memory_per_slot_bytes
+    slots = min(cpu_slots, memory_slots)
+
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        gpu_memory = sum(torch.cuda.get_device_properties(i).total_memory for i in range(torch.cuda.device_count()))
+        slots = min(slots, gpu_memory // memory_per_slot_bytes)
+
+    return max(1, slots)
+
+
+class SeparationScheduler:
+    """
+    Bounded job queue for audio separation.
+
+    Jobs in this process wait in a priority queue (lower priority value first, FIFO within a priority) and
+    are woken as soon as a slot is released. Slots are also backed by per-slot lock files in lock_dir so that
+    separate karaoke-gen processes on the same host share the same slots; the kernel drops a slot's flock
+    if its holder dies, so there are no stale locks to clean up.
+    """
+
+    def __init__(self, logger=None, max_slots=None, lock_dir=None, poll_interval=1.0):
+        self.logger = logger or logging.getLogger(__name__)
+        self._max_slots = max_slots
+        self.lock_dir = lock_dir or tempfile.gettempdir()
+        self.poll_interval = poll_interval
+
+        self._condition = threading.Condition()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._held_slots = set()
+
+        self.total_jobs = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.max_queue_depth = 0
+
+    @property
+    def max_slots(self):
+        if self._max_slots is None:
+            # Resolved on first use so that constructing a scheduler (e.g. in KaraokePrep.__init__) stays cheap
+            self._max_slots = default_slot_count()
+        return self._max_slots
+
+    @contextmanager
+    def slot(self, description, priority=0):
+        """Wait for a free separation slot, yielding its index while the caller holds it."""
+        wait_start = time.monotonic()
+
+        with self._condition:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._queue, ticket)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+
+            if self._queue[0] != ticket or self._active >= self.max_slots:
+                self.logger.info(
+                    f"Queued audio separation for {description} ({len(self._queue) - 1} ahead in queue, "
+                    f"{self._active}/{self.max_slots} slots busy)"
+                )
+
+            try:
+                while self._queue[0] != ticket or self._active >= self.max_slots:
+                    self._condition.wait()
+            except BaseException:
+                # Leave the queue, or a ticket left at its head would block every later job
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._condition.notify_all()
+                raise
+
+            heapq.heappop(self._queue)
+            self._active += 1
+            # The next job in the queue may be able to start too if more than one slot is free
+            self._condition.notify_all()
+
+        try:
+            slot_index, lock_file = self._acquire_slot_file(description)
+        except BaseException:
+            self._release_in_process_slot()
+            raise
+
+        wait_seconds = time.monotonic() - wait_start
+        with self._condition:
+            self.total_jobs += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+            queue_depth = len(self._queue)
+
+        self.logger.info(
+            f"Acquired separation slot {slot_index + 1}/{self.max_slots} for {description} "
+            f"after waiting {wait_seconds:.1f}s ({queue_depth} still queued)"
+        )
+
+        try:
+            yield slot_index
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            lock_file.close()
+            with self._condition:
+                self._held_slots.discard(slot_index)
+            self._release_in_process_slot()
+
+    def _release_in_process_slot(self):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    def _slot_lock_path(self, slot_index):
+        return os.path.join(self.lock_dir, f"audio_separator.slot{slot_index}.lock")
+
+    def _acquire_slot_file(self, description):
+        """Claim the first slot lock file not held by another process, polling if they are all taken."""
+        logged_holders = False
+
+        while True:
+            for slot_index in range(self.max_slots):
+                with self._condition:
+                    if slot_index in self._held_slots:
+                        continue
+                    self._held_slots.add(slot_index)
+
+                # Append mode so we don't wipe the current holder's metadata before we own the lock
+                lock_file = open(self._slot_lock_path(slot_index), "a+")
+                try:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError as e:
+                    lock_file.close()
+                    with self._condition:
+                        self._held_slots.discard(slot_index)
+                    if e.errno not in (errno.EAGAIN, errno.EACCES):
+                        raise
+                    continue
+
+                lock_file.seek(0)
+                lock_file.truncate()
+                json.dump({"pid": os.getpid(), "start_time": datetime.now().isoformat(), "track": description}, lock_file)
+                lock_file.flush()
+                return slot_index, lock_file
+
+            if not logged_holders:
+                self._log_slot_holders(description)
+                logged_holders = True
+
+            time.sleep(self.poll_interval)
+
+    def _log_slot_holders(self, description):
+        """Explain which other processes are holding the separation slots we're waiting for."""
+        holders = []
+        for slot_index in range(self.max_slots):
+            lock_file_path = self._slot_lock_path(slot_index)
+            try:
+                with open(lock_file_path, "r") as f:
+                    lock_data = json.load(f)
+                pid = lock_data.get("pid")
+                runtime_mins = (datetime.now() - datetime.fromisoformat(lock_data.get("start_time"))).total_seconds() / 60
+                running_track = lock_data.get("track")
+            except (OSError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+                continue
+
+            try:
+                proc = psutil.Process(pid)
+                cmdline_args = proc.cmdline()
+                # Handle potential bytes in cmdline args (cross-platform compatibility)
+                cmd = " ".join(arg.decode("utf-8", errors="replace") if isinstance(arg, bytes) else arg for arg in cmdline_args)
+            except (psutil.AccessDenied, psutil.NoSuchProcess):
+                cmd = "<command unavailable>"
+
+            holders.append(
+                f"  Slot {slot_index + 1}: Track: {running_track}, PID: {pid}, Running time: {runtime_mins:.1f} minutes\n"
+                f"    Command: {cmd}"
+            )
+
+        self.logger.info(
+            f"Waiting for other audio separation processes to free a slot before starting separation for {description}...\n"
+            f"Currently running process details:\n" + "\n".join(holders) + "\n"
+            f"To free a slot, stop the process holding it (its lock is released automatically when it exits)."
+        )
+
+    def stats(self):
+        with self._condition:
+            return {
+                "max_slots": self.max_slots,
+                "active_slots": self._active,
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self.max_queue_depth,
+                "total_jobs": self.total_jobs,
+                "total_wait_seconds": self.total_wait_seconds,
+                "average_wait_seconds": self.total_wait_seconds / self.total_jobs if self.total_jobs else 0.0,
+                "max_wait_seconds": self.max_wait_seconds,
+            }
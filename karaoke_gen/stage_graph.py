@@ -0,0 +1,65 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class StageGraph:
+    """
+    Runs a small DAG of named stages on a thread pool, starting each stage as soon as its dependencies finish.
+
+    Each stage function is called with the results of its dependencies as keyword arguments. Stages that are
+    ready at the same time are started in the order they were added, so with max_workers=1 the graph runs
+    exactly like the equivalent sequential code.
+    """
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self._stages = {}
+
+    def add_stage(self, name, func, depends_on=()):
+        for dependency in depends_on:
+            if dependency not in self._stages:
+                raise ValueError(f"Stage {name} depends on unknown stage {dependency}")
+        self._stages[name] = (func, tuple(depends_on))
+
+    def run(self, max_workers=1, cancel_event=None):
+        """
+        Run every stage, returning (results, timings) dicts keyed by stage name. Timings are in seconds.
+
+        If a stage fails, cancel_event (a threading.Event, if given) is set before waiting for the stages that are
+        still running, so they can check it and stop early (run_process kills a command given the event when it's set).
+        """
+        results = {}
+        timings = {}
+        pending = dict(self._stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage") as executor:
+            try:
+                while pending or running:
+                    for name, (func, depends_on) in list(pending.items()):
+                        if all(dependency in results for dependency in depends_on):
+                            del pending[name]
+                            self.logger.debug(f"Starting stage: {name}")
+                            dependency_results = {dependency: results[dependency] for dependency in depends_on}
+                            running[executor.submit(self._timed, func, dependency_results)] = name
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        results[name], timings[name] = future.result()
+                        self.logger.info(f"Stage {name} completed in {timings[name]:.1f}s")
+            except BaseException:
+                # Don't start anything new, but let stages that are already running finish before re-raising
+                if cancel_event is not None:
+                    cancel_event.set()
+                for future in running:
+                    future.cancel()
+                raise
+
+        return results, timings
+
+    def _timed(self, func, dependency_results):
+        start_time = time.monotonic()
+        result = func(**dependency_results)
+        return result, time.monotonic() - start_time
@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import hashlib
+
+import soundfile as sf
+
+from .content_cache import ContentAddressedCache
+
+
+class StemCache(ContentAddressedCache):
+    """
+    Persistent, content-addressed cache of audio-separator output stems.
+
+    Entries are keyed by a hash of the decoded PCM of the separation input plus the model filename and
+    output format, so the same audio submitted under a different filename, artist/title spelling or job id
+    is only separated once. Hit, miss and eviction counts across every process sharing the cache are kept in
+    a stats file next to the entries. See ContentAddressedCache for how entries are stored, restored and evicted.
+    """
+
+    STATS_FILENAME = "stats.json"
+    DESCRIPTION = "stem cache"
+
+    def __init__(self, cache_dir, logger=None, max_size_bytes=20 * 1024**3):
+        super().__init__(cache_dir, logger=logger, max_size_bytes=max_size_bytes)
+
+    def manifest_filenames(self, manifest):
+        return [stem["filename"] for stem in manifest.get("stems", [])]
+
+    def audio_hash(self, audio_file):
+        """SHA-256 of the decoded PCM, so containers/metadata that differ but hold the same audio share a key."""
+        return self._memoized_file_hash(audio_file, self._hash_decoded_audio)
+
+    def _hash_decoded_audio(self, audio_file):
+        digest = hashlib.sha256()
+        try:
+            with sf.SoundFile(audio_file) as audio:
+                digest.update(f"{audio.samplerate}:{audio.channels}:".encode())
+                for block in audio.blocks(blocksize=1024 * 1024, dtype="int16"):
+                    digest.update(block.tobytes())
+        except RuntimeError as e:
+            # Formats libsndfile can't decode are keyed by their raw bytes instead
+            self.logger.debug(f"Could not decode {audio_file} for stem cache hashing, hashing file bytes instead: {e}")
+            return self._hash_file_bytes(audio_file)
+        return digest.hexdigest()
+
+    def restore(self, audio_file, model_name, output_format, destination_dir):
+        """
+        Link or copy cached stems for this audio and model into destination_dir, named the way audio-separator
+        would have named them for audio_file. Returns the restored file paths, or None on a cache miss.
+        """
+        entry_dir = self._entry_dir(self._cache_key(audio_file, model_name, output_format))
+        input_base = os.path.splitext(os.path.basename(audio_file))[0]
+
+        # Hold the cache lock so the entry can't be evicted by another process while we link it out
+        with self._locked():
+            manifest = self._read_manifest(entry_dir)
+            if manifest is None:
+                self.misses += 1
+                self._update_stats("misses", 1)
+                self.logger.info(f"Stem cache miss for {os.path.basename(audio_file)} with model {model_name}")
+                return None
+
+            restored_files = []
+            for stem in manifest["stems"]:
+                destination_path = os.path.join(destination_dir, f"{input_base}{stem['suffix']}")
+                self._link_or_copy(os.path.join(entry_dir, stem["filename"]), destination_path)
+                restored_files.append(destination_path)
+
+            self._mark_used(entry_dir)
+
+            self.hits += 1
+            self._update_stats("hits", 1)
+
+        self.logger.info(f"Stem cache hit for {os.path.basename(audio_file)} with model {model_name}, restored {len(restored_files)} stems")
+        return restored_files
+
+    def store(self, audio_file, model_name, output_format, output_files):
+        """Add the stems audio-separator produced for audio_file with model_name to the cache."""
+        cache_key = self._cache_key(audio_file, model_name, output_format)
+        entry_dir = self._entry_dir(cache_key)
+        input_base = os.path.splitext(os.path.basename(audio_file))[0]
+
+        with self._locked():
+            if os.path.exists(os.path.join(entry_dir, self.MANIFEST_FILENAME)):
+                return
+
+            manifest = {"model_name": model_name, "output_format": output_format, "created_at": time.time(), "stems": []}
+            with self._staged_entry(entry_dir, manifest) as staging_dir:
+                for index, output_file in enumerate(output_files):
+                    basename = os.path.basename(output_file)
+                    suffix = basename[len(input_base) :] if basename.startswith(input_base) else f"_{basename}"
+                    filename = f"stem{index}{os.path.splitext(basename)[1]}"
+                    self._link_or_copy(output_file, os.path.join(staging_dir, filename))
+                    manifest["stems"].append({"filename": filename, "suffix": suffix})
+
+            self.logger.info(f"Stored {len(output_files)} stems in stem cache for model {model_name}")
+            self._evict_to_fit()
+
+    def stats(self):
+        """Hit/miss counters for this process and across all processes sharing the cache, plus its current size."""
+        with self._locked():
+            persistent = self._read_stats()
+            entries = self._entries()
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_hits": persistent.get("hits", 0),
+            "total_misses": persistent.get("misses", 0),
+            "evictions": persistent.get("evictions", 0),
+            "entries": len(entries),
+            "size_bytes": sum(size for _, _, size in entries),
+            "max_size_bytes": self.max_size_bytes,
+        }
+
+    def _cache_key(self, audio_file, model_name, output_format):
+        return hashlib.sha256(f"{self.audio_hash(audio_file)}:{model_name}:{output_format.lower()}".encode()).hexdigest()
+
+    def _evict_to_fit(self):
+        evicted = super()._evict_to_fit()
+        if evicted:
+            self._update_stats("evictions", evicted)
+        return evicted
+
+    def _read_stats(self):
+        try:
+            with open(os.path.join(self.cache_dir, self.STATS_FILENAME), "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _update_stats(self, counter, amount):
+        """Increment a counter in the shared stats file. Caller holds the cache lock."""
+        stats = self._read_stats()
+        stats[counter] = stats.get(counter, 0) + amount
+
+        stats_path = os.path.join(self.cache_dir, self.STATS_FILENAME)
+        with open(f"{stats_path}.tmp", "w") as f:
+            json.dump(stats, f)
+        os.replace(f"{stats_path}.tmp", stats_path)
@@ -7,13 +7,25 @@ import csv
 import asyncio
 import json
 import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from karaoke_gen import KaraokePrep
 from karaoke_gen.karaoke_finalise import KaraokeFinalise
+from karaoke_gen.model_pool import SeparatorModelPool
+from karaoke_gen.ffmpeg_capabilities import DEFAULT_CAPABILITY_CACHE_FILE
+from karaoke_gen.utils.status_journal import StatusJournal
 
 # Global logger
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)  # Set initial log level
 
+# Separation models stay loaded in this pool across every row of the CSV, set up in async_main
+model_pool = None
+
+# Row status changes for the input CSV are appended here rather than rewriting the CSV each time, set up in async_main
+status_journal = None
+
 
 async def process_track_prep(row, args, logger, log_formatter):
     """First phase: Process a track through prep stage only, without video rendering"""
@@ -37,6 +49,7 @@ async def process_track_prep(row, args, logger, log_formatter):
             dry_run=args.dry_run,
             render_video=False,  # First phase: no video rendering
             create_track_subfolders=True,
+            model_pool=model_pool,
         )
 
         tracks = await kprep.process()
@@ -85,7 +98,12 @@ async def process_track_render(row, args, logger, log_formatter):
             enable_cdg=args.enable_cdg,
             enable_txt=args.enable_txt,
             cdg_styles=cdg_styles,
-            non_interactive=True
+            non_interactive=True,
+            # Probe ffmpeg/NVENC capabilities once, not for every row
+            ffmpeg_capability_cache_file=DEFAULT_CAPABILITY_CACHE_FILE,
+            cpu_only=getattr(args, "cpu_only", False),
+            # Renders running in parallel share the machine's cores
+            encode_threads=max(1, (os.cpu_count() or 1) // getattr(args, "render_workers", 1)),
         )
         
         # Try to find the track directory
@@ -123,6 +141,7 @@ async def process_track_render(row, args, logger, log_formatter):
             render_video=True,  # Second phase: with video rendering
             create_track_subfolders=True,
             skip_transcription_review=True,
+            model_pool=model_pool,
         )
         
         tracks = await kprep.process()
@@ -150,6 +169,9 @@ async def process_track_render(row, args, logger, log_formatter):
 
 def update_csv_status(csv_path, row_index, new_status, dry_run=False):
     """Update the status of a processed row in the CSV file.
+
+    If a status journal is open for this CSV the change is appended to the journal, which is compacted
+    into the CSV periodically and at the end of the run. Otherwise the CSV is rewritten in place.
     
     Args:
         csv_path (str): Path to the CSV file
@@ -163,6 +185,14 @@ def update_csv_status(csv_path, row_index, new_status, dry_run=False):
     if dry_run:
         logger.info(f"DRY RUN: Would update row {row_index} in {csv_path} to status '{new_status}'")
         return False
+
+    if status_journal is not None and status_journal.csv_path == os.path.abspath(csv_path):
+        try:
+            status_journal.record(row_index, new_status)
+            return True
+        except Exception as e:
+            logger.error(f"Error recording CSV status in journal: {str(e)}")
+            return False
         
     try:
         # Read all rows
@@ -182,12 +212,13 @@ def update_csv_status(csv_path, row_index, new_status, dry_run=False):
             
         rows[row_index]["Status"] = new_status
 
-        # Write back to CSV
+        # Write a complete copy and rename it over the CSV, so a crash mid-write can't truncate it
         fieldnames = rows[0].keys()
-        with open(csv_path, "w", newline="") as f:
+        with open(f"{csv_path}.tmp", "w", newline="") as f:
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
             writer.writerows(rows)
+        os.replace(f"{csv_path}.tmp", csv_path)
         
         return True
     
@@ -235,6 +266,25 @@ def parse_arguments():
         action="store_true",
         help="Optional: Enable TXT ZIP generation during finalisation. Example: --enable_txt",
     )
+    parser.add_argument(
+        "--cpu_only",
+        action="store_true",
+        help="Optional: Skip NVENC detection and always encode video in software, e.g. on hosts without a GPU. Example: --cpu_only",
+    )
+
+    # Parallelism
+    parser.add_argument(
+        "--prep_workers",
+        type=int,
+        default=1,
+        help="Optional: number of tracks to prep at once (default: %(default)s). Example: --prep_workers=2",
+    )
+    parser.add_argument(
+        "--render_workers",
+        type=int,
+        default=1,
+        help="Optional: number of tracks to render and finalise at once, each in its own process (default: %(default)s). Example: --render_workers=2",
+    )
 
     # Logging & Debugging
     parser.add_argument(
@@ -332,16 +382,41 @@ def _read_csv_file(csv_path):
         raise # Re-raise other read errors
 
 
+def _render_row_in_worker_process(row, args):
+    """Run process_track_render in a render worker process, which has its own working directory to chdir around in."""
+    if not logger.handlers:
+        setup_logging(args.log_level)
+    return asyncio.run(process_track_render(row, args, logger, log_formatter))
+
+
+def _log_progress(results, total_tracks, start_time, logger):
+    """Log how many tracks have been rendered so far and the overall throughput."""
+    finished = results["render_success"] + results["render_failed"]
+    elapsed_seconds = time.monotonic() - start_time
+    tracks_per_hour = finished / elapsed_seconds * 3600 if elapsed_seconds > 0 else 0.0
+    logger.info(
+        f"Progress: {finished}/{total_tracks} tracks finished "
+        f"({results['prep_failed']} prep failed, {results['render_failed']} render failed), "
+        f"{elapsed_seconds / 60:.1f} minutes elapsed, {tracks_per_hour:.1f} tracks/hour"
+    )
+    return elapsed_seconds, tracks_per_hour
+
+
 async def process_csv_rows(csv_path, rows, args, logger, log_formatter):
     """Process all rows in a CSV file.
-    
+
+    Rows are pipelined: each row is rendered as soon as its own prep completes, rather than prepping every
+    row before rendering any. Up to args.prep_workers rows are prepped and args.render_workers rows rendered
+    at once. Rendering chdirs into the track directory, and the working directory is process-wide, so when
+    anything can run alongside a render it is run in a separate worker process.
+
     Args:
         csv_path (str): Path to the CSV file
         rows (list): List of CSV rows as dictionaries
         args (argparse.Namespace): Command line arguments
         logger (logging.Logger): Logger instance
         log_formatter (logging.Formatter): Log formatter
-        
+
     Returns:
         dict: A summary of the processing results
     """
@@ -352,17 +427,49 @@ async def process_csv_rows(csv_path, rows, args, logger, log_formatter):
         "render_failed": 0,
         "skipped": 0
     }
-    
-    # Phase 1: Initial prep for all tracks
-    logger.info("Starting Phase 1: Initial prep for all tracks")
-    for i, row in enumerate(rows):
-        status = row["Status"].lower() if "Status" in row else ""
-        if status != "uploaded":
-            logger.info(f"Skipping {row.get('Artist', 'Unknown')} - {row.get('Title', 'Unknown')} (Status: {row.get('Status', 'Unknown')})")
-            results["skipped"] += 1
-            continue
 
-        success = await process_track_prep(row, args, logger, log_formatter)
+    prep_workers = max(1, getattr(args, "prep_workers", 1))
+    render_workers = max(1, getattr(args, "render_workers", 1))
+    # With a single prep and render worker everything stays in this process, one step at a time
+    render_in_process = prep_workers == 1 and render_workers == 1
+
+    prep_semaphore = asyncio.Semaphore(prep_workers)
+    render_semaphore = asyncio.Semaphore(render_workers)
+    cwd_lock = asyncio.Lock()
+    render_executor = None
+    if not render_in_process:
+        render_executor = ProcessPoolExecutor(max_workers=render_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    loop = asyncio.get_running_loop()
+    start_time = time.monotonic()
+    total_tracks = 0
+
+    async def render_row(i, row):
+        async with render_semaphore:
+            if render_in_process:
+                async with cwd_lock:
+                    success = await process_track_render(row, args, logger, log_formatter)
+            else:
+                success = await loop.run_in_executor(render_executor, _render_row_in_worker_process, row, args)
+
+        if success:
+            results["render_success"] += 1
+            if not args.dry_run:
+                update_csv_status(csv_path, i, "Completed", args.dry_run)
+        else:
+            results["render_failed"] += 1
+            if not args.dry_run:
+                update_csv_status(csv_path, i, "Render_Failed", args.dry_run)
+        _log_progress(results, total_tracks, start_time, logger)
+
+    async def prep_and_render_row(i, row):
+        async with prep_semaphore:
+            if render_in_process:
+                async with cwd_lock:
+                    success = await process_track_prep(row, args, logger, log_formatter)
+            else:
+                success = await process_track_prep(row, args, logger, log_formatter)
+
         if success:
             results["prep_success"] += 1
             if not args.dry_run:
@@ -372,24 +479,31 @@ async def process_csv_rows(csv_path, rows, args, logger, log_formatter):
             if not args.dry_run:
                 update_csv_status(csv_path, i, "Prep_Failed", args.dry_run)
 
-    # Phase 2: Render and finalise all tracks
-    logger.info("Starting Phase 2: Render and finalise for all tracks")
+        # Render even if prep failed, as the render phase re-runs prep with video rendering enabled anyway
+        await render_row(i, row)
+
+    tasks = []
     for i, row in enumerate(rows):
         status = row["Status"].lower() if "Status" in row else ""
-        if status not in ["prep_complete", "uploaded"]:
-            logger.info(f"Skipping {row.get('Artist', 'Unknown')} - {row.get('Title', 'Unknown')} (Status: {row.get('Status', 'Unknown')})")
+        if status == "uploaded":
+            tasks.append(prep_and_render_row(i, row))
             continue
 
-        success = await process_track_render(row, args, logger, log_formatter)
-        if success:
-            results["render_success"] += 1
-            if not args.dry_run:
-                update_csv_status(csv_path, i, "Completed", args.dry_run)
-        else:
-            results["render_failed"] += 1
-            if not args.dry_run:
-                update_csv_status(csv_path, i, "Render_Failed", args.dry_run)
-    
+        logger.info(f"Skipping prep for {row.get('Artist', 'Unknown')} - {row.get('Title', 'Unknown')} (Status: {row.get('Status', 'Unknown')})")
+        results["skipped"] += 1
+        if status == "prep_complete":
+            tasks.append(render_row(i, row))
+
+    total_tracks = len(tasks)
+    logger.info(f"Processing {total_tracks} tracks with {prep_workers} prep worker(s) and {render_workers} render worker(s)")
+
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        if render_executor is not None:
+            render_executor.shutdown(wait=True)
+
+    results["elapsed_seconds"], results["tracks_per_hour"] = _log_progress(results, total_tracks, start_time, logger)
     return results
 
 
@@ -416,9 +530,24 @@ async def async_main():
          logger.warning("Log formatter not found, setting up default.")
          log_formatter = setup_logging(args.log_level)
 
+    # Share one model pool between all tracks so separation models are only loaded once per run
+    global model_pool
+    if model_pool is None:
+        model_pool = SeparatorModelPool(logger=logger, log_level=args.log_level, log_formatter=log_formatter)
+
+    # Journal row statuses, picking up where an interrupted run on this CSV left off
+    global status_journal
+    if not args.dry_run:
+        status_journal = StatusJournal(args.input_csv, logger=logger)
+        status_journal.replay(rows)
 
     # Process the CSV rows
-    results = await process_csv_rows(args.input_csv, rows, args, logger, log_formatter)
+    try:
+        results = await process_csv_rows(args.input_csv, rows, args, logger, log_formatter)
+    finally:
+        if status_journal is not None:
+            status_journal.compact()
+            status_journal = None
     
     # Log summary
     logger.info(f"Processing complete. Summary: {results}")
@@ -112,6 +112,12 @@ async def async_main():
         "--filename_pattern",
         help="Required if processing a folder: Python regex pattern to extract track names from filenames. Must contain a named group 'title'. Example: --filename_pattern='(?P<index>\\d+) - (?P<title>.+).mp3'",
     )
+    io_group.add_argument(
+        "--max_concurrent_tracks",
+        type=int,
+        default=1,
+        help="Optional: Number of tracks to prepare at once when processing a folder or playlist (default: %(default)s). Audio separation is still limited by --separation_slots. Example: --max_concurrent_tracks=4",
+    )
     io_group.add_argument(
         "--output_dir",
         default=".",
@@ -177,6 +183,37 @@ async def async_main():
         "--existing_instrumental",
         help="Optional: Path to an existing instrumental audio file. If provided, audio separation will be skipped.",
     )
+    audio_group.add_argument(
+        "--separation_slots",
+        type=int,
+        help="Optional: Number of audio separations allowed to run concurrently on this machine (default: sized from CPU cores and RAM). Example: --separation_slots=2",
+    )
+    audio_group.add_argument(
+        "--separation_threads",
+        type=int,
+        help="Optional: CPU threads to use for one track's audio separation, shared by the separation stages that run in parallel (default: CPU cores divided by separation slots). Example: --separation_threads=8",
+    )
+    audio_group.add_argument(
+        "--separation_chunk_duration",
+        type=float,
+        help="Optional: Separate inputs longer than this many seconds in overlapping chunks, to bound memory use on very long inputs such as DJ mixes. Example: --separation_chunk_duration=600",
+    )
+    audio_group.add_argument(
+        "--separation_chunk_overlap",
+        type=float,
+        default=5.0,
+        help="Optional: Seconds of overlap crossfaded between separation chunks (default: %(default)s).",
+    )
+    audio_group.add_argument(
+        "--stem_cache_dir",
+        help="Optional: Directory for a persistent cache of separated stems, so re-processing the same audio skips separation. Example: --stem_cache_dir=~/.cache/karaoke-gen/stems",
+    )
+    audio_group.add_argument(
+        "--stem_cache_max_size_gb",
+        type=float,
+        default=20,
+        help="Optional: Maximum size of the stem cache in GB, least recently used stems are evicted first (default: %(default)s).",
+    )
     audio_group.add_argument(
         "--instrumental_format",
         default="flac",
@@ -215,6 +252,16 @@ async def async_main():
         "--style_params_json",
         help="Optional: Path to JSON file containing style configuration. Example: --style_params_json='/path/to/style_params.json'",
     )
+    style_group.add_argument(
+        "--card_cache_dir",
+        help="Optional: Directory for a persistent cache of rendered title/end cards, so identical cards are only rendered and encoded once. Example: --card_cache_dir=~/.cache/karaoke-gen/cards",
+    )
+    style_group.add_argument(
+        "--card_encode_profile",
+        choices=["matching", "still"],
+        default="matching",
+        help="Optional: How to encode title/end card videos (default: %(default)s). 'matching' encodes them like the karaoke video so finalisation can join them without re-encoding; 'still' encodes each as a single keyframe, which is much cheaper but means finalisation re-encodes the joined video. Example: --card_encode_profile=still",
+    )
 
     # Finalisation Configuration
     finalise_group = parser.add_argument_group("Finalisation Configuration")
@@ -264,6 +311,11 @@ async def async_main():
         "--email_template_file",
         help="Optional: Path to email template file. Example: --email_template_file='/path/to/template.txt'",
     )
+    finalise_group.add_argument(
+        "--encode_threads",
+        type=int,
+        help="Optional: CPU threads shared by the finalisation encodes that run in parallel (default: all cores). Example: --encode_threads=8",
+    )
     finalise_group.add_argument(
         "--keep-brand-code",
         action="store_true",
@@ -410,6 +462,7 @@ async def async_main():
             cdg_styles=cdg_styles,
             keep_brand_code=True,  # Always keep brand code in edit mode
             non_interactive=args.yes,
+            encode_threads=args.encode_threads,
         )
         
         try:
@@ -523,6 +576,7 @@ async def async_main():
             cdg_styles=cdg_styles,
             keep_brand_code=getattr(args, 'keep_brand_code', False),
             non_interactive=args.yes,
+            encode_threads=args.encode_threads,
         )
         
         try:
@@ -642,12 +696,17 @@ async def async_main():
         os.environ["KARAOKE_GEN_SKIP_TITLE_END_SCREENS"] = "1"
         logger.info("Lyrics-only mode enabled: skipping audio separation and title/end screen generation")
 
+    # Separation slots are shared between all karaoke-gen processes on this host, so set them up via the environment
+    if args.separation_slots:
+        os.environ["KARAOKE_GEN_SEPARATION_SLOTS"] = str(args.separation_slots)
+
     # Step 1: Run KaraokePrep
     kprep_coroutine = KaraokePrep(
         input_media=input_media,
         artist=artist,
         title=title,
         filename_pattern=filename_pattern,
+        max_concurrent_tracks=args.max_concurrent_tracks,
         dry_run=args.dry_run,
         log_formatter=log_formatter,
         log_level=log_level,
@@ -662,6 +721,11 @@ async def async_main():
         other_stems_models=args.other_stems_models,
         model_file_dir=args.model_file_dir,
         existing_instrumental=args.existing_instrumental,
+        stem_cache_dir=os.path.expanduser(args.stem_cache_dir) if args.stem_cache_dir else None,
+        stem_cache_max_size_gb=args.stem_cache_max_size_gb,
+        separation_threads=args.separation_threads,
+        separation_chunk_duration=args.separation_chunk_duration,
+        separation_chunk_overlap=args.separation_chunk_overlap,
         skip_separation=args.skip_separation,
         lyrics_artist=args.lyrics_artist,
         lyrics_title=args.lyrics_title,
@@ -671,6 +735,8 @@ async def async_main():
         skip_transcription_review=args.skip_transcription_review,
         subtitle_offset_ms=args.subtitle_offset_ms,
         style_params_json=args.style_params_json,
+        card_cache_dir=os.path.expanduser(args.card_cache_dir) if args.card_cache_dir else None,
+        card_encode_profile=args.card_encode_profile,
     )
     # No await needed for constructor
     kprep = kprep_coroutine
@@ -739,6 +805,7 @@ async def async_main():
             cdg_styles=cdg_styles,
             keep_brand_code=getattr(args, 'keep_brand_code', False),
             non_interactive=args.yes,
+            encode_threads=args.encode_threads,
         )
 
         try:
@@ -0,0 +1,130 @@
+import os
+import csv
+import json
+import fcntl
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class StatusJournal:
+    """
+    Append-only JSONL sidecar recording row status changes for a bulk CSV.
+
+    Recording a status change appends one line to {csv_path}.journal.jsonl instead of rewriting the whole CSV,
+    so it costs O(1) however many rows there are. Every compact_every records (and when the run ends) the
+    journal is compacted: its statuses are applied to the CSV, which is replaced atomically, and the journal
+    is emptied. If a run dies before compacting, the next run replays the journal into the rows it reads so
+    it resumes from where the last one got to.
+
+    Appends and compactions hold a thread lock and an flock on the journal, so the journal can be shared by
+    worker threads and by other processes working on the same CSV.
+    """
+
+    JOURNAL_SUFFIX = ".journal.jsonl"
+
+    def __init__(self, csv_path, logger=None, compact_every=100):
+        self.csv_path = os.path.abspath(csv_path)
+        self.journal_path = f"{self.csv_path}{self.JOURNAL_SUFFIX}"
+        self.logger = logger or logging.getLogger(__name__)
+        self.compact_every = compact_every
+
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def record(self, row_index, status):
+        """Append a status change for the row at row_index (0-based, excluding the header)."""
+        entry = json.dumps({"row": row_index, "status": status, "timestamp": datetime.now().isoformat()})
+
+        with self._locked():
+            with open(self.journal_path, "a+b") as f:
+                # If a crash left a partial last line, start a fresh one so this entry isn't lost with it
+                end = f.seek(0, os.SEEK_END)
+                if end:
+                    f.seek(end - 1)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+                f.write(f"{entry}\n".encode())
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending += 1
+            if self._pending >= self.compact_every:
+                self._compact()
+
+    def replay(self, rows):
+        """Apply any statuses left in the journal by an earlier run to rows (as read from the CSV), returning rows."""
+        with self._locked():
+            statuses = self._read_journal()
+
+        for row_index, status in statuses.items():
+            if 0 <= row_index < len(rows):
+                rows[row_index]["Status"] = status
+
+        if statuses:
+            self.logger.info(f"Resumed {len(statuses)} row statuses from status journal {self.journal_path}")
+        return rows
+
+    def compact(self):
+        """Write the journalled statuses into the CSV and empty the journal."""
+        with self._locked():
+            self._compact()
+
+    def _compact(self):
+        """Caller holds the journal lock."""
+        statuses = self._read_journal()
+        self._pending = 0
+        if not statuses:
+            return
+
+        with open(self.csv_path, "r", newline="") as f:
+            reader = csv.DictReader(f)
+            fieldnames = reader.fieldnames
+            rows = list(reader)
+
+        for row_index, status in statuses.items():
+            if 0 <= row_index < len(rows):
+                rows[row_index]["Status"] = status
+            else:
+                self.logger.error(f"Row index {row_index} in status journal is out of range for CSV with {len(rows)} rows")
+
+        # Write a complete copy and rename it over the CSV, so a crash can't leave it truncated
+        temp_path = f"{self.csv_path}.tmp"
+        with open(temp_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.csv_path)
+
+        # Only empty the journal once the CSV holds everything in it
+        open(self.journal_path, "w").close()
+        self.logger.debug(f"Compacted {len(statuses)} row statuses from status journal into {self.csv_path}")
+
+    def _read_journal(self):
+        """Latest status per row index in the journal. Caller holds the journal lock."""
+        statuses = {}
+        try:
+            with open(self.journal_path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by a crash mid-append; everything before it is intact
+                        self.logger.warning(f"Ignoring partial line in status journal {self.journal_path}")
+                        continue
+                    statuses[entry["row"]] = entry["status"]
+        except FileNotFoundError:
+            pass
+        return statuses
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            with open(f"{self.journal_path}.lock", "a") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,87 @@
+import json
+import subprocess
+
+# Encode settings shared by everything that produces a segment of the final karaoke video, so finalise can join
+# the title card, karaoke video and end card with the concat demuxer instead of re-encoding all of them.
+FRAME_RATE = 30
+PIXEL_FORMAT = "yuv420p"
+AUDIO_SAMPLE_RATE = 44100
+AUDIO_CHANNELS = 2
+
+# Matches lyrics_transcriber's software encode of the (With Vocals) video, so the H.264 parameter sets of the
+# title/end cards come out identical to the karaoke video's
+VIDEO_ENCODE_ARGS = (
+    f"-c:v libx264 -preset fast -b:v 5000k -minrate 5000k -maxrate 20000k -bufsize 10000k -r {FRAME_RATE} -pix_fmt {PIXEL_FORMAT}"
+)
+
+# The karaoke video is remuxed with PCM audio in finalise
+AUDIO_ENCODE_ARGS = f"-c:a pcm_s16le -ar {AUDIO_SAMPLE_RATE} -ac {AUDIO_CHANNELS}"
+
+# How title/end cards are encoded: "matching" uses VIDEO_ENCODE_ARGS so finalise can stream-copy them, "still" is
+# far cheaper to encode but its H.264 parameter sets differ from the karaoke video's, so finalise re-encodes
+CARD_ENCODE_PROFILES = ("matching", "still")
+
+
+def still_card_video_encode_args(duration):
+    """
+    Video encode settings for a card that shows one image for duration seconds: a single keyframe followed by
+    frames that are all skipped, tuned for still content and left to constant quality rather than a bitrate floor.
+    """
+    keyframe_interval = int(duration * FRAME_RATE) + 1
+    return (
+        f"-c:v libx264 -preset veryfast -tune stillimage -crf 18 -g {keyframe_interval} -keyint_min {keyframe_interval} "
+        f"-sc_threshold 0 -r {FRAME_RATE} -pix_fmt {PIXEL_FORMAT}"
+    )
+
+# Stream fields which must be identical in every segment for the concat demuxer's output to be decodable.
+# extradata_hash covers the H.264 SPS/PPS, which players only read once from the start of an MP4.
+CONCAT_COPY_STREAM_FIELDS = {
+    "video": ("codec_name", "profile", "level", "width", "height", "pix_fmt", "r_frame_rate", "sample_aspect_ratio", "extradata_hash"),
+    "audio": ("codec_name", "sample_fmt", "sample_rate", "channels"),
+}
+
+
+def probe_concat_copy_parameters(ffprobe_path, file_path):
+    """
+    Parameters of file_path's streams that decide whether it can be stream-copied alongside other segments,
+    as a list with one dict per stream, or None if the file can't be probed.
+    """
+    command = [ffprobe_path, "-v", "error", "-show_data_hash", "sha256", "-show_streams", "-of", "json", file_path]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+
+    try:
+        streams = json.loads(result.stdout).get("streams", [])
+    except json.JSONDecodeError:
+        return None
+
+    parameters = []
+    for stream in streams:
+        fields = CONCAT_COPY_STREAM_FIELDS.get(stream.get("codec_type"))
+        if fields is None:
+            # Data/subtitle streams aren't part of the final video
+            continue
+        parameters.append({"codec_type": stream["codec_type"], **{field: stream.get(field) for field in fields}})
+    return parameters
+
+
+def concat_copy_mismatches(segment_parameters):
+    """
+    Differences between the first segment's stream parameters and each other segment's, as readable strings.
+    An empty list means the segments can be joined with the concat demuxer and -c copy.
+    """
+    reference = segment_parameters[0]
+    mismatches = []
+    for index, parameters in enumerate(segment_parameters[1:], start=1):
+        if len(parameters) != len(reference):
+            mismatches.append(f"segment {index} has {len(parameters)} streams, segment 0 has {len(reference)}")
+            continue
+        for stream_index, (expected, actual) in enumerate(zip(reference, parameters)):
+            for field, value in expected.items():
+                if actual.get(field) != value:
+                    mismatches.append(f"segment {index} stream {stream_index} {field}: {actual.get(field)} != {value}")
+    return mismatches
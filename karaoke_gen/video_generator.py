@@ -1,18 +1,46 @@
 import os
 import logging
 import importlib.resources as pkg_resources
+import shlex
 import shutil
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
+from .video_encoding_profile import (
+    FRAME_RATE,
+    AUDIO_SAMPLE_RATE,
+    AUDIO_ENCODE_ARGS,
+    VIDEO_ENCODE_ARGS,
+    CARD_ENCODE_PROFILES,
+    still_card_video_encode_args,
+)
+from .process_runner import ProcessRunner
 
 
 # Placeholder class or functions for video/image generation
 class VideoGenerator:
-    def __init__(self, logger, ffmpeg_base_command, render_bounding_boxes, output_png, output_jpg):
+    def __init__(
+        self,
+        logger,
+        ffmpeg_base_command,
+        render_bounding_boxes,
+        output_png,
+        output_jpg,
+        card_cache=None,
+        card_encode_profile="matching",
+        process_runner=None,
+    ):
+        if card_encode_profile not in CARD_ENCODE_PROFILES:
+            raise ValueError(f"Unknown card encode profile '{card_encode_profile}', expected one of {', '.join(CARD_ENCODE_PROFILES)}")
+
         self.logger = logger
         self.ffmpeg_base_command = ffmpeg_base_command
         self.render_bounding_boxes = render_bounding_boxes
         self.output_png = output_png
         self.output_jpg = output_jpg
+        self.card_cache = card_cache  # Optional CardRenderCache shared across tracks
+        self.card_encode_profile = card_encode_profile
+        self.process_runner = process_runner or ProcessRunner(logger=logger)
+        self._fonts = {}  # Loaded fonts by (font_path, size), as fitting text tries many sizes of the same font
 
     def parse_region(self, region_str):
         if region_str:
@@ -56,27 +84,24 @@ class VideoGenerator:
         if existing_image:
             return self._handle_existing_image(existing_image, output_image_filepath_noext, output_video_filepath, duration)
 
+        font_path = self._resolve_font_path(format) if format["font"] is not None else None
+
+        # Identical cards (e.g. the same end screen for every track) are only rendered once. The video is made
+        # from the PNG, so without it there's nothing worth caching.
+        image_key = None
+        if self.card_cache is not None and self.output_png:
+            texts = {"title": title_text, "artist": artist_text, "extra": extra_text}
+            image_key = self.card_cache.image_key(format, font_path, texts, resolution, self.render_bounding_boxes)
+            if self.card_cache.restore(image_key, self._image_output_files(output_image_filepath_noext)):
+                if duration > 0:
+                    self._create_video_from_image(f"{output_image_filepath_noext}.png", output_video_filepath, duration, resolution)
+                return
+
         # Create or load background
         background = self._create_background(format, resolution)
         draw = ImageDraw.Draw(background)
 
         if format["font"] is not None:
-            self.logger.info(f"Using font: {format['font']}")
-            # Check if the font path is absolute
-            if os.path.isabs(format["font"]):
-                font_path = format["font"]
-                if not os.path.exists(font_path):
-                    self.logger.warning(f"Font file not found at {font_path}, falling back to default font")
-                    font_path = None
-            else:
-                # Try to load from package resources
-                try:
-                    with pkg_resources.path("karaoke_gen.resources", format["font"]) as font_path:
-                        font_path = str(font_path)
-                except Exception as e:
-                    self.logger.warning(f"Could not load font from resources: {e}, falling back to default font")
-                    font_path = None
-
             # Render all text elements
             self._render_all_text(
                 draw,
@@ -91,55 +116,96 @@ class VideoGenerator:
 
         # Save images and create video
         self._save_output_files(
-            background, output_image_filepath_noext, output_video_filepath, duration, resolution
+            background, output_image_filepath_noext, output_video_filepath, duration, resolution, image_key
         )
 
-    def calculate_text_size_to_fit(self, draw, text, font_path, region):
-        font_size = 500  # Start with a large font size
-        font = ImageFont.truetype(font_path, size=font_size) if font_path and os.path.exists(font_path) else ImageFont.load_default()
+    def _resolve_font_path(self, format):
+        """Path of the font file named in format, or None to fall back to the default font."""
+        self.logger.info(f"Using font: {format['font']}")
+        # Check if the font path is absolute
+        if os.path.isabs(format["font"]):
+            font_path = format["font"]
+            if not os.path.exists(font_path):
+                self.logger.warning(f"Font file not found at {font_path}, falling back to default font")
+                font_path = None
+        else:
+            # Try to load from package resources
+            try:
+                with pkg_resources.path("karaoke_gen.resources", format["font"]) as font_path:
+                    font_path = str(font_path)
+            except Exception as e:
+                self.logger.warning(f"Could not load font from resources: {e}, falling back to default font")
+                font_path = None
+        return font_path
+
+    def _image_output_files(self, output_image_filepath_noext):
+        """The image files create_video writes, keyed by their name in the card render cache."""
+        output_files = {}
+        if self.output_png:
+            output_files["png"] = f"{output_image_filepath_noext}.png"
+        if self.output_jpg:
+            output_files["jpg"] = f"{output_image_filepath_noext}.jpg"
+        return output_files
 
+    def _load_font(self, font_path, size):
+        """Load font_path at size, or the default font if there's no such file, reusing fonts already loaded."""
+        key = (font_path, size)
+        if key not in self._fonts:
+            self._fonts[key] = ImageFont.truetype(font_path, size=size) if font_path and os.path.exists(font_path) else ImageFont.load_default()
+        return self._fonts[key]
+
+    def calculate_text_size_to_fit(self, draw, text, font_path, region):
         def get_text_size(text, font):
             bbox = draw.textbbox((0, 0), text, font=font)
             # Use the actual text height without the font's internal padding
             return bbox[2], bbox[3] - bbox[1]
 
-        text_width, text_height = get_text_size(text, font)
         target_height = region[3]  # Use full region height as target
 
-        while text_width > region[2] or text_height > target_height:
-            font_size -= 10
-            if font_size <= 150:
-                # Split the text into two lines
-                words = text.split()
-                mid = len(words) // 2
-                line1 = " ".join(words[:mid])
-                line2 = " ".join(words[mid:])
-
-                # Reset font size for two-line layout
-                font_size = 500
-                font = ImageFont.truetype(font_path, size=font_size) if font_path and os.path.exists(font_path) else ImageFont.load_default()
-
-                while True:
-                    text_width1, text_height1 = get_text_size(line1, font)
-                    text_width2, text_height2 = get_text_size(line2, font)
-                    total_height = text_height1 + text_height2
-
-                    # Add a small gap between lines (10% of line height)
-                    line_gap = text_height1 * 0.1
-                    total_height_with_gap = total_height + line_gap
-
-                    if max(text_width1, text_width2) <= region[2] and total_height_with_gap <= target_height:
-                        return font, (line1, line2)
-
-                    font_size -= 10
-                    if font_size <= 0:
-                        raise ValueError("Cannot fit text within the defined region.")
-                    font = ImageFont.truetype(font_path, size=font_size) if font_path and os.path.exists(font_path) else ImageFont.load_default()
-
-            font = ImageFont.truetype(font_path, size=font_size) if font_path and os.path.exists(font_path) else ImageFont.load_default()
+        def largest_fitting_font(font_sizes, fits):
+            """Binary search font_sizes (descending) for the largest size that fits, as text size grows with font size."""
+            low, high = 0, len(font_sizes) - 1
+            best = None
+            while low <= high:
+                mid = (low + high) // 2
+                font = self._load_font(font_path, font_sizes[mid])
+                if fits(font):
+                    best = font
+                    high = mid - 1
+                else:
+                    low = mid + 1
+            return best
+
+        def fits_one_line(font):
             text_width, text_height = get_text_size(text, font)
+            return text_width <= region[2] and text_height <= target_height
+
+        # Font sizes from 500 down to 160 in steps of 10 on one line, then down to 10 split over two lines
+        font = largest_fitting_font(range(500, 150, -10), fits_one_line)
+        if font is not None:
+            return font, text
+
+        # Split the text into two lines
+        words = text.split()
+        mid = len(words) // 2
+        line1 = " ".join(words[:mid])
+        line2 = " ".join(words[mid:])
 
-        return font, text
+        def fits_two_lines(font):
+            text_width1, text_height1 = get_text_size(line1, font)
+            text_width2, text_height2 = get_text_size(line2, font)
+            total_height = text_height1 + text_height2
+
+            # Add a small gap between lines (10% of line height)
+            line_gap = text_height1 * 0.1
+            total_height_with_gap = total_height + line_gap
+
+            return max(text_width1, text_width2) <= region[2] and total_height_with_gap <= target_height
+
+        font = largest_fitting_font(range(500, 0, -10), fits_two_lines)
+        if font is None:
+            raise ValueError("Cannot fit text within the defined region.")
+        return font, (line1, line2)
 
     def _render_text_in_region(self, draw, text, font_path, region, color, gradient=None, font=None):
         """Helper method to render text within a specified region."""
@@ -252,41 +318,27 @@ class VideoGenerator:
                 - start: Start point of gradient transition (0-1)
                 - stop: Stop point of gradient transition (0-1)
         """
-        mask = Image.new("L", size)
-        draw = ImageDraw.Draw(mask)
-
         width, height = size
         start = gradient_config["start"]
         stop = gradient_config["stop"]
 
-        if gradient_config["direction"] == "horizontal":
-            for x in range(width):
-                # Calculate position in gradient (0 to 1)
-                pos = x / width
-
-                # Calculate color intensity
-                if pos < start:
-                    intensity = 0
-                elif pos > stop:
-                    intensity = 255
-                else:
-                    # Linear interpolation between start and stop
-                    intensity = int(255 * (pos - start) / (stop - start))
+        if width == 0 or height == 0:
+            return Image.new("L", size)
 
-                draw.line([(x, 0), (x, height)], fill=intensity)
-        else:  # vertical
-            for y in range(height):
-                pos = y / height
-                if pos < start:
-                    intensity = 0
-                elif pos > stop:
-                    intensity = 255
-                else:
-                    intensity = int(255 * (pos - start) / (stop - start))
+        # Build the 1D ramp once with NumPy and stretch it across the other axis, rather than drawing a line per pixel
+        length = width if gradient_config["direction"] == "horizontal" else height
+        pos = np.arange(length) / length
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Linear interpolation between start and stop
+            ramp = 255 * (pos - start) / (stop - start)
+        ramp = np.where(pos < start, 0, np.where(pos > stop, 255, ramp)).astype(np.uint8)
 
-                draw.line([(0, y), (width, y)], fill=intensity)
+        if gradient_config["direction"] == "horizontal":
+            mask = np.broadcast_to(ramp[np.newaxis, :], (height, width))
+        else:  # vertical
+            mask = np.broadcast_to(ramp[:, np.newaxis], (height, width))
 
-        return mask
+        return Image.fromarray(np.ascontiguousarray(mask))
 
     def _handle_existing_image(self, existing_image, output_image_filepath_noext, output_video_filepath, duration):
         """Handle case where an existing image is provided."""
@@ -352,7 +404,7 @@ class VideoGenerator:
                 self._draw_bounding_box(draw, region, format["extra_text_color"])
 
     def _save_output_files(
-        self, background, output_image_filepath_noext, output_video_filepath, duration, resolution
+        self, background, output_image_filepath_noext, output_video_filepath, duration, resolution, image_key=None
     ):
         """Save the output image files and create video if needed."""
         # Save static background image
@@ -364,20 +416,46 @@ class VideoGenerator:
             background_rgb = background.convert("RGB")
             background_rgb.save(f"{output_image_filepath_noext}.jpg", quality=95)
 
+        if image_key is not None:
+            self.card_cache.store(image_key, self._image_output_files(output_image_filepath_noext))
+
         if duration > 0:
             self._create_video_from_image(f"{output_image_filepath_noext}.png", output_video_filepath, duration, resolution)
 
     def _create_video_from_image(self, image_path, video_path, duration, resolution=(3840, 2160)):
-        """Create a video from a static image."""
-        ffmpeg_command = (
-            f'{self.ffmpeg_base_command} -y -loop 1 -framerate 30 -i "{image_path}" '
-            f"-f lavfi -i anullsrc -c:v libx264 -r 30 -t {duration} -pix_fmt yuv420p "
-            f'-vf scale={resolution[0]}:{resolution[1]} -c:a aac -shortest "{video_path}"'
-        )
+        """
+        Create a video from a static image with a silent track matching the karaoke video's audio layout. With the
+        "matching" card encode profile the video is encoded like the karaoke video, so finalise can join them without
+        re-encoding; with "still" it's encoded as a single keyframe, which takes a fraction of the CPU.
+        """
+        if self.card_encode_profile == "matching":
+            input_frame_rate, video_encode_args = FRAME_RATE, VIDEO_ENCODE_ARGS
+        else:
+            # Decode and scale the image once a second rather than for every frame; -r duplicates it up to FRAME_RATE
+            input_frame_rate, video_encode_args = 1, still_card_video_encode_args(duration)
+
+        # An encode of the same image is reused, whichever card or track it was rendered for
+        video_key = None
+        if self.card_cache is not None:
+            video_key = self.card_cache.video_key(image_path, duration, resolution, [FRAME_RATE, video_encode_args, AUDIO_ENCODE_ARGS])
+            if self.card_cache.restore(video_key, {"video": video_path}):
+                return
+
+        ffmpeg_command = [
+            *shlex.split(self.ffmpeg_base_command),
+            *["-y", "-loop", "1", "-framerate", str(input_frame_rate), "-i", image_path],
+            *["-f", "lavfi", "-i", f"anullsrc=channel_layout=stereo:sample_rate={AUDIO_SAMPLE_RATE}"],
+            *shlex.split(video_encode_args),
+            *["-t", str(duration), "-vf", f"scale={resolution[0]}:{resolution[1]}"],
+            *shlex.split(AUDIO_ENCODE_ARGS),
+            *["-shortest", video_path],
+        ]
 
         self.logger.info("Generating video...")
-        self.logger.debug(f"Running command: {ffmpeg_command}")
-        os.system(ffmpeg_command)
+        self.process_runner.run(ffmpeg_command, f"Encoding {os.path.basename(video_path)}")
+
+        if video_key is not None and os.path.isfile(video_path):
+            self.card_cache.store(video_key, {"video": video_path})
 
     def _transform_text(self, text, transform_type):
         """Helper method to transform text based on specified type."""
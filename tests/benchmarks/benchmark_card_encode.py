@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Compare the cost of encoding a title/end card video with each card encode profile.
+
+Renders a 4K card with VideoGenerator, then encodes it with every profile in CARD_ENCODE_PROFILES, reporting the
+wall time, CPU time (of ffmpeg, from the children's rusage) and file size of each encode. Needs ffmpeg on the PATH.
+
+    python tests/benchmarks/benchmark_card_encode.py --duration 5 --repeats 3
+"""
+import os
+import time
+import logging
+import argparse
+import resource
+import tempfile
+import statistics
+
+from karaoke_gen.karaoke_gen import KaraokePrep
+from karaoke_gen.video_generator import VideoGenerator
+from karaoke_gen.video_encoding_profile import CARD_ENCODE_PROFILES
+
+
+def children_cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def benchmark_profile(profile, image_path, output_dir, duration, repeats, logger):
+    video_generator = VideoGenerator(logger, "ffmpeg -hide_banner -loglevel error", False, True, False, card_encode_profile=profile)
+    video_path = os.path.join(output_dir, f"card-{profile}.mov")
+
+    wall_seconds, cpu_seconds = [], []
+    for _ in range(repeats):
+        start_wall, start_cpu = time.perf_counter(), children_cpu_seconds()
+        video_generator._create_video_from_image(image_path, video_path, duration)
+        wall_seconds.append(time.perf_counter() - start_wall)
+        cpu_seconds.append(children_cpu_seconds() - start_cpu)
+
+    if not os.path.isfile(video_path):
+        raise RuntimeError(f"ffmpeg didn't produce {video_path}, is ffmpeg installed?")
+    return statistics.median(wall_seconds), statistics.median(cpu_seconds), os.path.getsize(video_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark title/end card video encode profiles.")
+    parser.add_argument("--duration", type=float, default=5, help="Card duration in seconds (default: %(default)s)")
+    parser.add_argument("--repeats", type=int, default=3, help="Encodes per profile; the median is reported (default: %(default)s)")
+    args = parser.parse_args()
+
+    logger = logging.getLogger("benchmark_card_encode")
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        # Render a real title card, so the encode sees representative text and background
+        kprep = KaraokePrep(logger=logger, output_png=True, output_jpg=False)
+        image_path_noext = os.path.join(output_dir, "card")
+        kprep.video_generator.create_video(
+            extra_text=kprep.title_format["extra_text"],
+            title_text="Benchmark Title",
+            artist_text="Benchmark Artist",
+            format=kprep.title_format,
+            output_image_filepath_noext=image_path_noext,
+            output_video_filepath=os.path.join(output_dir, "unused.mov"),
+            duration=0,
+        )
+
+        print(f"{'profile':<10} {'wall (s)':>10} {'cpu (s)':>10} {'size (KB)':>10}")
+        for profile in CARD_ENCODE_PROFILES:
+            wall, cpu, size = benchmark_profile(profile, f"{image_path_noext}.png", output_dir, args.duration, args.repeats, logger)
+            print(f"{profile:<10} {wall:>10.2f} {cpu:>10.2f} {size / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -505,7 +505,63 @@ class TestAsync:
         # Test
         with pytest.raises(Exception, match="Error: Filename pattern and artist are required for processing a folder"):
             await basic_karaoke_gen.process_folder()
-    
+
+    @pytest.mark.asyncio
+    async def test_process_folder_concurrent_tracks(self, basic_karaoke_gen, temp_dir):
+        """Test tracks in a folder are prepped concurrently and returned in input order."""
+        basic_karaoke_gen.input_media = temp_dir
+        basic_karaoke_gen.artist = "Test Artist"
+        basic_karaoke_gen.filename_pattern = r"(?P<index>\d+)_(?P<title>.+)\.mp3"
+        basic_karaoke_gen.max_concurrent_tracks = 2
+
+        for filename in ["01_Track1.mp3", "02_Track2.mp3", "03_Track3.mp3"]:
+            with open(os.path.join(temp_dir, filename), "w") as f:
+                f.write("mock audio content")
+
+        running = 0
+        max_running = 0
+
+        async def fake_prep_single_track(track_prep):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            # Let the first track finish last, to check results still come back in input order
+            await asyncio.sleep(0.05 if track_prep.title == "Track1" else 0.01)
+            running -= 1
+            return {"track_output_dir": track_prep.input_media, "title": track_prep.title}
+
+        with patch.object(KaraokePrep, "prep_single_track", fake_prep_single_track), \
+             patch("os.makedirs"), \
+             patch("shutil.move") as mock_move:
+            result = await basic_karaoke_gen.process_folder()
+
+        assert max_running == 2
+        assert [track["title"] for track in result] == ["Track1", "Track2", "Track3"]
+        assert mock_move.call_count == 3
+        # The original instance is left untouched by the per-track state
+        assert basic_karaoke_gen.title is None
+        assert basic_karaoke_gen.separation_executor is None
+
+    @pytest.mark.asyncio
+    async def test_process_playlist_isolates_track_failures(self, basic_karaoke_gen):
+        """Test one failing playlist entry doesn't stop the others."""
+        basic_karaoke_gen.artist = "Test Artist"
+        basic_karaoke_gen.title = "Test Title"
+        basic_karaoke_gen.persistent_artist = "Test Artist"
+        basic_karaoke_gen.max_concurrent_tracks = 3
+        basic_karaoke_gen.extracted_info = {"entries": [{"title": "Track 1"}, {"title": "Track 2"}, {"title": "Track 3"}]}
+
+        async def fake_prep_single_track(track_prep):
+            if track_prep.extracted_info["title"] == "Track 2":
+                raise Exception("Download failed")
+            return {"title": track_prep.extracted_info["title"]}
+
+        with patch.object(KaraokePrep, "prep_single_track", fake_prep_single_track):
+            result = await basic_karaoke_gen.process_playlist()
+
+        assert result == [{"title": "Track 1"}, {"title": "Track 3"}]
+        basic_karaoke_gen.logger.error.assert_any_call("Failed to prepare track 2 of 3: Download failed")
+
     @pytest.mark.asyncio
     async def test_process_local_file(self, basic_karaoke_gen, temp_dir):
         """Test processing a local file."""
@@ -3,11 +3,20 @@ import pytest
 import glob
 import json
 import tempfile
-from unittest.mock import MagicMock, patch, call, mock_open
+import shutil
+import threading
+import time
+from unittest.mock import MagicMock, PropertyMock, patch, call, mock_open
 import datetime as dt # Use alias to avoid conflict
 import fcntl
+import numpy as np
+import soundfile as sf
 from pydub import AudioSegment
 from karaoke_gen.karaoke_gen import KaraokePrep
+from karaoke_gen.model_pool import SeparatorModelPool
+from karaoke_gen.separation_scheduler import SeparationScheduler
+from karaoke_gen.stage_graph import StageGraph
+from karaoke_gen.stem_cache import StemCache
 from audio_separator.separator import Separator # Keep for patching target
 
 class TestAudio:
@@ -64,6 +73,90 @@ class TestAudio:
                 instrumental_path
             )
     
+    def test_separate_audio_reuses_loaded_model(self, basic_karaoke_gen, temp_dir):
+        """Test that a second separation with the same model reuses the resident Separator."""
+        audio_file = os.path.join(temp_dir, "input.wav")
+        with open(audio_file, "w") as f:
+            f.write("mock audio content")
+
+        mock_separator = MagicMock()
+        mock_separator.separate.return_value = [
+            "input_(Vocals)_test_model.flac",
+            "input_(Instrumental)_test_model.flac",
+        ]
+
+        with patch('audio_separator.separator.Separator', return_value=mock_separator) as mock_separator_class, \
+             patch('os.rename'):
+            for _ in range(2):
+                basic_karaoke_gen.audio_processor.separate_audio(
+                    audio_file=audio_file,
+                    model_name="test_model.ckpt",
+                    artist_title="Test Artist - Test Title",
+                    track_output_dir=temp_dir,
+                    instrumental_path=os.path.join(temp_dir, "instrumental.flac"),
+                    vocals_path=os.path.join(temp_dir, "vocals.flac"),
+                )
+
+        mock_separator_class.assert_called_once()
+        mock_separator.load_model.assert_called_once_with(model_filename="test_model.ckpt")
+        assert mock_separator.separate.call_count == 2
+
+        stats = basic_karaoke_gen.audio_processor.model_pool.stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 1
+
+    def test_model_pool_evicts_least_recently_used(self, mock_logger):
+        """Test that the model pool unloads idle models once the memory budget is exceeded."""
+        pool = SeparatorModelPool(logger=mock_logger, max_memory_bytes=150)
+
+        with patch('audio_separator.separator.Separator', side_effect=lambda **kwargs: MagicMock()), \
+             patch.object(SeparatorModelPool, '_current_memory_usage', side_effect=[0, 100, 0, 100]):
+            with pool.acquire("model_a.ckpt", "/models", "FLAC"):
+                pass
+            with pool.acquire("model_b.ckpt", "/models", "FLAC"):
+                pass
+
+        stats = pool.stats()
+        assert stats["resident_models"] == ["model_b.ckpt"]
+        assert stats["evictions"] == 1
+
+    def test_model_pool_loads_another_instance_when_busy(self, mock_logger):
+        """Test a second caller of a busy model gets its own instance when the memory budget allows one."""
+        pool = SeparatorModelPool(logger=mock_logger, max_memory_bytes=250)
+
+        with patch('audio_separator.separator.Separator', side_effect=lambda **kwargs: MagicMock()), \
+             patch.object(SeparatorModelPool, '_current_memory_usage', side_effect=[0, 100, 0, 100]):
+            with pool.acquire("model_a.ckpt", "/models", "FLAC") as first:
+                with pool.acquire("model_a.ckpt", "/models", "FLAC") as second:
+                    assert second is not first
+
+        stats = pool.stats()
+        assert stats["resident_models"] == ["model_a.ckpt", "model_a.ckpt"]
+        assert stats["misses"] == 2
+
+    def test_model_pool_waits_for_busy_instance_over_budget(self, mock_logger):
+        """Test a second caller of a busy model waits for it to be released when another copy wouldn't fit."""
+        pool = SeparatorModelPool(logger=mock_logger, max_memory_bytes=150)
+        acquired = []
+
+        def use_model():
+            with pool.acquire("model_a.ckpt", "/models", "FLAC") as separator:
+                acquired.append(separator)
+
+        with patch('audio_separator.separator.Separator', side_effect=lambda **kwargs: MagicMock()), \
+             patch.object(SeparatorModelPool, '_current_memory_usage', side_effect=[0, 100]):
+            with pool.acquire("model_a.ckpt", "/models", "FLAC") as first:
+                waiter = threading.Thread(target=use_model)
+                waiter.start()
+                time.sleep(0.1)
+                assert acquired == []
+            waiter.join(timeout=5)
+
+        assert acquired == [first]
+        stats = pool.stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 1
+
     def test_separate_audio_invalid_audio_file(self, basic_karaoke_gen):
         """Test separating audio with an invalid audio file."""
         with pytest.raises(Exception, match="Error: Invalid audio source provided."):
@@ -142,6 +235,11 @@ class TestAudio:
              patch('os.system'), \
              patch('builtins.open', mock_open(read_data='{"pid": 123, "start_time": "2023-01-01T11:00:00", "track": "Old Track"}')) as mock_file_open, \
              patch.object(basic_karaoke_gen.audio_processor, '_normalize_audio_files') as mock_normalize_files, \
+             patch.object(basic_karaoke_gen.audio_processor, '_read_audio'), \
+             patch.object(basic_karaoke_gen.audio_processor, '_mix_and_normalize') as mock_mix, \
+             patch.object(SeparatorModelPool, 'max_memory_bytes', new_callable=PropertyMock, return_value=8 * 1024**3), \
+             patch.object(SeparatorModelPool, '_current_memory_usage', return_value=0), \
+             patch.object(SeparationScheduler, 'max_slots', new_callable=PropertyMock, return_value=1), \
              patch.object(basic_karaoke_gen.file_handler, '_file_exists') as mock_file_exists:
 
             # Configure _file_exists side effect: False initially, then True for normalization checks
@@ -165,6 +263,9 @@ class TestAudio:
             # Configure the mock datetime object
             mock_datetime.now.return_value = dt.datetime.fromisoformat("2023-01-01T12:00:00")
             mock_datetime.fromisoformat.side_effect = lambda *args, **kwargs: dt.datetime.fromisoformat(*args, **kwargs)
+
+            # Run the separation stages one at a time so the ordered side effects above line up
+            basic_karaoke_gen.audio_processor.max_parallel_stages = 1
             
             # Call the method
             result = basic_karaoke_gen.audio_processor.process_audio_separation(
@@ -187,7 +288,129 @@ class TestAudio:
             
             # Verify _normalize_audio_files was called once
             assert mock_normalize_files.call_count == 1
+
+            # Verify the instrumental was mixed with the backing vocals
+            assert mock_mix.call_count == 1
+
+            # Verify each stage was timed
+            assert set(result["stage_timings"]) == {"clean_instrumental", "other_stems", "backing_vocals", "combined_instrumentals", "normalize"}
     
+    def test_stage_graph_runs_independent_stages_concurrently(self, mock_logger):
+        """Test that independent stages overlap and dependent stages get their dependencies' results."""
+        # Both independent stages must be running at the same time to get past the barrier
+        barrier = threading.Barrier(2, timeout=5)
+
+        def independent_stage(value):
+            barrier.wait()
+            return value
+
+        stages = StageGraph(logger=mock_logger)
+        stages.add_stage("clean_instrumental", lambda: independent_stage({"vocals": "vocals.flac"}))
+        stages.add_stage("other_stems", lambda: independent_stage({"htdemucs_6s.yaml": {}}))
+        stages.add_stage(
+            "backing_vocals",
+            lambda clean_instrumental: f"backing vocals from {clean_instrumental['vocals']}",
+            depends_on=["clean_instrumental"],
+        )
+
+        results, timings = stages.run(max_workers=2)
+
+        assert results["backing_vocals"] == "backing vocals from vocals.flac"
+        assert results["other_stems"] == {"htdemucs_6s.yaml": {}}
+        assert set(timings) == {"clean_instrumental", "other_stems", "backing_vocals"}
+
+    def test_stage_graph_propagates_stage_errors(self, mock_logger):
+        """Test that a failing stage fails the run and its dependents never start."""
+        dependent_stage = MagicMock()
+
+        def failing_stage():
+            raise RuntimeError("separation failed")
+
+        stages = StageGraph(logger=mock_logger)
+        stages.add_stage("clean_instrumental", failing_stage)
+        stages.add_stage("backing_vocals", dependent_stage, depends_on=["clean_instrumental"])
+
+        with pytest.raises(RuntimeError, match="separation failed"):
+            stages.run(max_workers=2)
+        dependent_stage.assert_not_called()
+
+    def test_separation_scheduler_bounds_concurrency_and_orders_by_priority(self, mock_logger, temp_dir):
+        """Test that queued separations wait for a free slot and start in priority order."""
+        scheduler = SeparationScheduler(logger=mock_logger, max_slots=1, lock_dir=temp_dir)
+        started = []
+
+        def run_job(name, priority):
+            with scheduler.slot(name, priority=priority):
+                started.append(name)
+
+        with scheduler.slot("running"):
+            threads = [
+                threading.Thread(target=run_job, args=("low", 5)),
+                threading.Thread(target=run_job, args=("high", 0)),
+            ]
+            for thread in threads:
+                thread.start()
+                # Make sure each job is queued before the next one, so ordering isn't down to thread start timing
+                while scheduler.stats()["queue_depth"] < threads.index(thread) + 1:
+                    time.sleep(0.01)
+            assert started == []
+
+        for thread in threads:
+            thread.join(timeout=5)
+
+        assert started == ["high", "low"]
+        stats = scheduler.stats()
+        assert stats["total_jobs"] == 3
+        assert stats["max_queue_depth"] == 2
+        assert stats["active_slots"] == 0
+        assert stats["queue_depth"] == 0
+
+    def test_separation_threads_split_cores_between_slots_and_stages(self, basic_karaoke_gen):
+        """Test a track's thread budget is its scheduler slot's share of the cores, and torch threads are set once."""
+        audio_processor = basic_karaoke_gen.audio_processor
+        mock_torch = MagicMock()
+
+        with patch('os.cpu_count', return_value=16), \
+             patch.object(SeparationScheduler, 'max_slots', new_callable=PropertyMock, return_value=2), \
+             patch.dict('sys.modules', {'torch': mock_torch}), \
+             patch('karaoke_gen.audio_processor._torch_threads', None):
+            assert audio_processor.separation_threads == 8
+            audio_processor._set_torch_threads()
+            audio_processor._set_torch_threads()
+
+        mock_torch.set_num_threads.assert_called_once_with(4)
+
+    def test_separation_scheduler_interrupted_waiter_leaves_queue(self, mock_logger, temp_dir):
+        """Test a job interrupted while queued gives up its place, so the jobs after it still get a slot."""
+        scheduler = SeparationScheduler(logger=mock_logger, max_slots=1, lock_dir=temp_dir)
+        started = []
+
+        def run_job():
+            with scheduler.slot("next"):
+                started.append("next")
+
+        with scheduler.slot("running"):
+            with patch.object(scheduler._condition, 'wait', side_effect=KeyboardInterrupt):
+                with pytest.raises(KeyboardInterrupt):
+                    with scheduler.slot("interrupted"):
+                        pass
+            assert scheduler.stats()["queue_depth"] == 0
+
+        thread = threading.Thread(target=run_job)
+        thread.start()
+        thread.join(timeout=5)
+
+        assert started == ["next"]
+
+    def test_separation_scheduler_respects_slots_held_by_other_processes(self, mock_logger, temp_dir):
+        """Test that a slot lock file held elsewhere is skipped in favour of a free slot."""
+        scheduler = SeparationScheduler(logger=mock_logger, max_slots=2, lock_dir=temp_dir)
+
+        with open(os.path.join(temp_dir, "audio_separator.slot0.lock"), "w") as other_process_lock:
+            fcntl.flock(other_process_lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            with scheduler.slot("Test Artist - Test Title") as slot_index:
+                assert slot_index == 1
+
     def test_process_audio_separation_with_skip_env_var(self, basic_karaoke_gen, temp_dir):
         """Test process_audio_separation with KARAOKE_GEN_SKIP_AUDIO_SEPARATION environment variable."""
         # Setup
@@ -223,62 +446,195 @@ class TestAudio:
             assert result["backing_vocals"] == {}
             assert result["combined_instrumentals"] == {}
     
+    def _write_test_wav(self, path, seed=0):
+        rng = np.random.default_rng(seed)
+        sf.write(path, rng.uniform(-0.5, 0.5, size=(4410, 2)), 44100)
+        return path
+
+    def test_stem_cache_restores_stems_for_same_audio_under_new_name(self, mock_logger, temp_dir):
+        """Test that stems are found by audio content and restored with names for the new input file."""
+        cache = StemCache(os.path.join(temp_dir, "cache"), logger=mock_logger)
+
+        first_dir = os.path.join(temp_dir, "first")
+        second_dir = os.path.join(temp_dir, "second")
+        os.makedirs(first_dir)
+        os.makedirs(second_dir)
+
+        first_input = self._write_test_wav(os.path.join(first_dir, "Artist - Title.wav"))
+        second_input = self._write_test_wav(os.path.join(second_dir, "artist - title (Original).wav"))
+
+        vocals = self._write_test_wav(os.path.join(first_dir, "Artist - Title_(Vocals)_model.flac"), seed=1)
+        instrumental = self._write_test_wav(os.path.join(first_dir, "Artist - Title_(Instrumental)_model.flac"), seed=2)
+
+        assert cache.restore(first_input, "model.ckpt", "FLAC", first_dir) is None
+        cache.store(first_input, "model.ckpt", "FLAC", [vocals, instrumental])
+
+        restored = cache.restore(second_input, "model.ckpt", "FLAC", second_dir)
+
+        assert restored == [
+            os.path.join(second_dir, "artist - title (Original)_(Vocals)_model.flac"),
+            os.path.join(second_dir, "artist - title (Original)_(Instrumental)_model.flac"),
+        ]
+        assert sf.read(restored[0])[0].tolist() == sf.read(vocals)[0].tolist()
+
+        # A different model is a different cache entry
+        assert cache.restore(second_input, "other_model.ckpt", "FLAC", second_dir) is None
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+        assert stats["total_hits"] == 1
+        assert stats["entries"] == 1
+
+    def test_stem_cache_evicts_least_recently_used(self, mock_logger, temp_dir):
+        """Test that the stem cache stays within its size limit by evicting the oldest entries."""
+        first_input = self._write_test_wav(os.path.join(temp_dir, "first.wav"), seed=1)
+        second_input = self._write_test_wav(os.path.join(temp_dir, "second.wav"), seed=2)
+        first_stem = self._write_test_wav(os.path.join(temp_dir, "first_(Vocals)_model.flac"), seed=3)
+        second_stem = self._write_test_wav(os.path.join(temp_dir, "second_(Vocals)_model.flac"), seed=4)
+
+        cache = StemCache(os.path.join(temp_dir, "cache"), logger=mock_logger, max_size_bytes=os.path.getsize(first_stem) * 1.5)
+        cache.store(first_input, "model.ckpt", "FLAC", [first_stem])
+        cache.store(second_input, "model.ckpt", "FLAC", [second_stem])
+
+        assert cache.restore(first_input, "model.ckpt", "FLAC", temp_dir) is None
+        assert cache.restore(second_input, "model.ckpt", "FLAC", temp_dir) is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_separate_audio_uses_stem_cache(self, basic_karaoke_gen, mock_logger, temp_dir):
+        """Test that separating audio that is already in the stem cache doesn't run the model again."""
+        audio_processor = basic_karaoke_gen.audio_processor
+        audio_processor.stem_cache = StemCache(os.path.join(temp_dir, "cache"), logger=mock_logger)
+        audio_file = self._write_test_wav(os.path.join(temp_dir, "input.wav"))
+
+        def fake_separate(input_file):
+            vocals = self._write_test_wav(os.path.join(temp_dir, "input_(Vocals)_test_model.flac"), seed=1)
+            instrumental = self._write_test_wav(os.path.join(temp_dir, "input_(Instrumental)_test_model.flac"), seed=2)
+            return [vocals, instrumental]
+
+        mock_separator = MagicMock()
+        mock_separator.separate.side_effect = fake_separate
+
+        with patch('audio_separator.separator.Separator', return_value=mock_separator):
+            for attempt in range(2):
+                audio_processor.separate_audio(
+                    audio_file=audio_file,
+                    model_name="test_model.ckpt",
+                    artist_title="Test Artist - Test Title",
+                    track_output_dir=temp_dir,
+                    instrumental_path=os.path.join(temp_dir, f"instrumental{attempt}.flac"),
+                    vocals_path=os.path.join(temp_dir, f"vocals{attempt}.flac"),
+                )
+
+        mock_separator.separate.assert_called_once_with(audio_file)
+        assert os.path.isfile(os.path.join(temp_dir, "instrumental1.flac"))
+        assert os.path.isfile(os.path.join(temp_dir, "vocals1.flac"))
+
+    def _fake_separator(self, output_dir):
+        """A deterministic stand-in for a separation model: vocals are a filtered copy of the input, instrumental the remainder."""
+        def separate(input_path):
+            audio, samplerate = sf.read(input_path, dtype="float32", always_2d=True)
+            # Depends on the previous sample too, so chunk boundaries matter unless they're crossfaded
+            previous = np.vstack([np.zeros((1, audio.shape[1]), dtype=np.float32), audio[:-1]])
+            vocals = audio * np.float32(0.3) + previous * np.float32(0.2)
+            input_base = os.path.splitext(os.path.basename(input_path))[0]
+            outputs = []
+            for stem_name, stem_audio in (("Vocals", vocals), ("Instrumental", audio - vocals)):
+                output_name = f"{input_base}_({stem_name})_test_model.flac"
+                sf.write(os.path.join(output_dir, output_name), stem_audio, samplerate, subtype="PCM_24")
+                outputs.append(output_name)
+            return outputs
+
+        separator = MagicMock()
+        separator.output_dir = output_dir
+        separator.separate.side_effect = separate
+        return separator
+
+    def test_chunked_separation_matches_unchunked(self, basic_karaoke_gen, temp_dir):
+        """Test that separating in overlapping, crossfaded chunks gives the same stems as separating the whole file."""
+        audio_file = os.path.join(temp_dir, "input.flac")
+        shutil.copy("tests/data/waterloo10sec.flac", audio_file)
+        separator_output_dir = os.path.join(temp_dir, "separator_output")
+        os.makedirs(separator_output_dir)
+        audio_processor = basic_karaoke_gen.audio_processor
+
+        with patch('audio_separator.separator.Separator', return_value=self._fake_separator(separator_output_dir)):
+            unchunked_outputs = audio_processor._run_separation("test_model.ckpt", audio_file)
+            unchunked = {os.path.basename(path): sf.read(path)[0] for path in unchunked_outputs}
+
+            audio_processor.chunk_duration = 3.0
+            audio_processor.chunk_overlap = 0.5
+            chunked_outputs = audio_processor._run_separation("test_model.ckpt", audio_file)
+
+        assert sorted(os.path.basename(path) for path in chunked_outputs) == sorted(unchunked)
+        for path in chunked_outputs:
+            chunked_audio = sf.read(path)[0]
+            unchunked_audio = unchunked[os.path.basename(path)]
+            assert chunked_audio.shape == unchunked_audio.shape
+            # Each chunk's first sample lacks its predecessor, but it falls at the start of a crossfade where it has no weight
+            assert np.max(np.abs(chunked_audio - unchunked_audio)) < 1e-4
+
+        # Temporary chunk files are cleaned up
+        assert not [name for name in os.listdir(temp_dir) if "_chunks_" in name]
+
     def test_normalize_audio(self, basic_karaoke_gen, temp_dir):
-        """Test normalizing audio."""
-        # Setup
+        """Test normalizing audio to a 0 dBFS peak."""
         input_path = os.path.join(temp_dir, "input.flac")
         output_path = os.path.join(temp_dir, "output.flac")
-        
-        # Create a mock AudioSegment
-        mock_audio = MagicMock(spec=AudioSegment)
-        mock_audio.max_dBFS = -6.0
-        mock_audio.apply_gain.return_value = mock_audio
-        mock_audio.rms = 100  # Non-zero RMS
-        
-        # Mock dependencies
-        with patch('pydub.AudioSegment.from_file', return_value=mock_audio):
-            # Call the method
-            basic_karaoke_gen.audio_processor._normalize_audio(input_path, output_path)
-            
-            # Verify AudioSegment.from_file was called with correct arguments
-            AudioSegment.from_file.assert_called_once_with(input_path, format="flac")
-            
-            # Verify apply_gain was called with correct arguments (target_level - current_level)
-            mock_audio.apply_gain.assert_called_once_with(0.0 - (-6.0))
-            
-            # Verify export was called with correct arguments
-            mock_audio.export.assert_called_once_with(output_path, format="flac")
-    
+        sf.write(input_path, np.array([[0.25, -0.5], [0.1, 0.0]]), 44100, subtype="PCM_24")
+
+        basic_karaoke_gen.audio_processor._normalize_audio(input_path, output_path)
+
+        normalized, samplerate = sf.read(output_path)
+        assert samplerate == 44100
+        assert sf.info(output_path).subtype == "PCM_24"
+        assert np.max(np.abs(normalized)) == pytest.approx(1.0, abs=1e-4)
+        assert normalized[0, 0] == pytest.approx(0.5, abs=1e-4)
+
     def test_normalize_audio_silent_result(self, basic_karaoke_gen, temp_dir):
-        """Test normalizing audio when the result would be silent."""
-        # Setup
+        """Test normalizing audio that is completely silent leaves it unchanged."""
         input_path = os.path.join(temp_dir, "input.flac")
         output_path = os.path.join(temp_dir, "output.flac")
-        
-        # Create a mock AudioSegment
-        mock_audio = MagicMock(spec=AudioSegment)
-        mock_audio.max_dBFS = -6.0
-        
-        # First mock has RMS of 0 (silent)
-        mock_normalized = MagicMock(spec=AudioSegment)
-        mock_normalized.rms = 0
-        
-        mock_audio.apply_gain.return_value = mock_normalized
-        
-        # Mock dependencies
-        with patch('pydub.AudioSegment.from_file', return_value=mock_audio):
-            # Call the method
-            basic_karaoke_gen.audio_processor._normalize_audio(input_path, output_path)
-            
-            # Verify AudioSegment.from_file was called with correct arguments
-            AudioSegment.from_file.assert_called_once_with(input_path, format="flac")
-            
-            # Verify apply_gain was called with correct arguments
-            mock_audio.apply_gain.assert_called_once_with(0.0 - (-6.0))
-            
-            # Verify export was called with the original audio (not the silent one)
-            mock_audio.export.assert_called_once_with(output_path, format="flac")
-    
+        sf.write(input_path, np.zeros((100, 2)), 44100)
+
+        basic_karaoke_gen.audio_processor._normalize_audio(input_path, output_path)
+
+        normalized, _ = sf.read(output_path)
+        assert not np.any(normalized)
+        basic_karaoke_gen.audio_processor.logger.warning.assert_called_once()
+
+    def test_normalize_audio_does_not_write_through_hardlinks(self, basic_karaoke_gen, temp_dir):
+        """Test that normalizing in place replaces the file rather than modifying other links to it."""
+        cached_path = os.path.join(temp_dir, "cached.flac")
+        track_path = os.path.join(temp_dir, "track.flac")
+        sf.write(cached_path, np.full((100, 2), 0.25), 44100)
+        os.link(cached_path, track_path)
+
+        basic_karaoke_gen.audio_processor._normalize_audio(track_path, track_path)
+
+        assert np.max(np.abs(sf.read(track_path)[0])) == pytest.approx(1.0, abs=1e-4)
+        assert np.max(np.abs(sf.read(cached_path)[0])) == pytest.approx(0.25, abs=1e-4)
+
+    def test_generate_combined_instrumentals(self, basic_karaoke_gen, temp_dir):
+        """Test mixing the instrumental with each backing vocals stem into a normalized combined instrumental."""
+        instrumental_path = os.path.join(temp_dir, "instrumental.flac")
+        backing_vocals_path = os.path.join(temp_dir, "backing_vocals.flac")
+        sf.write(instrumental_path, np.full((200, 2), 0.2), 44100)
+        sf.write(backing_vocals_path, np.full((100, 2), 0.2), 44100)
+
+        result = basic_karaoke_gen.audio_processor._generate_combined_instrumentals(
+            instrumental_path, {"bv_model.ckpt": {"backing_vocals": backing_vocals_path}}, "Test Artist - Test Title", temp_dir
+        )
+
+        combined_path = os.path.join(temp_dir, "Test Artist - Test Title (Instrumental +BV bv_model.ckpt).flac")
+        assert result == {"bv_model.ckpt": combined_path}
+
+        combined, _ = sf.read(combined_path)
+        # The longer input sets the length; the overlapping part peaks at 0 dBFS and the rest keeps its relative level
+        assert combined.shape == (200, 2)
+        assert combined[0, 0] == pytest.approx(1.0, abs=1e-4)
+        assert combined[150, 0] == pytest.approx(0.5, abs=1e-4)
+
     def test_file_exists(self, basic_karaoke_gen):
         """Test the _file_exists helper method."""
         # Test with existing file
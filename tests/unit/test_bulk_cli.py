@@ -169,6 +169,7 @@ async def test_process_track_prep_success(mock_getcwd, mock_chdir, mock_kprep, m
         dry_run=mock_args.dry_run,
         render_video=False,
         create_track_subfolders=True,
+        model_pool=bulk_cli.model_pool,
     )
     mock_kprep_instance.process.assert_awaited_once()
     mock_chdir.assert_called_once_with("/fake/original/dir") # Changed back at the end
@@ -229,6 +230,7 @@ async def test_process_track_render_success(
         render_video=True,
         create_track_subfolders=True,
         skip_transcription_review=True,
+        model_pool=bulk_cli.model_pool,
     )
     mock_kprep_instance.process.assert_awaited_once()
 
@@ -246,6 +248,9 @@ async def test_process_track_render_success(
         enable_txt=False,
         cdg_styles=None,
         non_interactive=True,
+        ffmpeg_capability_cache_file=bulk_cli.DEFAULT_CAPABILITY_CACHE_FILE,
+        cpu_only=False,
+        encode_threads=os.cpu_count() or 1,
     )
     mock_kfinalise_instance.process.assert_called_once()
 
@@ -634,6 +639,9 @@ async def test_process_track_render_cdg_enabled(
         enable_txt=False,
         cdg_styles=expected_cdg_styles, # Check styles are passed
         non_interactive=True,
+        ffmpeg_capability_cache_file=bulk_cli.DEFAULT_CAPABILITY_CACHE_FILE,
+        cpu_only=False,
+        encode_threads=os.cpu_count() or 1,
     )
     mock_kfinalise_instance.process.assert_called_once()
 
@@ -753,3 +761,120 @@ async def test_process_csv_rows_dry_run(mock_process_prep, mock_process_render,
     # Verify results
     assert results["prep_success"] == 1
     assert results["prep_failed"] == 0
+
+
+@pytest.mark.asyncio
+@patch("karaoke_gen.utils.bulk_cli.update_csv_status")
+@patch("karaoke_gen.utils.bulk_cli.process_track_render", new_callable=AsyncMock)
+@patch("karaoke_gen.utils.bulk_cli.process_track_prep", new_callable=AsyncMock)
+async def test_process_csv_rows_pipelines_render_after_each_prep(mock_process_prep, mock_process_render, mock_update_csv, mock_args, mock_logger, mock_log_formatter):
+    """Test each row is rendered as soon as its own prep finishes, rather than after every row is prepped."""
+    calls = []
+    mock_process_prep.side_effect = lambda row, *args: calls.append(("prep", row["Title"])) or True
+    mock_process_render.side_effect = lambda row, *args: calls.append(("render", row["Title"])) or True
+
+    rows = [
+        {"Artist": "Artist One", "Title": "Title One", "Mixed Audio Filename": "mix1.mp3", "Instrumental Audio Filename": "inst1.mp3", "Status": "Uploaded"},
+        {"Artist": "Artist Two", "Title": "Title Two", "Mixed Audio Filename": "mix2.mp3", "Instrumental Audio Filename": "inst2.mp3", "Status": "Uploaded"},
+    ]
+
+    results = await bulk_cli.process_csv_rows("/fake/test.csv", rows, mock_args, mock_logger, mock_log_formatter)
+
+    assert calls == [("prep", "Title One"), ("render", "Title One"), ("prep", "Title Two"), ("render", "Title Two")]
+    assert results["render_success"] == 2
+    assert "tracks_per_hour" in results
+    assert any("tracks/hour" in str(c) for c in mock_logger.info.call_args_list)
+
+
+@pytest.mark.asyncio
+@patch("karaoke_gen.utils.bulk_cli.update_csv_status")
+@patch("karaoke_gen.utils.bulk_cli._render_row_in_worker_process")
+@patch("karaoke_gen.utils.bulk_cli.process_track_prep", new_callable=AsyncMock)
+async def test_process_csv_rows_renders_in_worker_processes(mock_process_prep, mock_render_worker, mock_update_csv, mock_args, mock_logger, mock_log_formatter):
+    """Test renders are handed to the render worker pool when more than one worker is configured."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    mock_process_prep.return_value = True
+    mock_render_worker.side_effect = [True, False]
+    mock_args.prep_workers = 2
+    mock_args.render_workers = 2
+
+    rows = [
+        {"Artist": "Artist One", "Title": "Title One", "Mixed Audio Filename": "mix1.mp3", "Instrumental Audio Filename": "inst1.mp3", "Status": "Uploaded"},
+        {"Artist": "Artist Two", "Title": "Title Two", "Mixed Audio Filename": "mix2.mp3", "Instrumental Audio Filename": "inst2.mp3", "Status": "Prep_Complete"},
+    ]
+
+    # Threads stand in for worker processes, which can't run the mocks
+    with patch("karaoke_gen.utils.bulk_cli.ProcessPoolExecutor", lambda max_workers, mp_context: ThreadPoolExecutor(max_workers)):
+        results = await bulk_cli.process_csv_rows("/fake/test.csv", rows, mock_args, mock_logger, mock_log_formatter)
+
+    assert mock_process_prep.call_count == 1
+    assert mock_render_worker.call_count == 2
+    mock_render_worker.assert_any_call(rows[1], mock_args)
+    assert results["render_success"] == 1
+    assert results["render_failed"] == 1
+    assert results["skipped"] == 1
+
+
+def test_update_csv_status_with_status_journal(tmp_path):
+    """Test status updates go to the journal and reach the CSV when it is compacted."""
+    csv_path = tmp_path / "test.csv"
+    csv_path.write_text(SAMPLE_CSV_DATA)
+
+    journal = bulk_cli.StatusJournal(str(csv_path), compact_every=100)
+    with patch.object(bulk_cli, "status_journal", journal):
+        assert bulk_cli.update_csv_status(str(csv_path), 0, "Prep_Complete") is True
+        assert bulk_cli.update_csv_status(str(csv_path), 4, "Completed") is True
+
+    # Nothing is rewritten until the journal is compacted
+    assert csv_path.read_text() == SAMPLE_CSV_DATA
+    assert len((tmp_path / "test.csv.journal.jsonl").read_text().splitlines()) == 2
+
+    journal.compact()
+
+    with open(csv_path, "r") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["Status"] for row in rows] == ["Prep_Complete", "Prep_Complete", "Completed", "Prep_Failed", "Completed"]
+    assert (tmp_path / "test.csv.journal.jsonl").read_text() == ""
+
+
+def test_status_journal_compacts_periodically(tmp_path):
+    """Test the journal is folded into the CSV every compact_every records."""
+    csv_path = tmp_path / "test.csv"
+    csv_path.write_text(SAMPLE_CSV_DATA)
+
+    journal = bulk_cli.StatusJournal(str(csv_path), compact_every=2)
+    journal.record(0, "Prep_Complete")
+    assert csv_path.read_text() == SAMPLE_CSV_DATA
+    journal.record(0, "Completed")
+
+    with open(csv_path, "r") as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]["Status"] == "Completed"
+
+
+def test_status_journal_replay_resumes_interrupted_run(tmp_path):
+    """Test a journal left behind by a crashed run is replayed into the rows read on restart."""
+    csv_path = tmp_path / "test.csv"
+    csv_path.write_text(SAMPLE_CSV_DATA)
+
+    journal = bulk_cli.StatusJournal(str(csv_path))
+    journal.record(0, "Prep_Complete")
+    journal.record(4, "Prep_Failed")
+    # Simulate a crash part way through appending the next line
+    with open(tmp_path / "test.csv.journal.jsonl", "a") as f:
+        f.write('{"row": 0, "sta')
+
+    rows = bulk_cli._read_csv_file(str(csv_path))
+    journal = bulk_cli.StatusJournal(str(csv_path))
+    journal.replay(rows)
+
+    assert rows[0]["Status"] == "Prep_Complete"
+    assert rows[4]["Status"] == "Prep_Failed"
+    assert rows[1]["Status"] == "Prep_Complete"
+
+    # The next append starts on a new line, so it isn't lost along with the partial one
+    journal.record(2, "Uploaded")
+    journal.compact()
+    with open(csv_path, "r") as f:
+        assert [row["Status"] for row in csv.DictReader(f)] == ["Prep_Complete", "Prep_Complete", "Uploaded", "Prep_Failed", "Prep_Failed"]
@@ -6,6 +6,20 @@ from unittest.mock import MagicMock, patch, mock_open, call, DEFAULT
 from karaoke_gen.karaoke_gen import KaraokePrep
 import yt_dlp # Keep import for patching target
 from karaoke_gen.utils import sanitize_filename # Import utility
+import numpy as np
+import soundfile as sf
+from karaoke_gen.process_runner import ProcessResult
+
+MP3_PROBE = {
+    "format_name": "mp3",
+    "duration": 180.0,
+    "audio_streams": 1,
+    "video_streams": 0,
+    "codec_name": "mp3",
+    "sample_rate": 44100,
+    "channels": 2,
+    "sample_fmt": "fltp",
+}
 
 class TestFileOperations:
     def test_copy_input_media(self, basic_karaoke_gen, temp_dir):
@@ -143,16 +157,25 @@ class TestFileOperations:
         input_filename = "input.mp4"
         output_filename = "output"
         
-        # Patch os.system directly within this test
-        with patch('os.system') as mock_os_system:
+        with patch.object(basic_karaoke_gen.file_handler.process_runner, 'run', return_value=MagicMock(returncode=0)) as mock_run:
             result = basic_karaoke_gen.file_handler.extract_still_image_from_video(input_filename, output_filename)
             
             # Verify the correct file path was returned
             assert result == output_filename + ".png"
             
-            # Verify os.system was called with correct arguments
-            expected_command = f'{basic_karaoke_gen.file_handler.ffmpeg_base_command} -i "{input_filename}" -ss 00:00:30 -vframes 1 "{output_filename}.png"'
-            mock_os_system.assert_called_once_with(expected_command)
+            # Verify ffmpeg was run, without a shell, with the correct arguments
+            expected_command = [
+                *basic_karaoke_gen.file_handler.ffmpeg_base_command.split(),
+                "-i", input_filename, "-ss", "00:00:30", "-vframes", "1", f"{output_filename}.png",
+            ]
+            mock_run.assert_called_once_with(expected_command, "Extracting still image", check=False)
+
+    def test_extract_still_image_from_audio_only_media(self, basic_karaoke_gen):
+        """Test media without a video stream gives no still image instead of failing the track."""
+        with patch.object(basic_karaoke_gen.file_handler.process_runner, 'run', return_value=MagicMock(returncode=1)):
+            result = basic_karaoke_gen.file_handler.extract_still_image_from_video("input.m4a", "output")
+
+        assert result is None
     
     def test_convert_to_wav_success(self, basic_karaoke_gen, temp_dir):
         """Test converting input audio to WAV format successfully."""
@@ -164,22 +187,19 @@ class TestFileOperations:
         # Mock os.path.isfile and os.path.getsize
         with patch('os.path.isfile', return_value=True), \
              patch('os.path.getsize', return_value=100), \
-             patch('os.popen') as mock_popen:
-            
-            # Mock the ffprobe output
-            mock_popen.return_value.read.return_value = "codec_type=audio"
+             patch.object(basic_karaoke_gen.file_handler, 'probe_audio', return_value=MP3_PROBE):
             
             output_filename = os.path.join(temp_dir, "output")
             
-            # Patch os.system directly
-            with patch('os.system') as mock_os_system:
+            with patch.object(basic_karaoke_gen.file_handler.process_runner, 'run') as mock_run:
                 result = basic_karaoke_gen.file_handler.convert_to_wav(input_filename, output_filename)
                 
                 # Verify the correct file path was returned
                 assert result == output_filename + ".wav"
                 
-                # Verify os.system was called
-                mock_os_system.assert_called_once()
+                # Verify ffmpeg was run
+                mock_run.assert_called_once()
+                assert mock_run.call_args[0][0][-3:] == ["-i", input_filename, output_filename + ".wav"]
     
     def test_convert_to_wav_file_not_found(self, basic_karaoke_gen):
         """Test converting input audio when the file is not found."""
@@ -207,17 +227,89 @@ class TestFileOperations:
         input_filename = "no_audio.mp4"
         output_filename = "output"
         
-        # Mock os.path.isfile, os.path.getsize, and os.popen
+        # Mock os.path.isfile, os.path.getsize, and the ffprobe result to indicate no audio stream
         with patch('os.path.isfile', return_value=True), \
              patch('os.path.getsize', return_value=100), \
-             patch('os.popen') as mock_popen:
-            
-            # Mock the ffprobe output to indicate no audio stream
-            mock_popen.return_value.read.return_value = "codec_type=video"
+             patch.object(basic_karaoke_gen.file_handler, 'probe_audio', return_value={**MP3_PROBE, "audio_streams": 0, "video_streams": 1}):
             
             with pytest.raises(Exception, match=f"No valid audio stream found in file: {input_filename}"):
                 basic_karaoke_gen.file_handler.convert_to_wav(input_filename, output_filename)
     
+    def test_probe_audio(self, basic_karaoke_gen):
+        """Test a single ffprobe call is parsed into a structured result."""
+        ffprobe_output = (
+            '{"streams": [{"codec_type": "video", "codec_name": "mjpeg"},'
+            ' {"codec_type": "audio", "codec_name": "flac", "sample_rate": "48000", "channels": 2, "sample_fmt": "s32"}],'
+            ' "format": {"format_name": "flac", "duration": "215.5"}}'
+        )
+        with patch.object(basic_karaoke_gen.file_handler.process_runner, 'run', return_value=ProcessResult(0, ffprobe_output, "", {})) as mock_run:
+            probe = basic_karaoke_gen.file_handler.probe_audio("input.flac")
+
+        mock_run.assert_called_once()
+        assert probe == {
+            "format_name": "flac",
+            "duration": 215.5,
+            "audio_streams": 1,
+            "video_streams": 1,
+            "codec_name": "flac",
+            "sample_rate": 48000,
+            "channels": 2,
+            "sample_fmt": "s32",
+        }
+
+    def test_probe_audio_unreadable_file(self, basic_karaoke_gen):
+        """Test a file ffprobe can't read probes as having no audio streams."""
+        with patch.object(basic_karaoke_gen.file_handler.process_runner, 'run', return_value=ProcessResult(1, "", "Invalid data", {})):
+            probe = basic_karaoke_gen.file_handler.probe_audio("input.txt")
+
+        assert probe["audio_streams"] == 0
+        assert probe["format_name"] is None
+
+    def test_convert_to_wav_links_pcm_wav(self, basic_karaoke_gen, temp_dir):
+        """Test a 16-bit PCM WAV input is linked into place without running ffmpeg."""
+        input_filename = os.path.join(temp_dir, "input.wav")
+        sf.write(input_filename, np.zeros((100, 2), dtype=np.int16), 44100, subtype="PCM_16")
+        probe = {**MP3_PROBE, "format_name": "wav", "codec_name": "pcm_s16le", "sample_fmt": "s16"}
+
+        with patch.object(basic_karaoke_gen.file_handler.process_runner, 'run') as mock_run:
+            result = basic_karaoke_gen.file_handler.convert_to_wav(input_filename, os.path.join(temp_dir, "output"), probe=probe)
+
+        mock_run.assert_not_called()
+        with open(result, "rb") as output, open(input_filename, "rb") as original:
+            assert output.read() == original.read()
+
+    def test_convert_to_wav_decodes_flac_in_process(self, basic_karaoke_gen, temp_dir):
+        """Test a FLAC input is decoded to a 16-bit WAV without running ffmpeg."""
+        input_filename = os.path.join(temp_dir, "input.flac")
+        audio = (np.sin(np.linspace(0, 100, 48000 * 2)).reshape(-1, 2) * 20000).astype(np.int16)
+        sf.write(input_filename, audio, 48000, subtype="PCM_16")
+        probe = {**MP3_PROBE, "format_name": "flac", "codec_name": "flac", "sample_rate": 48000, "sample_fmt": "s16"}
+
+        with patch.object(basic_karaoke_gen.file_handler.process_runner, 'run') as mock_run:
+            result = basic_karaoke_gen.file_handler.convert_to_wav(input_filename, os.path.join(temp_dir, "output"), probe=probe)
+
+        mock_run.assert_not_called()
+        decoded, samplerate = sf.read(result, dtype="int16")
+        assert samplerate == 48000
+        assert sf.info(result).subtype == "PCM_16"
+        np.testing.assert_array_equal(decoded, audio)
+
+    def test_convert_to_wav_keeps_existing_output(self, basic_karaoke_gen, temp_dir):
+        """Test an existing WAV is never overwritten, as with ffmpeg -n."""
+        input_filename = os.path.join(temp_dir, "input.mp3")
+        with open(input_filename, "w") as f:
+            f.write("test audio content")
+        output_filename = os.path.join(temp_dir, "output")
+        with open(f"{output_filename}.wav", "w") as f:
+            f.write("existing")
+
+        with patch.object(basic_karaoke_gen.file_handler.process_runner, 'run') as mock_run:
+            basic_karaoke_gen.file_handler.convert_to_wav(input_filename, output_filename, probe=MP3_PROBE)
+
+        mock_run.assert_not_called()
+        with open(f"{output_filename}.wav") as f:
+            assert f.read() == "existing"
+
     def test_sanitize_filename(self, basic_karaoke_gen):
         """Test sanitizing filenames."""
         # Test with various problematic characters
@@ -70,6 +70,7 @@ def mock_base_args():
         dry_run=False,
         render_bounding_boxes=False,
         filename_pattern=None,
+        max_concurrent_tracks=1,
         output_dir=".",
         no_track_subfolders=True, # Corresponds to create_track_subfolders=True
         lossless_output_format="FLAC",
@@ -80,6 +81,12 @@ def mock_base_args():
         other_stems_models=["htdemucs_6s.yaml"],
         model_file_dir="/tmp/audio-separator-models", # Default value might vary
         existing_instrumental=None,
+        separation_slots=None,
+        separation_threads=None,
+        separation_chunk_duration=None,
+        separation_chunk_overlap=5.0,
+        stem_cache_dir=None,
+        stem_cache_max_size_gb=20,
         instrumental_format="flac",
         lyrics_artist=None,
         lyrics_title=None,
@@ -87,6 +94,8 @@ def mock_base_args():
         subtitle_offset_ms=0,
         skip_transcription_review=False,
         style_params_json=None,
+        card_cache_dir=None,
+        card_encode_profile="matching",
         enable_cdg=False,
         enable_txt=False,
         brand_prefix=None,
@@ -99,6 +108,7 @@ def mock_base_args():
         discord_webhook_url=None,
         email_template_file=None,
         keep_brand_code=False,
+        encode_threads=None,
         yes=False, # non_interactive
     )
 
@@ -0,0 +1,83 @@
+import asyncio
+from unittest.mock import patch
+
+from karaoke_gen.job_events import JobEventHub, JobEventLog
+from karaoke_gen.job_store import InMemoryJobStore
+
+
+def publish_at(event_log, second, event_type="status", job_id="job1", data=None):
+    with patch("karaoke_gen.job_events.time.time_ns", return_value=second * 1_000_000_000):
+        return event_log.publish(event_type, job_id, data or {})
+
+
+class TestJobEventLog:
+    def test_events_since_returns_later_events_in_order(self):
+        """Test resuming from an event id returns only the events published after it, oldest first."""
+        event_log = JobEventLog({})
+        first = publish_at(event_log, 1000)
+        second = publish_at(event_log, 1000, job_id="job2")
+        third = publish_at(event_log, 1003, event_type="log")
+
+        events = event_log.events_since(first["id"], now=1005)
+
+        assert [event["id"] for event in events] == [second["id"], third["id"]]
+        assert events[1]["type"] == "log"
+
+    def test_events_since_asks_for_resync_when_id_is_unknown_or_expired(self):
+        """Test a stream can't resume from a malformed id or one older than the retention period."""
+        event_log = JobEventLog({}, retention_seconds=60)
+        event = publish_at(event_log, 1000)
+
+        assert event_log.events_since("not-an-id", now=1001) is None
+        assert event_log.events_since(event["id"], now=1100) is None
+
+    def test_prune_drops_expired_buckets(self):
+        """Test buckets older than the retention period are deleted and recent ones kept."""
+        events = {}
+        event_log = JobEventLog(events, retention_seconds=60)
+        publish_at(event_log, 1000)
+        publish_at(event_log, 1050)
+
+        assert event_log.prune(now=1070) == 1
+        assert list(events) == [1050]
+
+
+class TestJobEventHub:
+    def test_poll_once_delivers_each_event_once_including_late_ones(self):
+        """Test polls return new events only, including ones published into a bucket the previous poll read."""
+        event_log = JobEventLog({})
+        hub = JobEventHub(event_log)
+        first = publish_at(event_log, 1000)
+
+        assert [event["id"] for event in hub.poll_once(now=1000)] == [first["id"]]
+
+        # Published by a container whose clock is a second behind
+        late = publish_at(event_log, 1000, job_id="job2")
+        assert [event["id"] for event in hub.poll_once(now=1001)] == [late["id"]]
+        assert hub.poll_once(now=1002) == []
+
+    def test_slow_subscriber_gets_resync(self):
+        """Test a subscriber whose queue fills up is told to resynchronize instead of silently losing events."""
+        event_log = JobEventLog({})
+        hub = JobEventHub(event_log)
+        queue = asyncio.Queue(maxsize=2)
+        hub.subscribers.add(queue)
+
+        hub.deliver([publish_at(event_log, 1000) for _ in range(3)])
+
+        assert queue.qsize() == 1
+        assert queue.get_nowait()["type"] == "resync"
+
+
+class TestJobStoreEvents:
+    def test_save_and_delete_publish_events(self):
+        """Test job store writes publish the job's summary, and deletions a deleted event."""
+        event_log = JobEventLog({})
+        store = InMemoryJobStore(event_log=event_log)
+
+        store.save("job1", {"status": "queued", "track_data": "x" * 1000})
+        store.delete("job1")
+
+        bucket_events = [event for bucket in event_log.events.values() for event in bucket]
+        assert [event["type"] for event in bucket_events] == ["status", "deleted"]
+        assert bucket_events[0]["data"] == {"status": "queued"}
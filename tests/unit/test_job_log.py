@@ -0,0 +1,174 @@
+import json
+import time
+import logging
+import threading
+from unittest.mock import patch
+
+from karaoke_gen.job_log import JobLogWriter, make_log_filter, read_log_entries
+
+
+def log_line(index, level="INFO"):
+    return json.dumps({"timestamp": f"2025-01-01T10:00:{index:02d}", "level": level, "message": f"Message {index}"}) + "\n"
+
+
+def write_log(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("".join(lines))
+
+
+class TestMakeLogFilter:
+    def test_level_include_and_exclude(self):
+        """Test entries below the level, without the include text or with the exclude text are filtered out."""
+        matches = make_log_filter(include_filter="separat", exclude_filter="skipped", level_filter="WARNING")
+
+        assert matches({"level": "ERROR", "message": "Separation failed"})
+        assert not matches({"level": "INFO", "message": "Separation started"})
+        assert not matches({"level": "WARNING", "message": "Separation skipped"})
+        assert not matches({"level": "WARNING", "message": "Transcription slow"})
+
+    def test_invalid_regex_falls_back_to_substring(self):
+        """Test an invalid regular expression is matched as plain text instead of failing."""
+        assert make_log_filter(include_filter="^info.*start", use_regex=True)({"level": "INFO", "message": "Job started"})
+        assert make_log_filter(include_filter="[1", use_regex=True)({"level": "INFO", "message": "Track [1/3]"})
+
+
+class TestReadLogEntries:
+    def test_cursor_reads_only_new_complete_lines(self, tmp_path):
+        """Test reading from a cursor returns lines written since, leaving a partly written line for the next read."""
+        log_path = tmp_path / "job_logs.jsonl"
+        write_log(log_path, [log_line(1), log_line(2)])
+
+        entries, cursor = read_log_entries(log_path, cursor=0)
+        assert [entry["message"] for entry in entries] == ["Message 1", "Message 2"]
+
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(log_line(3) + log_line(4)[:10])
+        entries, cursor = read_log_entries(log_path, cursor=cursor)
+        assert [entry["message"] for entry in entries] == ["Message 3"]
+
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(log_line(4)[10:])
+        entries, cursor = read_log_entries(log_path, cursor=cursor)
+        assert [entry["message"] for entry in entries] == ["Message 4"]
+        assert cursor == log_path.stat().st_size
+
+    def test_limit_reads_the_tail_across_blocks(self, tmp_path):
+        """Test a limited read without a cursor returns the last matching entries, reading backwards in blocks."""
+        log_path = tmp_path / "job_logs.jsonl"
+        lines = [log_line(index, level="DEBUG" if index % 2 else "INFO") for index in range(40)]
+        write_log(log_path, lines + ["not json\n", log_line(40)[:5]])
+
+        with patch("karaoke_gen.job_log.TAIL_BLOCK_SIZE", 50):
+            entries, cursor = read_log_entries(log_path, limit=3, matches=make_log_filter(level_filter="INFO"))
+
+        assert [entry["message"] for entry in entries] == ["Message 34", "Message 36", "Message 38"]
+        assert cursor == log_path.stat().st_size - 5
+
+    def test_missing_log_and_stale_cursor(self, tmp_path):
+        """Test a missing log reads as empty, and a cursor past the end of a replaced log reads it from the start."""
+        log_path = tmp_path / "job_logs.jsonl"
+        assert read_log_entries(log_path, cursor=100) == ([], 0)
+
+        write_log(log_path, [log_line(1)])
+        entries, _ = read_log_entries(log_path, cursor=10_000)
+        assert [entry["message"] for entry in entries] == ["Message 1"]
+
+
+class TestJobLogWriter:
+    def make_writer(self, tmp_path, **kwargs):
+        batches = []
+        writer = JobLogWriter(
+            lambda job_id: str(tmp_path / job_id / "job_logs.jsonl"),
+            on_flush=lambda job_id, entries: batches.append((job_id, len(entries))),
+            **kwargs,
+        )
+        return writer, batches
+
+    def test_flush_writes_each_jobs_entries_in_one_batch(self, tmp_path):
+        """Test entries are appended in order per job, with one write per job per batch."""
+        writer, batches = self.make_writer(tmp_path, flush_interval=60)
+        for index in range(50):
+            writer.write("job1" if index % 2 else "job2", {"level": "INFO", "message": f"Message {index}"})
+
+        writer.flush()
+
+        entries, _ = read_log_entries(tmp_path / "job1" / "job_logs.jsonl")
+        assert [entry["message"] for entry in entries] == [f"Message {index}" for index in range(1, 50, 2)]
+        assert sorted(batches) == [("job1", 25), ("job2", 25)]
+        writer.close()
+
+    def test_batches_are_bounded(self, tmp_path):
+        """Test no batch is larger than max_buffered, so writers block instead of buffering without limit."""
+        writer, batches = self.make_writer(tmp_path, flush_interval=60, max_buffered=3)
+        for index in range(7):
+            writer.write("job1", {"level": "INFO", "message": f"Message {index}"})
+
+        writer.close()
+
+        assert sum(count for _, count in batches) == 7
+        assert max(count for _, count in batches) <= 3
+        entries, _ = read_log_entries(tmp_path / "job1" / "job_logs.jsonl")
+        assert len(entries) == 7
+
+    def test_write_failures_are_logged_not_raised(self, tmp_path):
+        """Test an unwritable log is reported and skipped, and later writes still happen."""
+        (tmp_path / "blocked").write_text("a file where the job directory should be")
+        writer, batches = self.make_writer(tmp_path)
+
+        with patch.object(writer.logger, "warning") as warning:
+            writer.write("blocked", {"level": "INFO", "message": "Lost"})
+            writer.flush()
+        writer.write("job1", {"level": "INFO", "message": "Kept"})
+        writer.close()
+
+        warning.assert_called_once()
+        assert batches == [("job1", 1)]
+
+    def test_flush_does_not_wait_for_entries_queued_after_it(self, tmp_path):
+        """Test flush returns once its own entries are written, while another thread keeps logging."""
+        writer, _ = self.make_writer(tmp_path, flush_interval=0.05, max_buffered=100)
+        writer.write("job1", {"level": "INFO", "message": "Before flush"})
+        stop = threading.Event()
+
+        def keep_logging():
+            while not stop.is_set():
+                writer.write("job2", {"level": "DEBUG", "message": "Busy"})
+
+        busy_thread = threading.Thread(target=keep_logging)
+        busy_thread.start()
+        flush_thread = threading.Thread(target=writer.flush)
+        flush_thread.start()
+        flush_thread.join(timeout=5)
+        flushed = not flush_thread.is_alive()
+        stop.set()
+        busy_thread.join()
+        writer.close()
+
+        assert flushed
+        entries, _ = read_log_entries(tmp_path / "job1" / "job_logs.jsonl")
+        assert [entry["message"] for entry in entries] == ["Before flush"]
+
+    def test_flush_without_waiting_writes_before_the_interval(self, tmp_path):
+        """Test a non-blocking flush ends the current batch instead of leaving it for the flush interval."""
+        writer, batches = self.make_writer(tmp_path, flush_interval=60)
+        writer.write("job1", {"level": "ERROR", "message": "Failed"})
+
+        writer.flush(wait=False)
+
+        deadline = time.monotonic() + 5
+        while not batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert batches == [("job1", 1)]
+        writer.close()
+
+    def test_warnings_are_logged_on_the_writer_thread(self, tmp_path, caplog):
+        """Test the writer's own warnings carry its thread name, so job log handlers can drop them."""
+        (tmp_path / "blocked").write_text("a file where the job directory should be")
+        writer, _ = self.make_writer(tmp_path)
+
+        with caplog.at_level(logging.WARNING, logger="karaoke_gen.job_log"):
+            writer.write("blocked", {"level": "INFO", "message": "Lost"})
+            writer.flush()
+        writer.close()
+
+        assert [record.threadName for record in caplog.records] == [JobLogWriter.THREAD_NAME]
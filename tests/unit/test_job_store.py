@@ -0,0 +1,153 @@
+from karaoke_gen.job_store import InMemoryJobStore, JobStore
+
+
+def make_job(status="queued", created_at="2025-01-01T10:00:00", **fields):
+    return {
+        "status": status,
+        "progress": 10,
+        "artist": "Artist",
+        "title": "Title",
+        "created_at": created_at,
+        "timeline": [{"status": status, "started_at": created_at, "ended_at": None, "duration_seconds": None}],
+        "track_data": {"lyrics": "x" * 10000},
+        **fields,
+    }
+
+
+class TestJobStore:
+    def test_save_writes_record_and_compact_summary(self):
+        """Test saving a job keeps the full record and a summary without the large fields."""
+        store = InMemoryJobStore()
+        job = make_job()
+
+        store.save("job1", job)
+
+        assert store.get("job1") == job
+        assert "job1" in store
+        assert store.summaries["job1"]["status"] == "queued"
+        assert "timeline" not in store.summaries["job1"]
+        assert "track_data" not in store.summaries["job1"]
+
+    def test_update_merges_fields(self):
+        """Test update merges into the existing record and refreshes the summary."""
+        store = InMemoryJobStore()
+        store.save("job1", make_job())
+
+        updated = store.update("job1", status="complete", progress=100)
+
+        assert updated["artist"] == "Artist"
+        assert store.get("job1")["status"] == "complete"
+        assert store.summaries["job1"]["progress"] == 100
+
+    def test_delete_removes_record_and_summary(self):
+        """Test deleted jobs disappear from the store and from token job lists."""
+        store = InMemoryJobStore()
+        store.save("job1", make_job())
+        store.add_job_for_token("token", "job1", created_at=1)
+
+        store.delete("job1")
+
+        assert store.get("job1") is None
+        assert "job1" not in store.summaries
+        assert store.summaries_for_token("token") == ({}, 1)
+
+    def test_summaries_for_token_only_reads_that_tokens_jobs(self):
+        """Test a token's job list comes from its index, newest first, and pages through it."""
+        store = InMemoryJobStore()
+        for index in range(5):
+            store.save(f"job{index}", make_job(title=f"Title {index}"))
+        store.add_job_for_token("token", "job1", created_at=100)
+        store.add_job_for_token("token", "job3", created_at=300)
+        store.add_job_for_token("token", "job2", created_at=200)
+        store.add_job_for_token("other", "job4", created_at=400)
+
+        summaries, total = store.summaries_for_token("token")
+        assert list(summaries) == ["job3", "job2", "job1"]
+        assert total == 3
+
+        summaries, total = store.summaries_for_token("token", offset=1, limit=1)
+        assert list(summaries) == ["job2"]
+        assert total == 3
+
+        assert store.token_has_job("token", "job3")
+        assert not store.token_has_job("token", "job4")
+
+    def test_all_summaries_newest_first(self):
+        """Test all_summaries orders every job by creation time and paginates."""
+        store = InMemoryJobStore()
+        store.save("old", make_job(created_at="2025-01-01T10:00:00"))
+        store.save("new", make_job(created_at="2025-03-01T10:00:00"))
+        store.save("middle", make_job(created_at="2025-02-01T10:00:00"))
+
+        summaries, total = store.all_summaries()
+        assert list(summaries) == ["new", "middle", "old"]
+        assert total == 3
+
+        summaries, _ = store.all_summaries(offset=2, limit=5)
+        assert list(summaries) == ["old"]
+
+    def test_rebuild_backfills_summaries_and_index(self):
+        """Test jobs stored before summaries existed are summarized and indexed by rebuild."""
+        jobs = {"job1": make_job(), "job2": make_job(status="error")}
+        store = JobStore(jobs, {}, {"token": {"job3": 300}}, {}, {})
+
+        count = store.rebuild({"token": {"job1": 100}, "other": {"job2": 200}})
+
+        assert count == 2
+        assert store.summaries["job2"]["status"] == "error"
+        assert store.job_ids_for_token("token") == ["job3", "job1"]
+        assert store.job_ids_for_token("other") == ["job2"]
+
+    def test_rebuild_holds_the_store_lock(self):
+        """Test rebuild runs under the store's lock, so a concurrent save can't be overwritten by a stale summary."""
+        store = JobStore({"job1": make_job()}, {}, {}, {}, {})
+        lock_held = []
+        store.summarize = lambda job_data: lock_held.append(store._lock.locked()) or {"status": job_data["status"]}
+
+        store.rebuild({})
+
+        assert lock_held == [True]
+        assert store.status_counts_for() == {"queued": 1}
+
+    def test_status_counts_follow_status_changes(self):
+        """Test global and per-token status counts are updated as jobs are saved, moved and deleted."""
+        store = InMemoryJobStore()
+        store.add_job_for_token("token", "job1")
+        store.save("job1", make_job(status="queued"))
+        store.save("job2", make_job(status="queued"))
+
+        assert store.status_counts_for() == {"queued": 2}
+        assert store.status_counts_for("token") == {"queued": 1}
+
+        store.update("job1", status="complete")
+        store.update("job1", progress=100)
+        assert store.status_counts_for() == {"queued": 1, "complete": 1}
+        assert store.status_counts_for("token") == {"complete": 1}
+
+        store.delete("job1")
+        assert store.status_counts_for() == {"queued": 1}
+        assert store.status_counts_for("token") == {}
+
+    def test_indexing_a_saved_job_counts_it_for_the_token(self):
+        """Test a job saved before its token was recorded still counts towards the token's stats."""
+        store = InMemoryJobStore()
+        store.save("job1", make_job(status="error"))
+
+        store.add_job_for_token("token", "job1")
+
+        assert store.status_counts_for("token") == {"error": 1}
+        assert store.status_counts_for() == {"error": 1}
+
+    def test_reconcile_status_counts_rebuilds_drifted_counts(self):
+        """Test reconciliation recounts every scope from the summaries."""
+        store = InMemoryJobStore()
+        store.add_job_for_token("token", "job1")
+        store.save("job1", make_job(status="complete"))
+        store.save("job2", make_job(status="error"))
+        # Simulate counts drifting, e.g. from writers in two containers racing
+        store.status_counts[JobStore.ALL_JOBS] = {"complete": 5}
+        store.status_counts["stale-token"] = {"queued": 1}
+
+        assert store.reconcile_status_counts() == {"complete": 1, "error": 1}
+        assert store.status_counts_for("token") == {"complete": 1}
+        assert "stale-token" not in store.status_counts
@@ -2,10 +2,12 @@ import pytest
 import os
 import shlex
 import subprocess
-from unittest.mock import patch, MagicMock, call
+from unittest.mock import patch, MagicMock, call, ANY
 
 # Adjust the import path
 from karaoke_gen.karaoke_finalise.karaoke_finalise import KaraokeFinalise
+from karaoke_gen.process_runner import ProcessResult
+from karaoke_gen.video_encoding_profile import probe_concat_copy_parameters, concat_copy_mismatches
 from .test_initialization import mock_logger, basic_finaliser, MINIMAL_CONFIG # Reuse fixtures
 from .test_file_input_validation import BASE_NAME, TITLE_MOV, END_MOV, WITH_VOCALS_MOV, INSTRUMENTAL_FLAC # Reuse constants
 
@@ -59,23 +61,44 @@ def finaliser_with_nvenc_aac_at(mock_logger):
 
 # --- execute_command Tests ---
 
-@patch('subprocess.run')
-def test_execute_command_runs_command(mock_subprocess_run, finaliser_with_aac):
-    """Test execute_command calls subprocess.run."""
-    # Setup successful subprocess.run return
-    mock_subprocess_run.return_value = subprocess.CompletedProcess(
-        args=['echo', 'test'], returncode=0, stdout='', stderr=''
-    )
-    
+@patch('karaoke_gen.karaoke_finalise.karaoke_finalise.run_process')
+def test_execute_command_runs_command(mock_run_process, finaliser_with_aac):
+    """Test execute_command runs the command and records its timing."""
+    timing = {"description": "Running test command", "wall_seconds": 1.0, "realtime_factor": None}
+    mock_run_process.return_value = ProcessResult(0, "", "", timing)
+
     command = "echo 'test'"
     description = "Running test command"
     finaliser_with_aac.execute_command(command, description)
-    
-    mock_subprocess_run.assert_called_once_with(command, shell=True, capture_output=True, text=True, timeout=600)
+
+    mock_run_process.assert_called_once_with(
+        command,
+        description=description,
+        progress_callback=None,
+        timeout=600,
+        stall_timeout=None,
+        cancel_event=finaliser_with_aac.cancel_event,
+    )
+    assert finaliser_with_aac.command_timings == [timing]
     finaliser_with_aac.logger.info.assert_any_call(description)
     finaliser_with_aac.logger.debug.assert_any_call(f"Executing command: {command}")
     finaliser_with_aac.logger.info.assert_any_call("✓ Command completed successfully")
 
+@patch('karaoke_gen.karaoke_finalise.karaoke_finalise.run_process')
+def test_run_command_reports_ffmpeg_progress(mock_run_process, finaliser_with_aac):
+    """Test ffmpeg commands get -progress output and reports reach the callback with the step description."""
+    timing = {"description": "Encoding", "wall_seconds": 10.0, "realtime_factor": 2.5}
+    mock_run_process.return_value = ProcessResult(0, "", "", timing)
+    reports = []
+    finaliser_with_aac.progress_callback = lambda description, progress: reports.append((description, progress))
+
+    finaliser_with_aac.run_command(f"{finaliser_with_aac.ffmpeg_base_command} -i in.mp4 out.mp4", "Encoding", timeout=600)
+
+    command = mock_run_process.call_args[0][0]
+    assert command.startswith(f"{finaliser_with_aac.ffmpeg_base_command} -progress pipe:1 -i in.mp4")
+    mock_run_process.call_args[1]["progress_callback"]({"out_time_seconds": 5.0})
+    assert reports == [("Encoding", {"out_time_seconds": 5.0})]
+
 @patch('subprocess.run')
 def test_execute_command_dry_run(mock_subprocess_run, finaliser_with_aac):
     """Test execute_command logs but doesn't run in dry run mode."""
@@ -88,6 +111,44 @@ def test_execute_command_dry_run(mock_subprocess_run, finaliser_with_aac):
     finaliser_with_aac.logger.info.assert_any_call(description)
     finaliser_with_aac.logger.info.assert_any_call(f"DRY RUN: Would execute: {command}")
 
+def test_encode_timeout_scales_with_media_duration(finaliser_with_aac):
+    """Test encode timeouts come from the media duration and the slowest known realtime factor."""
+    assert finaliser_with_aac.encode_timeout("cpu", 600) == 600 # Duration unknown, default kept
+
+    finaliser_with_aac.media_duration = 240.0
+    assert finaliser_with_aac.encode_timeout("cpu", 600) == 240 / 0.2 * 2
+    assert finaliser_with_aac.encode_timeout("gpu", 300) == 240 / 1.0 * 2
+
+    # A slower measured encode on this host stretches the timeout, a faster one doesn't shrink it
+    finaliser_with_aac.measured_realtime_factors = {"cpu": [0.1, 5.0]}
+    assert finaliser_with_aac.encode_timeout("cpu", 600) == 240 / 0.1 * 2
+
+    finaliser_with_aac.media_duration = 5.0
+    assert finaliser_with_aac.encode_timeout("gpu", 300) == KaraokeFinalise.MIN_ENCODE_TIMEOUT
+
+@patch('karaoke_gen.karaoke_finalise.karaoke_finalise.run_process')
+def test_run_command_uses_adaptive_timeout_and_stall_watchdog(mock_run_process, finaliser_with_aac):
+    """Test ffmpeg commands get a duration-based timeout and stall timeout, and successful encodes are measured."""
+    timing = {"description": "Encoding", "wall_seconds": 100.0, "realtime_factor": 0.15}
+    mock_run_process.return_value = ProcessResult(0, "", "", timing)
+    finaliser_with_aac.media_duration = 300.0
+    finaliser_with_aac.encode_stall_timeout = 90
+
+    finaliser_with_aac.run_command(f"{finaliser_with_aac.ffmpeg_base_command} -i in.mp4 out.mp4", "Encoding", timeout=600)
+
+    assert mock_run_process.call_args[1]["timeout"] == 300 / 0.2 * 2
+    assert mock_run_process.call_args[1]["stall_timeout"] == 90
+    assert finaliser_with_aac.measured_realtime_factors == {"cpu": [0.15]}
+
+@patch('subprocess.run')
+def test_probe_media_duration(mock_subprocess_run, finaliser_with_aac):
+    """Test the ffprobe'd format duration is returned, or None if probing fails."""
+    mock_subprocess_run.return_value = subprocess.CompletedProcess(args=[], returncode=0, stdout='{"format": {"duration": "183.52"}}', stderr="")
+    assert finaliser_with_aac.probe_media_duration("video.mp4") == 183.52
+
+    mock_subprocess_run.return_value = subprocess.CompletedProcess(args=[], returncode=1, stdout="", stderr="No such file")
+    assert finaliser_with_aac.probe_media_duration("missing.mp4") is None
+
 # --- prepare_concat_filter Tests ---
 
 @patch('os.path.isfile', return_value=False)
@@ -256,6 +317,39 @@ def test_encode_720p_version_aac_at(mock_execute_fallback, finaliser_with_aac_at
     mock_execute_fallback.assert_called_once_with(expected_gpu_cmd, expected_cpu_cmd, "Encoding 720p version of the final video")
 
 
+@patch.object(KaraokeFinalise, 'execute_command')
+def test_encode_lossy_mp4_with_threads(mock_execute, finaliser_with_aac):
+    """Test a thread budget is passed to ffmpeg as an output option."""
+    finaliser_with_aac.encode_lossy_mp4("input.mp4", "output.mp4", threads=2)
+    command = mock_execute.call_args[0][0]
+    assert '-i "input.mp4" -threads 2 -c:v copy' in command
+
+@patch.object(KaraokeFinalise, 'encode_lossy_mp4')
+@patch.object(KaraokeFinalise, 'encode_lossless_mkv')
+@patch.object(KaraokeFinalise, 'encode_720p_version')
+def test_encode_versions_from_lossless_mp4_splits_cpu_budget(mock_encode_720p, mock_encode_mkv, mock_encode_lossy, finaliser_with_aac):
+    """Test the copy-video encodes get one thread each and the 720p encode gets the rest of the budget."""
+    finaliser_with_aac.encode_threads = 16
+
+    finaliser_with_aac.encode_versions_from_lossless_mp4(OUTPUT_FILES)
+
+    lossless = OUTPUT_FILES["final_karaoke_lossless_mp4"]
+    mock_encode_lossy.assert_called_once_with(lossless, OUTPUT_FILES["final_karaoke_lossy_mp4"], threads=1)
+    mock_encode_mkv.assert_called_once_with(lossless, OUTPUT_FILES["final_karaoke_lossless_mkv"], threads=1)
+    mock_encode_720p.assert_called_once_with(lossless, OUTPUT_FILES["final_karaoke_lossy_720p_mp4"], threads=14)
+
+@patch('subprocess.run')
+def test_execute_command_cancelled(mock_subprocess_run, finaliser_with_aac):
+    """Test no new command is started once another parallel step has failed."""
+    finaliser_with_aac.cancel_event.set()
+
+    with pytest.raises(Exception, match="Cancelled because another finalise step failed"):
+        finaliser_with_aac.execute_command("ffmpeg -i in.mp4 out.mp4", "Test command")
+    with pytest.raises(Exception, match="Cancelled because another finalise step failed"):
+        finaliser_with_aac.execute_command_with_fallback("gpu", "cpu", "Test command")
+    mock_subprocess_run.assert_not_called()
+
+
 # --- remux_and_encode_output_video_files Tests ---
 
 @patch('os.path.isfile')
@@ -265,6 +359,8 @@ def test_encode_720p_version_aac_at(mock_execute_fallback, finaliser_with_aac_at
 @patch.object(KaraokeFinalise, 'remux_with_instrumental')
 @patch.object(KaraokeFinalise, 'convert_mov_to_mp4')
 @patch.object(KaraokeFinalise, 'prepare_concat_filter')
+@patch.object(KaraokeFinalise, 'concat_copy_lossless_mp4', return_value=False)
+@patch.object(KaraokeFinalise, 'encode_all_outputs_single_pass', return_value=False) # Exercise the per-output fallback
 @patch.object(KaraokeFinalise, 'encode_lossless_mp4')
 @patch.object(KaraokeFinalise, 'encode_lossy_mp4')
 @patch.object(KaraokeFinalise, 'encode_lossless_mkv')
@@ -272,7 +368,7 @@ def test_encode_720p_version_aac_at(mock_execute_fallback, finaliser_with_aac_at
 @patch.object(KaraokeFinalise, 'prompt_user_bool', return_value=True) # Auto-confirm overwrite/checks
 def test_remux_and_encode_all_steps_mov_input(
     mock_prompt_bool, mock_encode_720p, mock_encode_mkv, mock_encode_lossy,
-    mock_encode_lossless, mock_prepare_filter, mock_convert_mov, mock_remux,
+    mock_encode_lossless, mock_single_pass, mock_concat_copy, mock_prepare_filter, mock_convert_mov, mock_remux,
     mock_abspath, mock_quote, mock_remove, mock_isfile, finaliser_with_aac):
     """Test the full remux/encode process with a .mov input requiring conversion."""
 
@@ -317,6 +413,12 @@ def test_remux_and_encode_all_steps_mov_input(
     expected_quoted_title_mov = f"'/abs/path/{INPUT_FILES['title_mov']}'"
     expected_quoted_karaoke_mp4 = f"'/abs/path/{OUTPUT_FILES['karaoke_mp4']}'"
 
+    mock_concat_copy.assert_called_once_with(
+        [INPUT_FILES["title_mov"], OUTPUT_FILES["karaoke_mp4"], END_MOV], OUTPUT_FILES["final_karaoke_lossless_mp4"]
+    )
+    mock_single_pass.assert_called_once_with(
+        expected_quoted_title_mov, expected_quoted_karaoke_mp4, mock_env_mov_input, mock_ffmpeg_filter, OUTPUT_FILES
+    )
     mock_encode_lossless.assert_called_once_with(
         expected_quoted_title_mov,
         expected_quoted_karaoke_mp4,
@@ -324,15 +426,17 @@ def test_remux_and_encode_all_steps_mov_input(
         mock_ffmpeg_filter,
         OUTPUT_FILES["final_karaoke_lossless_mp4"]
     )
-    mock_encode_lossy.assert_called_once_with(OUTPUT_FILES["final_karaoke_lossless_mp4"], OUTPUT_FILES["final_karaoke_lossy_mp4"])
-    mock_encode_mkv.assert_called_once_with(OUTPUT_FILES["final_karaoke_lossless_mp4"], OUTPUT_FILES["final_karaoke_lossless_mkv"])
-    mock_encode_720p.assert_called_once_with(OUTPUT_FILES["final_karaoke_lossless_mp4"], OUTPUT_FILES["final_karaoke_lossy_720p_mp4"])
+    mock_encode_lossy.assert_called_once_with(OUTPUT_FILES["final_karaoke_lossless_mp4"], OUTPUT_FILES["final_karaoke_lossy_mp4"], threads=1)
+    mock_encode_mkv.assert_called_once_with(OUTPUT_FILES["final_karaoke_lossless_mp4"], OUTPUT_FILES["final_karaoke_lossless_mkv"], threads=1)
+    mock_encode_720p.assert_called_once_with(OUTPUT_FILES["final_karaoke_lossless_mp4"], OUTPUT_FILES["final_karaoke_lossy_720p_mp4"], threads=ANY)
 
 @patch('os.path.isfile')
 @patch('os.remove')
 @patch.object(KaraokeFinalise, 'remux_with_instrumental')
 @patch.object(KaraokeFinalise, 'convert_mov_to_mp4')
 @patch.object(KaraokeFinalise, 'prepare_concat_filter')
+@patch.object(KaraokeFinalise, 'concat_copy_lossless_mp4', return_value=False)
+@patch.object(KaraokeFinalise, 'encode_all_outputs_single_pass', return_value=False) # Exercise the per-output fallback
 @patch.object(KaraokeFinalise, 'encode_lossless_mp4')
 @patch.object(KaraokeFinalise, 'encode_lossy_mp4')
 @patch.object(KaraokeFinalise, 'encode_lossless_mkv')
@@ -340,7 +444,7 @@ def test_remux_and_encode_all_steps_mov_input(
 @patch.object(KaraokeFinalise, 'prompt_user_bool', return_value=True) # Auto-confirm overwrite/checks
 def test_remux_and_encode_mp4_input(
     mock_prompt_bool, mock_encode_720p, mock_encode_mkv, mock_encode_lossy,
-    mock_encode_lossless, mock_prepare_filter, mock_convert_mov, mock_remux,
+    mock_encode_lossless, mock_single_pass, mock_concat_copy, mock_prepare_filter, mock_convert_mov, mock_remux,
     mock_remove, mock_isfile, finaliser_with_aac):
     """Test the remux/encode process skips conversion for .mp4 input."""
     
@@ -388,6 +492,153 @@ def test_remux_and_encode_skip_overwrite(
     mock_encode_720p.assert_not_called()
 
 
+@patch('os.path.isfile', return_value=False)
+@patch.object(KaraokeFinalise, 'remux_with_instrumental')
+@patch.object(KaraokeFinalise, 'prepare_concat_filter', return_value=("", '-filter_complex "[outv][outa]"'))
+@patch.object(KaraokeFinalise, 'concat_copy_lossless_mp4', return_value=False)
+@patch.object(KaraokeFinalise, 'encode_all_outputs_single_pass', return_value=True)
+@patch.object(KaraokeFinalise, 'encode_lossless_mp4')
+@patch.object(KaraokeFinalise, 'encode_lossy_mp4')
+@patch.object(KaraokeFinalise, 'encode_lossless_mkv')
+@patch.object(KaraokeFinalise, 'encode_720p_version')
+def test_remux_and_encode_single_pass_skips_per_output_commands(
+    mock_encode_720p, mock_encode_mkv, mock_encode_lossy, mock_encode_lossless,
+    mock_single_pass, mock_concat_copy, mock_prepare_filter, mock_remux, mock_isfile, finaliser_with_aac):
+    """Test the per-output encodes are only run when the single-pass encode fails."""
+    finaliser_with_aac.non_interactive = True
+
+    finaliser_with_aac.remux_and_encode_output_video_files(f"{BASE_NAME} (With Vocals).mp4", INPUT_FILES, OUTPUT_FILES)
+
+    mock_single_pass.assert_called_once()
+    mock_encode_lossless.assert_not_called()
+    mock_encode_lossy.assert_not_called()
+    mock_encode_mkv.assert_not_called()
+    mock_encode_720p.assert_not_called()
+
+@patch.object(KaraokeFinalise, 'execute_command_with_fallback')
+def test_encode_all_outputs_single_pass(mock_execute_fallback, finaliser_with_aac):
+    """Test the single-pass command splits one concat decode into all four outputs."""
+    ffmpeg_filter = '-filter_complex "[0:v:0][0:a:0][1:v:0][1:a:0]concat=n=2:v=1:a=1[outv][outa]"'
+    output_files = {key: os.path.join("/out", value) for key, value in OUTPUT_FILES.items()}
+
+    assert finaliser_with_aac.encode_all_outputs_single_pass("'title.mov'", "'karaoke.mp4'", "", ffmpeg_filter, output_files) is True
+
+    gpu_cmd, cpu_cmd, description = mock_execute_fallback.call_args[0]
+    assert description == "Encoding all final video versions in a single pass"
+    assert gpu_cmd.count(" -i ") == cpu_cmd.count(" -i ") == 2
+    assert "concat=n=2:v=1:a=1[outv][outa];[outv]split=2[v4k][v720src];[v720src]scale=1280:720[v720];[outa]asplit=4" in cpu_cmd
+
+    args = shlex.split(cpu_cmd)
+    tee_outputs = args[args.index("tee") + 1].split("|")
+    assert tee_outputs == [
+        f"[select=\\'v:0,a:0\\':f=mp4:movflags=+faststart+frag_keyframe+empty_moov]{output_files['final_karaoke_lossless_mp4']}",
+        f"[select=\\'v:0,a:1\\':f=mp4:movflags=+faststart+frag_keyframe+empty_moov]{output_files['final_karaoke_lossy_mp4']}",
+        f"[select=\\'v:0,a:2\\':f=matroska]{output_files['final_karaoke_lossless_mkv']}",
+    ]
+    assert args[-1] == output_files["final_karaoke_lossy_720p_mp4"]
+    assert "-c:a:0 pcm_s16le -c:a:1 aac -b:a:1 320k -c:a:2 flac" in cpu_cmd
+
+@patch('os.remove')
+@patch('os.path.isfile', side_effect=lambda f: f.endswith(".mkv"))
+@patch.object(KaraokeFinalise, 'execute_command_with_fallback', side_effect=Exception("tee muxer failed"))
+def test_encode_all_outputs_single_pass_failure_cleans_up(mock_execute_fallback, mock_isfile, mock_remove, finaliser_with_aac):
+    """Test a failed single pass reports failure and removes partial outputs."""
+    output_files = {key: os.path.join("/out", value) for key, value in OUTPUT_FILES.items()}
+
+    assert finaliser_with_aac.encode_all_outputs_single_pass("'title.mov'", "'karaoke.mp4'", "", '-filter_complex "[outv][outa]"', output_files) is False
+
+    mock_remove.assert_called_once_with(output_files["final_karaoke_lossless_mkv"])
+
+
+MATCHING_SEGMENT_PARAMETERS = [
+    {"codec_type": "video", "codec_name": "h264", "width": 3840, "height": 2160, "extradata_hash": "SHA256:abc"},
+    {"codec_type": "audio", "codec_name": "pcm_s16le", "sample_rate": "44100", "channels": 2},
+]
+
+@patch('os.path.isfile', return_value=False)
+@patch.object(KaraokeFinalise, 'prepare_concat_filter', return_value=("", '-filter_complex "[outv][outa]"'))
+@patch.object(KaraokeFinalise, 'concat_copy_lossless_mp4', return_value=True)
+@patch.object(KaraokeFinalise, 'encode_versions_from_lossless_mp4')
+@patch.object(KaraokeFinalise, 'encode_all_outputs_single_pass')
+@patch.object(KaraokeFinalise, 'remux_with_instrumental')
+def test_remux_and_encode_concat_copy_skips_reencoding(
+    mock_remux, mock_single_pass, mock_encode_versions, mock_concat_copy, mock_prepare_filter, mock_isfile, finaliser_with_aac):
+    """Test only the derived versions are encoded when the segments can be joined with stream copy."""
+    finaliser_with_aac.non_interactive = True
+
+    finaliser_with_aac.remux_and_encode_output_video_files(f"{BASE_NAME} (With Vocals).mp4", INPUT_FILES, OUTPUT_FILES)
+
+    mock_concat_copy.assert_called_once_with(
+        [INPUT_FILES["title_mov"], OUTPUT_FILES["karaoke_mp4"]], OUTPUT_FILES["final_karaoke_lossless_mp4"]
+    )
+    mock_encode_versions.assert_called_once_with(OUTPUT_FILES)
+    mock_single_pass.assert_not_called()
+
+@patch.object(KaraokeFinalise, 'execute_command')
+@patch('karaoke_gen.karaoke_finalise.karaoke_finalise.probe_concat_copy_parameters')
+def test_concat_copy_lossless_mp4(mock_probe, mock_execute, finaliser_with_aac, tmp_path):
+    """Test matching segments are joined with the concat demuxer and stream copy."""
+    mock_probe.return_value = MATCHING_SEGMENT_PARAMETERS
+    segments = [str(tmp_path / "title.mov"), str(tmp_path / "it's karaoke.mp4")]
+    output_file = str(tmp_path / "final.mp4")
+    concat_list_contents = []
+    mock_execute.side_effect = lambda command, description: concat_list_contents.append(open(f"{output_file}.concat.txt").read())
+
+    assert finaliser_with_aac.concat_copy_lossless_mp4(segments, output_file) is True
+
+    mock_probe.assert_has_calls([call("ffprobe", segments[0]), call("ffprobe", segments[1])])
+    command = mock_execute.call_args[0][0]
+    assert "-f concat -safe 0 -i" in command
+    assert f'-map 0 -c copy -movflags +faststart+frag_keyframe+empty_moov "{output_file}"' in command
+    assert concat_list_contents == [f"file '{segments[0]}'\nfile '{tmp_path}/it'\\''s karaoke.mp4'\n"]
+    assert not os.path.exists(f"{output_file}.concat.txt") # List file cleaned up
+
+@patch.object(KaraokeFinalise, 'execute_command')
+@patch('karaoke_gen.karaoke_finalise.karaoke_finalise.probe_concat_copy_parameters')
+def test_concat_copy_lossless_mp4_parameter_mismatch(mock_probe, mock_execute, finaliser_with_aac):
+    """Test segments encoded differently are not stream copied."""
+    nvenc_parameters = [dict(MATCHING_SEGMENT_PARAMETERS[0], extradata_hash="SHA256:def"), MATCHING_SEGMENT_PARAMETERS[1]]
+    mock_probe.side_effect = [MATCHING_SEGMENT_PARAMETERS, nvenc_parameters]
+
+    assert finaliser_with_aac.concat_copy_lossless_mp4(["title.mov", "karaoke.mp4"], "final.mp4") is False
+    mock_execute.assert_not_called()
+
+@patch.object(KaraokeFinalise, 'execute_command')
+@patch('karaoke_gen.karaoke_finalise.karaoke_finalise.probe_concat_copy_parameters', return_value=None)
+def test_concat_copy_lossless_mp4_probe_failure(mock_probe, mock_execute, finaliser_with_aac):
+    """Test segments that can't be probed are re-encoded."""
+    assert finaliser_with_aac.concat_copy_lossless_mp4(["title.mov", "karaoke.mp4"], "final.mp4") is False
+    mock_execute.assert_not_called()
+
+@patch('subprocess.run')
+def test_probe_concat_copy_parameters(mock_subprocess_run):
+    """Test only the fields that matter for stream copy are kept, for audio and video streams."""
+    mock_subprocess_run.return_value = MagicMock(
+        returncode=0,
+        stdout='{"streams": [{"codec_type": "video", "codec_name": "h264", "width": 3840, "bit_rate": "5000000"}, '
+        '{"codec_type": "audio", "codec_name": "pcm_s16le", "sample_rate": "44100", "channels": 2}, {"codec_type": "data"}]}',
+    )
+
+    parameters = probe_concat_copy_parameters("ffprobe", "title.mov")
+
+    assert [stream["codec_type"] for stream in parameters] == ["video", "audio"]
+    assert parameters[0]["width"] == 3840
+    assert "bit_rate" not in parameters[0]
+    assert parameters[1]["sample_rate"] == "44100"
+    assert "-show_data_hash" in mock_subprocess_run.call_args[0][0]
+
+def test_concat_copy_mismatches():
+    """Test mismatching stream counts and fields are reported."""
+    audio_48k = dict(MATCHING_SEGMENT_PARAMETERS[1], sample_rate="48000")
+    assert concat_copy_mismatches([MATCHING_SEGMENT_PARAMETERS, MATCHING_SEGMENT_PARAMETERS]) == []
+    assert concat_copy_mismatches([MATCHING_SEGMENT_PARAMETERS, [MATCHING_SEGMENT_PARAMETERS[0], audio_48k]]) == [
+        "segment 1 stream 1 sample_rate: 48000 != 44100"
+    ]
+    assert concat_copy_mismatches([MATCHING_SEGMENT_PARAMETERS, MATCHING_SEGMENT_PARAMETERS[:1]]) == [
+        "segment 1 has 1 streams, segment 0 has 2"
+    ]
+
+
 # --- GPU-Accelerated Encoding Tests ---
 
 @patch.object(KaraokeFinalise, 'execute_command_with_fallback')
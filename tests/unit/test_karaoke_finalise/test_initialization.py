@@ -7,6 +7,7 @@ from unittest.mock import patch, MagicMock, mock_open
 # Adjust the import path based on your project structure
 # Assuming tests are run from the project root
 from karaoke_gen.karaoke_finalise.karaoke_finalise import KaraokeFinalise
+from karaoke_gen.ffmpeg_capabilities import FFmpegCapabilityCache
 
 # Basic configuration for tests
 MINIMAL_CONFIG = {
@@ -173,3 +174,68 @@ def test_detect_best_aac_codec_none_found(mock_popen, mock_logger):
     finaliser = KaraokeFinalise(logger=mock_logger, **MINIMAL_CONFIG)
     assert finaliser.aac_codec == "aac"
     mock_logger.info.assert_any_call("Using built-in aac codec (basic quality)")
+
+
+# --- FFmpeg Capability Cache Tests ---
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    """An executable file standing in for the ffmpeg binary."""
+    ffmpeg_path = tmp_path / "ffmpeg"
+    ffmpeg_path.write_text("#!/bin/sh\n")
+    ffmpeg_path.chmod(0o755)
+    return str(ffmpeg_path)
+
+def test_capability_cache_reuses_probe_until_ffmpeg_changes(fake_ffmpeg, tmp_path, mock_logger):
+    """Test probes run once per ffmpeg binary and again after the binary is replaced."""
+    cache = FFmpegCapabilityCache(str(tmp_path / "cache" / "capabilities.json"), logger=mock_logger)
+    probe = MagicMock(return_value={"aac_codec": "aac", "nvenc_available": False})
+
+    assert cache.get(fake_ffmpeg, probe) == {"aac_codec": "aac", "nvenc_available": False}
+    # A second cache instance (e.g. another process) reads the same file
+    assert FFmpegCapabilityCache(cache.cache_file, logger=mock_logger).get(fake_ffmpeg, probe)["aac_codec"] == "aac"
+    assert probe.call_count == 1
+
+    with open(fake_ffmpeg, "a") as f:
+        f.write("# upgraded\n")
+    cache.get(fake_ffmpeg, probe)
+    assert probe.call_count == 2
+
+def test_capability_cache_expires_entries(fake_ffmpeg, tmp_path, mock_logger):
+    """Test cached capabilities are probed again once the TTL has passed."""
+    cache = FFmpegCapabilityCache(str(tmp_path / "capabilities.json"), logger=mock_logger, ttl_seconds=60)
+    probe = MagicMock(return_value={"aac_codec": "aac", "nvenc_available": True})
+
+    with patch("karaoke_gen.ffmpeg_capabilities.time.time", return_value=1000.0):
+        cache.get(fake_ffmpeg, probe)
+    with patch("karaoke_gen.ffmpeg_capabilities.time.time", return_value=1030.0):
+        cache.get(fake_ffmpeg, probe)
+    assert probe.call_count == 1
+    with patch("karaoke_gen.ffmpeg_capabilities.time.time", return_value=1061.0):
+        cache.get(fake_ffmpeg, probe)
+    assert probe.call_count == 2
+
+def test_init_uses_capability_cache(tmp_path, mock_logger):
+    """Test a second KaraokeFinalise with the same capability cache skips the ffmpeg/NVENC probes."""
+    cache_file = str(tmp_path / "capabilities.json")
+    with patch.object(FFmpegCapabilityCache, "cache_key", return_value="ffmpeg-key"), \
+         patch.object(KaraokeFinalise, "detect_best_aac_codec", return_value="libfdk_aac") as mock_aac, \
+         patch.object(KaraokeFinalise, "detect_nvenc_support", return_value=True) as mock_nvenc:
+        KaraokeFinalise(logger=mock_logger, ffmpeg_capability_cache_file=cache_file, **MINIMAL_CONFIG)
+        finaliser = KaraokeFinalise(logger=mock_logger, ffmpeg_capability_cache_file=cache_file, **MINIMAL_CONFIG)
+
+    assert mock_aac.call_count == 1
+    assert mock_nvenc.call_count == 1
+    assert finaliser.aac_codec == "libfdk_aac"
+    assert finaliser.nvenc_available is True
+    assert finaliser.video_encoder == "h264_nvenc"
+
+def test_init_cpu_only_skips_nvenc_detection(mock_logger):
+    """Test cpu_only hosts never run the NVENC probes."""
+    with patch.object(KaraokeFinalise, "detect_best_aac_codec", return_value="aac"), \
+         patch.object(KaraokeFinalise, "detect_nvenc_support") as mock_nvenc:
+        finaliser = KaraokeFinalise(logger=mock_logger, cpu_only=True, **MINIMAL_CONFIG)
+
+    mock_nvenc.assert_not_called()
+    assert finaliser.nvenc_available is False
+    assert finaliser.video_encoder == "libx264"
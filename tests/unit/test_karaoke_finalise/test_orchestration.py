@@ -225,6 +225,7 @@ def test_process_full_success(
         "brand_code_dir_sharing_link": "mock_share_link",
         "final_karaoke_cdg_zip": ALL_OUTPUT_FILES["final_karaoke_cdg_zip"], # CDG enabled
         "final_karaoke_txt_zip": ALL_OUTPUT_FILES["final_karaoke_txt_zip"], # TXT enabled
+        "command_timings": [], # Every step that runs commands is mocked
     }
     assert result == expected_result
 
@@ -301,3 +302,27 @@ def test_process_dry_run(
     mock_remux_encode.assert_called_once()
     mock_exec_opt.assert_called_once()
     mock_draft_email.assert_called_once()
+
+@patch.object(KaraokeFinalise, 'validate_input_parameters_for_features')
+@patch.object(KaraokeFinalise, 'find_with_vocals_file', return_value=WITH_VOCALS_MOV)
+@patch.object(KaraokeFinalise, 'get_names_from_withvocals', return_value=(BASE_NAME, ARTIST, TITLE))
+@patch.object(KaraokeFinalise, 'choose_instrumental_audio_file', return_value=INSTRUMENTAL_FLAC)
+@patch.object(KaraokeFinalise, 'check_input_files_exist', return_value=ALL_INPUT_FILES)
+@patch.object(KaraokeFinalise, 'prepare_output_filenames', return_value=ALL_OUTPUT_FILES)
+@patch.object(KaraokeFinalise, 'create_cdg_zip_file', side_effect=Exception("CDG generation failed"))
+@patch.object(KaraokeFinalise, 'create_txt_zip_file')
+@patch.object(KaraokeFinalise, 'remux_and_encode_output_video_files')
+@patch.object(KaraokeFinalise, 'execute_optional_features')
+def test_process_parallel_stage_failure_cancels_the_rest(
+    mock_exec_opt, mock_remux_encode, mock_create_txt, mock_create_cdg,
+    mock_prep_out, mock_check_in, mock_choose_instr, mock_get_names, mock_find_vocals,
+    mock_validate, finaliser_for_process):
+    """Test a failed zip stage stops the dependent and remaining stages in non-interactive mode."""
+    finaliser_for_process.non_interactive = True
+
+    with pytest.raises(Exception, match="CDG generation failed"):
+        finaliser_for_process.process()
+
+    assert finaliser_for_process.cancel_event.is_set()
+    mock_create_txt.assert_not_called() # Depends on the CDG zip
+    mock_exec_opt.assert_not_called()
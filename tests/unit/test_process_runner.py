@@ -0,0 +1,177 @@
+import time
+import threading
+import subprocess
+import pytest
+
+from karaoke_gen.process_runner import FFmpegProgressParser, ProcessCancelled, ProcessFailed, ProcessRunner, ProcessStalled, run_process
+
+
+FFMPEG_PROGRESS_OUTPUT = (
+    "frame=120\\nfps=60.0\\nstream_0_0_q=28.0\\nbitrate=1000.0kbits/s\\ntotal_size=524288\\n"
+    "out_time_us=4000000\\nout_time_ms=4000000\\nout_time=00:00:04.000000\\ndup_frames=0\\ndrop_frames=0\\n"
+    "speed=2.0x\\nprogress=continue\\n"
+    "frame=300\\nfps=N/A\\ntotal_size=1048576\\nout_time_us=10000000\\nspeed=N/A\\nprogress=end\\n"
+)
+
+
+class TestFFmpegProgressParser:
+    def test_feed_parses_reports(self):
+        """Test key=value lines are collected into one report per progress= line."""
+        parser = FFmpegProgressParser()
+        reports = [report for line in FFMPEG_PROGRESS_OUTPUT.replace("\\n", "\n").splitlines() if (report := parser.feed(line))]
+
+        assert reports == [
+            {"frame": 120, "fps": 60.0, "speed": 2.0, "out_time_seconds": 4.0, "total_size": 524288, "progress": "continue"},
+            {"frame": 300, "fps": None, "speed": None, "out_time_seconds": 10.0, "total_size": 1048576, "progress": "end"},
+        ]
+        assert parser.latest == reports[-1]
+
+    def test_is_progress_line(self):
+        """Test only ffmpeg progress keys are treated as progress output."""
+        assert FFmpegProgressParser.is_progress_line("out_time_us=100\n")
+        assert FFmpegProgressParser.is_progress_line("stream_0_0_q=28.0\n")
+        assert not FFmpegProgressParser.is_progress_line("Transferred: 1 / 1\n")
+        assert not FFmpegProgressParser.is_progress_line("setting=value\n")
+
+
+class TestRunProcess:
+    def test_run_process_reports_progress_and_timing(self):
+        """Test progress reports reach the callback, other output is kept and a timing record is produced."""
+        reports = []
+        command = f"printf 'starting\\n{FFMPEG_PROGRESS_OUTPUT}'; echo warning >&2; exit 3"
+
+        result = run_process(command, description="Encoding", progress_callback=reports.append)
+
+        assert result.returncode == 3
+        assert result.stdout == "starting\n"
+        assert result.stderr == "warning\n"
+        assert [report["progress"] for report in reports] == ["continue", "end"]
+        assert result.timing["description"] == "Encoding"
+        assert result.timing["returncode"] == 3
+        assert result.timing["output_size_bytes"] == 1048576
+        assert result.timing["media_seconds"] == 10.0
+        assert result.timing["realtime_factor"] > 0
+        assert result.timing["cpu_seconds"] is not None
+
+    def test_run_process_failing_progress_callback_does_not_abort_command(self):
+        """Test a progress callback that raises is logged and the command still runs to completion."""
+        def failing_callback(report):
+            raise RuntimeError("job store unavailable")
+
+        command = f"printf '{FFMPEG_PROGRESS_OUTPUT}'; seq 1 100000; echo done >&2"
+
+        result = run_process(command, progress_callback=failing_callback, timeout=30)
+
+        assert result.returncode == 0
+        assert result.stderr == "done\n"
+        assert result.timing["media_seconds"] == 10.0
+
+    def test_run_process_interrupted_reader_kills_command(self):
+        """Test the command is killed and reaped, rather than left blocked on a full pipe, if reading is interrupted."""
+        def interrupting_callback(report):
+            raise KeyboardInterrupt
+
+        progress = "out_time_us=1000000\\nprogress=continue\\n"
+        command = f"while true; do printf '{progress}'; done"
+        start_time = time.monotonic()
+
+        with pytest.raises(KeyboardInterrupt):
+            run_process(command, progress_callback=interrupting_callback)
+        assert time.monotonic() - start_time < 10
+
+    def test_run_process_without_progress(self):
+        """Test commands that don't report progress still get a timing record."""
+        result = run_process("echo done")
+
+        assert result.returncode == 0
+        assert result.stdout == "done\n"
+        assert result.timing["media_seconds"] is None
+        assert result.timing["realtime_factor"] is None
+
+    def test_run_process_timeout_kills_process_group(self):
+        """Test a command running past its timeout is killed, including processes started by the shell."""
+        with pytest.raises(subprocess.TimeoutExpired):
+            run_process("sleep 30; echo finished", timeout=0.5)
+
+    def test_run_process_kills_stalled_command(self):
+        """Test a command whose progress stops advancing is killed well before its overall timeout."""
+        stuck_progress = "out_time_us=1000000\\nprogress=continue\\n"
+        command = f"while true; do printf '{stuck_progress}'; sleep 0.1; done"
+
+        with pytest.raises(ProcessStalled, match="made no progress for 1 seconds"):
+            run_process(command, timeout=30, stall_timeout=1)
+
+    def test_run_process_cancel_event_kills_process_group(self):
+        """Test setting the cancel event kills a running command, including processes started by the shell."""
+        cancel_event = threading.Event()
+        threading.Timer(0.3, cancel_event.set).start()
+        start_time = time.monotonic()
+
+        with pytest.raises(ProcessCancelled):
+            run_process("sleep 30; echo finished", cancel_event=cancel_event)
+        assert time.monotonic() - start_time < 10
+
+    def test_run_process_advancing_progress_is_not_a_stall(self):
+        """Test a command reporting advancing progress runs past the stall timeout."""
+        command = "for i in 1 2 3 4 5 6; do printf \"out_time_us=${i}000000\\nprogress=continue\\n\"; sleep 0.3; done"
+
+        result = run_process(command, timeout=30, stall_timeout=1)
+
+        assert result.returncode == 0
+        assert result.timing["media_seconds"] == 6.0
+
+    def test_run_process_keeps_stderr_tail(self):
+        """Test only the last stderr_tail_lines lines of stderr are kept."""
+        result = run_process("for i in 1 2 3 4 5; do echo line$i >&2; done", stderr_tail_lines=2)
+
+        assert result.stderr == "line4\nline5\n"
+        assert result.timing["max_rss_bytes"] > 0
+
+
+class TestProcessRunner:
+    def test_run_argument_list_without_shell(self):
+        """Test argument lists are passed to the command as-is, with no shell to split or expand them."""
+        result = ProcessRunner().run(["echo", "two words", "$HOME"], "Echoing")
+
+        assert result.stdout == "two words $HOME\n"
+
+    def test_run_raises_on_failure_with_stderr_tail(self):
+        """Test a non-zero exit status raises ProcessFailed naming the command and carrying its stderr."""
+        runner = ProcessRunner()
+
+        with pytest.raises(ProcessFailed) as exc_info:
+            runner.run(["sh", "-c", "echo 'No such file: input.mp4' >&2; exit 1"], "Converting input media")
+
+        assert exc_info.value.returncode == 1
+        assert "Converting input media failed with exit status 1" in str(exc_info.value)
+        assert "No such file: input.mp4" in str(exc_info.value)
+        assert runner.timings[0]["returncode"] == 1
+
+    def test_run_without_check_returns_failed_result(self):
+        """Test check=False leaves the exit status for the caller to handle."""
+        result = ProcessRunner().run(["sh", "-c", "exit 2"], "Probing", check=False)
+
+        assert result.returncode == 2
+
+    def test_run_all_bounds_concurrency(self):
+        """Test run_all runs commands concurrently, no more than max_concurrent at a time, returning results in order."""
+        runner = ProcessRunner(max_concurrent=2)
+        commands = [(["sh", "-c", f"sleep 0.3; echo {i}"], f"Command {i}") for i in range(4)]
+
+        start_time = time.monotonic()
+        results = runner.run_all(commands)
+        elapsed = time.monotonic() - start_time
+
+        assert [result.stdout for result in results] == ["0\n", "1\n", "2\n", "3\n"]
+        # Two at a time takes two rounds: longer than one round, shorter than running them one by one
+        assert 0.6 <= elapsed < 1.2
+        assert len(runner.timings) == 4
+
+    def test_run_all_raises_first_failure(self):
+        """Test a failing command in run_all raises once every command has finished."""
+        runner = ProcessRunner(max_concurrent=2)
+
+        with pytest.raises(ProcessFailed, match="Command 1 failed"):
+            runner.run_all([(["true"], "Command 0"), (["false"], "Command 1"), (["true"], "Command 2")])
+
+        assert len(runner.timings) == 3
@@ -3,7 +3,12 @@ import pytest
 from unittest.mock import MagicMock, patch, call, mock_open
 from PIL import Image, ImageDraw, ImageFont
 import json
+import shlex
 from karaoke_gen.karaoke_gen import KaraokePrep
+from karaoke_gen.video_encoding_profile import AUDIO_ENCODE_ARGS, VIDEO_ENCODE_ARGS, still_card_video_encode_args
+from karaoke_gen.card_cache import CardRenderCache
+from karaoke_gen.video_generator import VideoGenerator
+from karaoke_gen.process_runner import ProcessRunner
 
 class TestVideo:
     def test_create_video_with_defaults(self, basic_karaoke_gen, temp_dir):
@@ -17,7 +22,7 @@ class TestVideo:
              patch('PIL.ImageDraw.Draw') as mock_draw, \
              patch('PIL.Image.open'), \
              patch('PIL.ImageFont.truetype') as mock_truetype, \
-             patch('os.system'):
+             patch.object(ProcessRunner, 'run'):
             
             # Configure mock font
             mock_font = MagicMock()
@@ -53,15 +58,15 @@ class TestVideo:
             # Verify image.save was called for both PNG and JPG
             assert mock_image.save.call_count == 2 # PNG and JPG
             
-            # Verify os.system was called (access the patch object directly)
-            # Note: os.system is patched within the 'with' block, so we access it there
+            # Verify ProcessRunner.run was called (access the patch object directly)
+            # Note: ProcessRunner.run is patched within the 'with' block, so we access it there
             # We can't assert call_count directly on basic_karaoke_gen._os_system
             # Instead, we rely on the patch context manager
             # Let's verify the call arguments if possible, or just that it was called.
-            # Since os.system is patched without assigning to a variable, we check its call count via the patcher object if needed,
+            # Since ProcessRunner.run is patched without assigning to a variable, we check its call count via the patcher object if needed,
             # but a simple check that the code runs without error implies it was handled correctly by the patch.
             # The original assertion was incorrect. We'll check the save calls instead.
-            # If duration > 0, os.system should be called.
+            # If duration > 0, ProcessRunner.run should be called.
             # Let's refine the assertion later if needed, for now, ensure the TypeError is gone.
             pass # Original assertion was incorrect, removing for now.
     
@@ -79,7 +84,7 @@ class TestVideo:
         # Mock dependencies
         with patch('PIL.Image.open') as mock_image_open, \
              patch('shutil.copy2') as mock_copy, \
-             patch('os.system') as mock_os_system: # Assign patch to variable
+             patch.object(ProcessRunner, 'run') as mock_run: # Assign patch to variable
             
             # Configure mock_image_open to return a mock image
             mock_image = MagicMock()
@@ -101,8 +106,8 @@ class TestVideo:
             # Verify shutil.copy2 was called with correct arguments
             mock_copy.assert_called_once_with(existing_image, output_image_filepath_noext + ".png")
             
-            # Verify os.system was called to create the video
-            mock_os_system.assert_called_once() # Check the patch object directly
+            # Verify the ffmpeg command was run to create the video
+            mock_run.assert_called_once() # Check the patch object directly
     
     def test_create_video_with_background_image(self, basic_karaoke_gen, temp_dir):
         """Test creating a video with a background image."""
@@ -124,7 +129,7 @@ class TestVideo:
              patch('PIL.ImageDraw.Draw') as mock_draw, \
              patch('PIL.ImageFont.truetype') as mock_truetype, \
              patch('os.path.exists', return_value=True), \
-             patch('os.system') as mock_os_system: # Assign patch
+             patch.object(ProcessRunner, 'run') as mock_run: # Assign patch
             
             # Configure mock font
             mock_font = MagicMock()
@@ -159,8 +164,8 @@ class TestVideo:
             # Verify image.save was called for both PNG and JPG
             assert mock_image.save.call_count == 2 # PNG and JPG
             
-            # Verify os.system was called to create the video
-            mock_os_system.assert_called_once() # Check the patch object
+            # Verify the ffmpeg command was run to create the video
+            mock_run.assert_called_once() # Check the patch object
     
     def test_create_video_with_no_output_images(self, basic_karaoke_gen, temp_dir):
         """Test creating a video without saving output images."""
@@ -175,7 +180,7 @@ class TestVideo:
         with patch('PIL.Image.new') as mock_image_new, \
              patch('PIL.ImageDraw.Draw') as mock_draw, \
              patch('PIL.ImageFont.truetype') as mock_truetype, \
-             patch('os.system') as mock_os_system: # Assign patch
+             patch.object(ProcessRunner, 'run') as mock_run: # Assign patch
             
             # Configure mock font
             mock_font = MagicMock()
@@ -207,8 +212,8 @@ class TestVideo:
             # Verify image.save was not called
             assert mock_image.save.call_count == 0 # No PNG or JPG output
             
-            # Verify os.system was called to create the video
-            mock_os_system.assert_called_once() # Check the patch object
+            # Verify the ffmpeg command was run to create the video
+            mock_run.assert_called_once() # Check the patch object
     
     def test_create_video_with_zero_duration(self, basic_karaoke_gen, temp_dir):
         """Test creating a video with zero duration (no video, just images)."""
@@ -220,7 +225,7 @@ class TestVideo:
         with patch('PIL.Image.new') as mock_image_new, \
              patch('PIL.ImageDraw.Draw') as mock_draw, \
              patch('PIL.ImageFont.truetype') as mock_truetype, \
-             patch('os.system') as mock_os_system: # Assign patch
+             patch.object(ProcessRunner, 'run') as mock_run: # Assign patch
             
             # Configure mock font
             mock_font = MagicMock()
@@ -252,8 +257,8 @@ class TestVideo:
             # Verify image.save was called for both PNG and JPG
             assert mock_image.save.call_count == 2 # PNG and JPG
             
-            # Verify os.system was not called to create the video
-            mock_os_system.assert_not_called() # Check the patch object
+            # Verify no ffmpeg command was run to create the video
+            mock_run.assert_not_called() # Check the patch object
     
     def test_create_title_video(self, basic_karaoke_gen, temp_dir):
         """Test creating a title video."""
@@ -347,3 +352,185 @@ class TestVideo:
         
         # Test None input
         assert basic_karaoke_gen.video_generator._transform_text(None, "uppercase") is None
+
+    def test_create_video_from_image_uses_shared_encoding_profile(self, basic_karaoke_gen):
+        """Test title/end card videos are encoded like the karaoke video so finalise can stream-copy them."""
+        with patch.object(ProcessRunner, 'run') as mock_run:
+            basic_karaoke_gen.video_generator._create_video_from_image("card.png", "card.mov", 5)
+
+        command = " ".join(mock_run.call_args[0][0])
+        assert VIDEO_ENCODE_ARGS in command
+        assert AUDIO_ENCODE_ARGS in command
+        assert "anullsrc=channel_layout=stereo:sample_rate=44100" in command
+        assert '-t 5 -vf scale=3840:2160' in command
+
+    def test_create_video_reuses_cached_card_render(self, basic_karaoke_gen, temp_dir):
+        """Test an identical card is restored from the card render cache instead of being rendered again."""
+        video_generator = basic_karaoke_gen.video_generator
+        video_generator.card_cache = CardRenderCache(os.path.join(temp_dir, "cards"), logger=basic_karaoke_gen.logger)
+
+        def render_card(output_image_filepath_noext):
+            video_generator.create_video(
+                extra_text="Extra Text",
+                title_text="Test Title",
+                artist_text="Test Artist",
+                format=basic_karaoke_gen.title_format,
+                output_image_filepath_noext=output_image_filepath_noext,
+                output_video_filepath=f"{output_image_filepath_noext}.mov",
+                duration=0,
+            )
+
+        render_card(os.path.join(temp_dir, "first"))
+        with patch.object(video_generator, "_create_background") as mock_create_background:
+            render_card(os.path.join(temp_dir, "second"))
+
+        mock_create_background.assert_not_called()
+        assert video_generator.card_cache.hits == 1
+        for extension in ("png", "jpg"):
+            with open(os.path.join(temp_dir, f"first.{extension}"), "rb") as first, open(os.path.join(temp_dir, f"second.{extension}"), "rb") as second:
+                assert first.read() == second.read()
+
+    def test_create_video_from_image_reuses_cached_encode(self, basic_karaoke_gen, temp_dir):
+        """Test a card video is encoded once per image and restored for any other card with the same image."""
+        video_generator = basic_karaoke_gen.video_generator
+        video_generator.card_cache = CardRenderCache(os.path.join(temp_dir, "cards"), logger=basic_karaoke_gen.logger)
+
+        image_path = os.path.join(temp_dir, "card.png")
+        Image.new("RGB", (16, 16), "black").save(image_path)
+
+        def fake_encode(command, description):
+            with open(command[-1], "wb") as f:
+                f.write(b"encoded video")
+
+        with patch.object(ProcessRunner, "run", side_effect=fake_encode) as mock_run:
+            video_generator._create_video_from_image(image_path, os.path.join(temp_dir, "first.mov"), 5)
+            video_generator._create_video_from_image(image_path, os.path.join(temp_dir, "second.mov"), 5)
+            video_generator._create_video_from_image(image_path, os.path.join(temp_dir, "longer.mov"), 10)
+
+        assert mock_run.call_count == 2
+        with open(os.path.join(temp_dir, "second.mov"), "rb") as f:
+            assert f.read() == b"encoded video"
+
+    def test_card_cache_evicts_least_recently_used_entries(self, temp_dir):
+        """Test the card render cache stays within its size limit by evicting the oldest entries."""
+        cache = CardRenderCache(os.path.join(temp_dir, "cards"), max_size_bytes=2500)
+        for name in ("a", "b", "c"):
+            file_path = os.path.join(temp_dir, f"{name}.png")
+            with open(file_path, "wb") as f:
+                f.write(b"x" * 1000)
+            cache.store(name * 64, {"png": file_path})
+            # Distinct mtimes, so the eviction order doesn't depend on filesystem timestamp resolution
+            os.utime(os.path.join(cache._entry_dir(name * 64), cache.MANIFEST_FILENAME), (ord(name), ord(name)))
+
+        # Storing "c" pushed the cache over its limit, so the least recently used entry went
+        assert not cache.restore("a" * 64, {"png": os.path.join(temp_dir, "restored.png")})
+        assert cache.restore("c" * 64, {"png": os.path.join(temp_dir, "restored.png")})
+
+    def test_create_gradient_mask(self, basic_karaoke_gen):
+        """Test the gradient mask ramps from 0 to 255 between start and stop along the gradient direction."""
+        video_generator = basic_karaoke_gen.video_generator
+        gradient = {"color1": "#ffffff", "color2": "#000000", "direction": "horizontal", "start": 0.25, "stop": 0.75}
+
+        mask = video_generator._create_gradient_mask((100, 10), gradient)
+        assert mask.mode == "L"
+        assert mask.size == (100, 10)
+        assert [mask.getpixel((x, 5)) for x in (0, 24, 25, 50, 74, 75, 76, 99)] == [0, 0, 0, 127, 249, 255, 255, 255]
+        assert mask.getpixel((50, 0)) == mask.getpixel((50, 9))
+
+        mask = video_generator._create_gradient_mask((10, 100), {**gradient, "direction": "vertical"})
+        assert mask.size == (10, 100)
+        assert [mask.getpixel((5, y)) for y in (0, 50, 99)] == [0, 127, 255]
+
+    def test_calculate_text_size_to_fit_loads_each_font_size_once(self, basic_karaoke_gen):
+        """Test the largest fitting font size is found by binary search, reusing fonts already loaded."""
+        video_generator = basic_karaoke_gen.video_generator
+        draw = MagicMock()
+        # Text is as wide as the font size, so a 305px wide region fits size 300 on one line
+        draw.textbbox.side_effect = lambda position, text, font: (0, 0, font.size, 10)
+
+        with patch('PIL.ImageFont.truetype', side_effect=lambda path, size: MagicMock(size=size)) as mock_truetype, \
+             patch('os.path.exists', return_value=True):
+            font, text_lines = video_generator.calculate_text_size_to_fit(draw, "Test Title", "font.ttf", (0, 0, 305, 100))
+            assert font.size == 300
+            assert text_lines == "Test Title"
+            assert mock_truetype.call_count <= 6
+
+            # Fitting the same region again needs no more font loads
+            mock_truetype.reset_mock()
+            video_generator.calculate_text_size_to_fit(draw, "Test Title", "font.ttf", (0, 0, 305, 100))
+            mock_truetype.assert_not_called()
+
+    def test_calculate_text_size_to_fit_splits_long_text(self, basic_karaoke_gen):
+        """Test text which doesn't fit on one line at any size is split over two lines."""
+        video_generator = basic_karaoke_gen.video_generator
+        draw = MagicMock()
+        # Width grows with the number of words, so only half the words fit in the region at size 100
+        draw.textbbox.side_effect = lambda position, text, font: (0, 0, font.size * len(text.split()), 10)
+
+        with patch('PIL.ImageFont.truetype', side_effect=lambda path, size: MagicMock(size=size)), \
+             patch('os.path.exists', return_value=True):
+            font, text_lines = video_generator.calculate_text_size_to_fit(draw, "One Two Three Four", "font.ttf", (0, 0, 200, 100))
+
+        assert font.size == 100
+        assert text_lines == ("One Two", "Three Four")
+
+    def test_create_video_from_image_with_still_card_profile(self, basic_karaoke_gen):
+        """Test the still card profile encodes one keyframe for the whole card and decodes the image once a second."""
+        video_generator = basic_karaoke_gen.video_generator
+        video_generator.card_encode_profile = "still"
+
+        with patch.object(ProcessRunner, 'run') as mock_run:
+            video_generator._create_video_from_image("card.png", "card.mov", 5)
+
+        command = " ".join(mock_run.call_args[0][0])
+        assert "-loop 1 -framerate 1 " in command
+        assert "-tune stillimage" in command
+        assert "-g 151 -keyint_min 151" in command
+        assert VIDEO_ENCODE_ARGS not in command
+        assert AUDIO_ENCODE_ARGS in command
+
+    def test_still_card_video_encode_args(self):
+        """Test the still card settings make the whole card one GOP, whatever its duration."""
+        assert still_card_video_encode_args(5) == (
+            "-c:v libx264 -preset veryfast -tune stillimage -crf 18 -g 151 -keyint_min 151 -sc_threshold 0 -r 30 -pix_fmt yuv420p"
+        )
+        assert "-g 91 -keyint_min 91 " in still_card_video_encode_args(3)
+        assert "-g 1 -keyint_min 1 " in still_card_video_encode_args(0)
+
+    @pytest.mark.parametrize(
+        "profile, input_frame_rate, video_encode_args",
+        [
+            (
+                "matching",
+                "30",
+                "-c:v libx264 -preset fast -b:v 5000k -minrate 5000k -maxrate 20000k -bufsize 10000k -r 30 -pix_fmt yuv420p",
+            ),
+            (
+                "still",
+                "1",
+                "-c:v libx264 -preset veryfast -tune stillimage -crf 18 -g 151 -keyint_min 151 -sc_threshold 0 -r 30 -pix_fmt yuv420p",
+            ),
+        ],
+    )
+    def test_card_encode_profile_command(self, basic_karaoke_gen, profile, input_frame_rate, video_encode_args):
+        """Test the full ffmpeg argument list each card encode profile runs."""
+        video_generator = basic_karaoke_gen.video_generator
+        video_generator.card_encode_profile = profile
+
+        with patch.object(ProcessRunner, 'run') as mock_run:
+            video_generator._create_video_from_image("card.png", "card.mov", 5)
+
+        assert mock_run.call_args[0][0] == [
+            *shlex.split(video_generator.ffmpeg_base_command),
+            "-y", "-loop", "1", "-framerate", input_frame_rate, "-i", "card.png",
+            "-f", "lavfi", "-i", "anullsrc=channel_layout=stereo:sample_rate=44100",
+            *video_encode_args.split(),
+            "-t", "5", "-vf", "scale=3840:2160",
+            "-c:a", "pcm_s16le", "-ar", "44100", "-ac", "2",
+            "-shortest", "card.mov",
+        ]
+
+    def test_unknown_card_encode_profile_is_rejected(self, basic_karaoke_gen):
+        """Test an unknown card encode profile fails when the VideoGenerator is created rather than mid-render."""
+        with pytest.raises(ValueError, match="Unknown card encode profile"):
+            VideoGenerator(basic_karaoke_gen.logger, "ffmpeg", False, True, True, card_encode_profile="fastest")